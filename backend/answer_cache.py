@@ -0,0 +1,172 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Answer cache settings (override in .env)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+answer_cache_hits = metrics.counter("answer_cache_hits", "Queries answered from the semantic answer cache")
+answer_cache_misses = metrics.counter("answer_cache_misses", "Queries that went through retrieval and the LLM")
+
+
+class AnswerCache:
+    """
+    Semantic cache of generated answers, looked up by question embedding
+
+    A cached answer is reused when a new question's embedding has cosine
+    similarity >= threshold with a cached question asked by the same tenant
+    over the same document set with the same top_k, the entry is younger
+    than the TTL and it was generated against the tenant's current corpus
+    version. Least recently used entries are evicted when the cache is full.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+        ttl_seconds: float = ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES
+    ):
+        self.threshold = threshold
+        self.ttl = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        # tenant -> corpus version
+        self._versions: Dict[str, int] = {}
+
+        # entry id -> entry, in LRU order
+        self._entries: "OrderedDict[int, Dict]" = OrderedDict()
+        # unit-length question vectors, one row per slot
+        self._vectors: Optional[np.ndarray] = None
+        self._free_slots: List[int] = list(range(self.max_entries))
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def corpus_version(self, tenant: str) -> int:
+        return self._versions.get(tenant, 0)
+
+    def bump_corpus_version(self, tenant: str):
+        """
+        Mark a tenant's cached answers stale (call after its indexed documents change)
+        """
+        with self._lock:
+            version = self._versions.get(tenant, 0) + 1
+            self._versions[tenant] = version
+            for entry_id in [i for i, entry in self._entries.items() if entry["tenant"] == tenant]:
+                self._drop(entry_id)
+        logger.info(f"Answer cache invalidated for tenant '{tenant}', corpus version {version}")
+
+    @staticmethod
+    def scope_key(document_ids: Optional[List[str]]) -> str:
+        """
+        Cache scope for a query restricted to a document set (empty = all documents)
+        """
+        return ",".join(sorted(document_ids)) if document_ids else ""
+
+    def lookup(self, question_vector, top_k: int, tenant: str, scope: str = "") -> Optional[Dict]:
+        """
+        Find a cached answer for a similar question
+
+        Returns:
+            Dict with answer, sources, the cached question and its similarity, or None
+        """
+        with self._lock:
+            if not self._entries:
+                answer_cache_misses.inc()
+                return None
+
+            query = self._unit(question_vector)
+            slots = np.array([entry["slot"] for entry in self._entries.values()])
+            entry_ids = list(self._entries)
+            scores = self._vectors[slots] @ query
+
+            now = time.time()
+            for index in np.argsort(-scores):
+                score = float(scores[index])
+                if score < self.threshold:
+                    break
+
+                entry_id = entry_ids[index]
+                entry = self._entries[entry_id]
+                if entry["tenant"] != tenant or entry["scope"] != scope or entry["top_k"] != top_k:
+                    continue
+                if entry["corpus_version"] != self.corpus_version(tenant) or now - entry["created_at"] > self.ttl:
+                    self._drop(entry_id)
+                    continue
+
+                self._entries.move_to_end(entry_id)
+                answer_cache_hits.inc()
+                return {
+                    "answer": entry["answer"],
+                    "sources": entry["sources"],
+                    "question": entry["question"],
+                    "similarity": score
+                }
+
+        answer_cache_misses.inc()
+        return None
+
+    def store(
+        self,
+        question: str,
+        question_vector,
+        top_k: int,
+        answer: str,
+        sources: list,
+        tenant: str,
+        scope: str = "",
+        corpus_version: Optional[int] = None
+    ):
+        """
+        Cache an answer
+
+        Pass the corpus_version read before retrieval, so an answer built
+        from documents that changed during generation is stored as stale.
+        """
+        vector = self._unit(question_vector)
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+            if not self._free_slots:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._entries[self._next_id] = {
+                "slot": slot,
+                "question": question,
+                "top_k": top_k,
+                "tenant": tenant,
+                "scope": scope,
+                "answer": answer,
+                "sources": sources,
+                "corpus_version": self.corpus_version(tenant) if corpus_version is None else corpus_version,
+                "created_at": time.time(),
+            }
+            self._next_id += 1
+
+    def _drop(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._free_slots.append(entry["slot"])
+
+    def __len__(self) -> int:
+        return len(self._entries)
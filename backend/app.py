@@ -1,25 +1,89 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
+from contextlib import asynccontextmanager
 import os
+import json
+import asyncio
+import shutil
 from dotenv import load_dotenv
 import logging
 
-from document_parser import parse_document
+# Load variables before the local imports: modules read their settings at import time
+load_dotenv()
+
 from embeddings import EmbeddingManager
-from qdrant_utils import QdrantManager
+from vector_store import create_vector_store
 from s3_utils import S3Manager
 from llm_client import LLMClient
-
-# Load variables
-load_dotenv()
+from concurrency import run_embed, run_io, shutdown_executors
+from embedding_batcher import EmbeddingBatcher
+from answer_cache import AnswerCache, ANSWER_CACHE_ENABLED
+from ingest import ingest_document, hash_file, document_id_for
+from jobs import JobManager, JobProgress
+from context_packer import pack_context
+from llm_gate import LLMGate, LLMUnavailable, LLM_MAX_CONCURRENCY
+from services import ServiceManager, ServiceUnavailable
+import metrics
 
 # logging setup
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# managers are built in the background at startup (see lifespan), so a
+# slow model load or an unreachable dependency doesn't block or crash the worker
+services = ServiceManager()
+llm_client = LLMClient()
+# bounds and coalesces generations so bursts get fast 429/503s instead of Ollama timeouts
+llm_gate = LLMGate(llm_client)
+query_batcher: Optional[EmbeddingBatcher] = None
+# created at startup (see lifespan), since it opens the job database and spool directory
+job_manager: Optional[JobManager] = None
+answer_cache = AnswerCache() if ANSWER_CACHE_ENABLED else None
+
+
+async def connect_llm() -> LLMClient:
+    if not await llm_client.check_connection():
+        raise RuntimeError(f"Cannot connect to Ollama at {llm_client.base_url} (start it with: ollama serve)")
+    return llm_client
+
+
+services.register(
+    "embedding", EmbeddingManager, warm_up=EmbeddingManager.warm_up, runner=run_embed,
+    close=EmbeddingManager.close
+)
+# Qdrant or the in-process local store, per VECTOR_STORE
+services.register("vector_store", create_vector_store, close=lambda store: store.close())
+services.register("s3", S3Manager, close=lambda s3: s3.close())
+# queries still try Ollama when this isn't ready; it's reported, not awaited
+services.register("llm", connect_llm, critical=False)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start dependencies in the background; release pools and connections on shutdown"""
+    global job_manager
+    await services.start()
+    # load the model in Ollama now and keep it resident, instead of on the first question
+    llm_client.start_keep_warm()
+    # Resume ingestion jobs left unfinished by the last run (they wait for their dependencies)
+    job_manager = JobManager(run_ingest_job)
+    job_manager.recover()
+    yield
+    await services.stop()
+    if query_batcher is not None:
+        await query_batcher.close()
+    await llm_client.aclose()
+    job_manager.shutdown()
+    # after the jobs stopped, so none is still writing to the vector store or
+    # the embedding cache; the cache is closed on the embed pool before it shuts down
+    await services.close()
+    shutdown_executors()
+
 # FastAPI
-app = FastAPI(title="FileFox API", version="1.0.0")
+app = FastAPI(title="FileFox API", version="1.0.0", lifespan=lifespan)
 
 #CORS 
 app.add_middleware(
@@ -30,20 +94,214 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# managers
-embedding_manager = EmbeddingManager()
-qdrant_manager = QdrantManager()
-s3_manager = S3Manager()
-llm_client = LLMClient()
+# Requests without an X-Tenant-ID header share this namespace
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+
+# Batch queries (override in .env)
+# QUERY_BATCH_MAX_QUESTIONS: questions accepted per /query/batch request
+# QUERY_BATCH_CONCURRENCY: generations one batch keeps in flight; the rest wait inside
+# the batch rather than in the LLM queue, so a batch doesn't crowd out interactive queries
+QUERY_BATCH_MAX_QUESTIONS = int(os.getenv("QUERY_BATCH_MAX_QUESTIONS", "256"))
+QUERY_BATCH_CONCURRENCY = max(1, int(os.getenv("QUERY_BATCH_CONCURRENCY", str(LLM_MAX_CONCURRENCY))))
+
+# Document listing (override in .env)
+# DOCUMENTS_LIMIT / DOCUMENTS_MAX_LIMIT: default and largest ?limit= of GET /documents; Qdrant's
+# facet counts can't be paged, so longer lists are cut and flagged "truncated"
+DOCUMENTS_LIMIT = int(os.getenv("DOCUMENTS_LIMIT", "1000"))
+DOCUMENTS_MAX_LIMIT = int(os.getenv("DOCUMENTS_MAX_LIMIT", "10000"))
+
+NO_DOCUMENTS_ANSWER = "I don't have any documents to answer your question. Please upload some documents first."
 
 
 class QueryRequest(BaseModel):
     question: str
     top_k: int = 3
+    # restrict the search to these documents (default: all of the tenant's documents)
+    document_ids: Optional[List[str]] = None
+
+class QueryBatchRequest(BaseModel):
+    questions: List[str]
+    top_k: int = 3
+    # restrict the search to these documents (default: all of the tenant's documents)
+    document_ids: Optional[List[str]] = None
 
 class QueryResponse(BaseModel):
     answer: str
     sources: list
+    cached: bool = False
+    # estimated LLM tokens of the prompt (None when no prompt was sent)
+    prompt_tokens: Optional[int] = None
+
+
+def format_sources(search_results: list) -> list:
+    """
+    Shorten search results into the source list returned to clients
+    """
+    return [
+        {
+            "text": result['text'][:200] + "..." if len(result['text']) > 200 else result['text'],
+            "document_id": result['metadata'].get('document_id'),
+            "filename": result['metadata'].get('filename', 'Unknown'),
+            "page": result['metadata'].get('page'),
+            "score": result['score']
+        }
+        for result in search_results
+    ]
+
+
+def get_tenant(x_tenant_id: Optional[str]) -> str:
+    """
+    Tenant namespace for a request, from the X-Tenant-ID header
+    """
+    tenant = (x_tenant_id or "").strip() or DEFAULT_TENANT
+    if len(tenant) > 128:
+        raise HTTPException(status_code=400, detail="X-Tenant-ID is too long")
+    return tenant
+
+
+def corpus_changed(tenant: str):
+    """
+    Invalidate a tenant's cached answers after its indexed documents change
+    """
+    if answer_cache is not None:
+        answer_cache.bump_corpus_version(tenant)
+
+
+def sse_event(event: str, data: dict) -> str:
+    """
+    Encode a single Server-Sent Events frame
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def get_query_batcher() -> EmbeddingBatcher:
+    """
+    Query embedding batcher, created once the embedding model is loaded
+    """
+    global query_batcher
+    if query_batcher is None:
+        query_batcher = EmbeddingBatcher(await services.require("embedding"))
+    return query_batcher
+
+
+def spool_upload(upload, path: str) -> str:
+    """
+    Copy an upload to the job spool, returning its SHA-256
+    """
+    with open(path, "wb") as spool:
+        shutil.copyfileobj(upload, spool, 1024 * 1024)
+    with open(path, "rb") as spool:
+        return hash_file(spool)
+
+
+def wait_for_service(name: str, progress: JobProgress):
+    """
+    Block a job until a dependency is ready, staying responsive to cancellation
+    """
+    while True:
+        try:
+            return services.wait(name, timeout=1.0)
+        except ServiceUnavailable:
+            progress.check_cancelled()
+
+
+def run_ingest_job(job: dict, progress: JobProgress) -> dict:
+    """
+    Ingest one spooled upload (runs on a job worker thread)
+    """
+    s3_manager = wait_for_service("s3", progress)
+    embedding_manager = wait_for_service("embedding", progress)
+    vector_store = wait_for_service("vector_store", progress)
+    
+    # Jobs for one document run one after another, so an earlier job may
+    # already have indexed this exact content
+    if vector_store.document_exists(job["document_id"], job["content_hash"]):
+        logger.info(f"{job['filename']} is unchanged, skipping ingest")
+        return {
+            "unchanged": True,
+            "chunks_processed": 0,
+            "chunks_embedded": 0,
+            "chunks_reused": 0,
+            "chunks_deleted": 0,
+            "points_per_second": 0.0,
+            "s3_url": None
+        }
+    
+    # Archive to S3 while the document is parsed and embedded; the upload
+    # streams from the spool file in parts and its URL is known up front
+    upload = s3_manager.start_upload(job["spool_path"], s3_manager.object_key(job["filename"]))
+    s3_url = upload.url
+
+    def report(**kwargs):
+        if upload.done():
+            upload.result()  # fail fast if the upload failed
+        progress.update(**kwargs)
+
+    def finish_upload():
+        # the document only counts as indexed once its S3 copy exists
+        progress.update(stage="s3")
+        while not upload.wait(timeout=0.5):
+            progress.check_cancelled()
+        upload.result()
+        logger.info(f"File uploaded to S3: {s3_url}")
+
+    # Parse, embed and store in the vector store as one streaming pipeline;
+    # upserts go out in parallel with parsing and encoding
+    try:
+        with open(job["spool_path"], "rb") as source:
+            ingest_stats = ingest_document(
+                source,
+                job["filename"],
+                job["document_id"],
+                embedding_manager,
+                vector_store,
+                {
+                    "tenant": job["tenant"],
+                    "document_id": job["document_id"],
+                    "filename": job["filename"],
+                    "s3_url": s3_url,
+                    "file_type": job["file_type"]
+                },
+                job["content_hash"],
+                progress=report,
+                before_commit=finish_upload
+            )
+    except BaseException:
+        upload.cancel()
+        raise
+
+    logger.info(f"Added {ingest_stats['points']} points to the vector store")
+    corpus_changed(job["tenant"])
+
+    return {
+        "unchanged": False,
+        "chunks_processed": ingest_stats["chunks"],
+        "chunks_embedded": ingest_stats["points"],
+        "chunks_reused": ingest_stats["reused"],
+        "chunks_deleted": ingest_stats["deleted"],
+        "points_per_second": round(ingest_stats["points_per_second"], 1),
+        "s3_url": s3_url
+    }
+
+
+def get_job_manager() -> JobManager:
+    """
+    Ingestion job manager, created at startup (see lifespan)
+    """
+    if job_manager is None:
+        raise ServiceUnavailable("Job manager isn't started")
+    return job_manager
+
+
+@app.exception_handler(ServiceUnavailable)
+async def service_unavailable(request, exc: ServiceUnavailable):
+    """A dependency is still starting or down"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(LLMUnavailable)
+async def llm_unavailable(request, exc: LLMUnavailable):
+    """The LLM queue is full (429) or a question waited too long for it (503)"""
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)}, headers={"Retry-After": "5"})
 
 @app.get("/")
 async def root():
@@ -54,18 +312,37 @@ async def root():
         "version": "3.0.0"
     }
 
-@app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: 200 once the model and critical dependencies are initialized"""
+    ready = services.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "services": services.status()}
+    )
+
+@app.post("/upload", status_code=202)
+async def upload_file(
+    file: UploadFile = File(...),
+    x_tenant_id: Optional[str] = Header(default=None)
+):
     """
-    Upload and process a document (PDF, DOCX, CSV)
+    Upload a document (PDF, DOCX, CSV) and queue it for processing
+    
+    Returns 202 with a job_id right away; poll GET /jobs/{job_id} for progress.
+    Uploading a file with the same name again replaces that document
+    (incrementally); other documents are left alone. Re-uploading an
+    unchanged file returns 200 with unchanged set and no job.
     """
-    # Clear previous embeddings in Qdrant before adding new document
-    try:
-        qdrant_manager.clear_collection()
-        logger.info("🧹 Cleared previous Qdrant embeddings before new upload")
-    except Exception as clear_err:
-        logger.warning(f"Could not clear previous embeddings: {clear_err}")
-
+    tenant = get_tenant(x_tenant_id)
+    vector_store = await services.require("vector_store")
+    manager = get_job_manager()
+    spool_path = None
     try:
         # Validate file type
         allowed_extensions = ['.pdf', '.docx', '.csv']
@@ -77,122 +354,444 @@ async def upload_file(file: UploadFile = File(...)):
                 detail=f"Unsupported file type. Allowed: {', '.join(allowed_extensions)}"
             )
         
-        logger.info(f"Processing file: {file.filename}")
+        logger.info(f"Queueing file: {file.filename} (tenant '{tenant}')")
+        document_id = document_id_for(tenant, file.filename)
         
-        # Read file content
-        content = await file.read()
+        # Keep the upload on disk until its job finishes, so it survives restarts
+        spool_path = manager.new_spool_path(file_ext)
+        content_hash = await run_io(spool_upload, file.file, spool_path)
         
-        # Upload to DigitalOcean Spaces
-        s3_url = s3_manager.upload_file(content, file.filename)
-        logger.info(f"File uploaded to S3: {s3_url}")
+        # Re-uploading an unchanged file is a no-op
+        if await run_io(vector_store.document_exists, document_id, content_hash):
+            os.remove(spool_path)
+            logger.info(f"{file.filename} is unchanged, skipping ingest")
+            return JSONResponse(status_code=200, content={
+                "success": True,
+                "message": f"File '{file.filename}' is already up to date",
+                "job_id": None,
+                "status": None,
+                "document_id": document_id,
+                "unchanged": True
+            })
         
-        # Parse document to extract text
-        text_chunks = parse_document(content, file.filename)
-        logger.info(f"Extracted {len(text_chunks)} chunks from document")
-        
-        if not text_chunks:
-            raise HTTPException(status_code=400, detail="couldn't extract text fron file")
-        
-        # Generate embeddings
-        embeddings = embedding_manager.generate_embeddings(text_chunks)
-        logger.info(f"Generated {len(embeddings)} embeddings")
-        
-        # Store in Qdrant
-        points_added = qdrant_manager.add_documents(
-            texts=text_chunks,
-            embeddings=embeddings,
-            metadata={
-                "filename": file.filename,
-                "s3_url": s3_url,
-                "file_type": file_ext
-            }
+        job = manager.store.create(
+            tenant=tenant,
+            document_id=document_id,
+            filename=file.filename,
+            file_type=file_ext,
+            spool_path=spool_path,
+            content_hash=content_hash
         )
-        
-        logger.info(f"Added {points_added} points to Qdrant")
+        manager.submit(job)
         
         return {
             "success": True,
-            "message": f"File '{file.filename}' processed successfully",
-            "chunks_processed": len(text_chunks),
-            "s3_url": s3_url
+            "message": f"File '{file.filename}' queued for processing",
+            "job_id": job["id"],
+            "status": job["status"],
+            "document_id": document_id,
+            "unchanged": False
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
+        if spool_path and os.path.exists(spool_path):
+            os.remove(spool_path)
         logger.error(f"Error processing file: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def get_tenant_job(job_id: str, tenant: str) -> dict:
+    """
+    Look up a job, hiding other tenants' jobs
+    """
+    job = get_job_manager().store.get(job_id)
+    if job is None or job["tenant"] != tenant:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, x_tenant_id: Optional[str] = Header(default=None)):
+    """
+    Get the status and progress of an ingestion job
+    
+    stage is one of queued, running, s3, parse, embed, index, then done,
+    failed or cancelled. result holds the ingest stats once it succeeds.
+    """
+    job = get_tenant_job(job_id, get_tenant(x_tenant_id))
+    return {
+        "job_id": job["id"],
+        "document_id": job["document_id"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "chunks_done": job["chunks_done"],
+        "chunks_embedded": job["chunks_embedded"],
+        "points_per_second": round(job["points_per_second"], 1),
+        "error": job["error"],
+        "result": job["result"]
+    }
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, x_tenant_id: Optional[str] = Header(default=None)):
+    """
+    Cancel a queued or running ingestion job
+    
+    Points already written by a cancelled job are left in place and are
+    reused or cleaned up when the file is uploaded again.
+    """
+    job = get_tenant_job(job_id, get_tenant(x_tenant_id))
+    if not get_job_manager().cancel(job["id"]):
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    return {"success": True, "job_id": job["id"]}
+
 @app.post("/query", response_model=QueryResponse)
-async def query_chatbot(request: QueryRequest):
+async def query_chatbot(request: QueryRequest, x_tenant_id: Optional[str] = Header(default=None)):
     """
     Query the chatbot with a question
     """
+    tenant = get_tenant(x_tenant_id)
+    scope = AnswerCache.scope_key(request.document_ids)
+    batcher = await get_query_batcher()
+    vector_store = await services.require("vector_store")
     try:
         logger.info(f"Received query: {request.question}")
         
         # Generate embedding for the question
-        question_embedding = embedding_manager.generate_embeddings([request.question])[0]
+        question_embedding = await batcher.embed(request.question)
+        
+        # Reuse the answer to a near-identical earlier question
+        if answer_cache is not None:
+            corpus_version = answer_cache.corpus_version(tenant)
+            hit = answer_cache.lookup(question_embedding, request.top_k, tenant, scope)
+            if hit is not None:
+                logger.info(f"Answer cache hit ({hit['similarity']:.3f}): '{hit['question'][:50]}'")
+                return QueryResponse(answer=hit["answer"], sources=hit["sources"], cached=True)
         
-        # Search Qdrant for relevant documents
-        search_results = qdrant_manager.search(
+        # Search the vector store for relevant documents
+        search_results = await run_io(
+            vector_store.search,
             query_vector=question_embedding,
-            top_k=request.top_k
+            top_k=request.top_k,
+            tenant=tenant,
+            document_ids=request.document_ids,
+            query_text=request.question
         )
         
         if not search_results:
             return QueryResponse(
-                answer="I don't have any documents to answer your question. Please upload some documents first.",
+                answer=NO_DOCUMENTS_ANSWER,
                 sources=[]
             )
         
-        # Extract context from search results
-        context_chunks = [result['text'] for result in search_results]
-        context = "\n\n".join(context_chunks)
+        # Pack the results into the context budget (merging neighbours, dropping overlap)
+        packed = pack_context(search_results)
+        prompt_tokens = llm_client.estimate_prompt_tokens(request.question, packed["context"])
+        logger.info(
+            f"Prompt ~{prompt_tokens} tokens: context ~{packed['tokens']} tokens from "
+            f"{len(packed['results'])} of {len(search_results)} chunks"
+        )
         
         # Generate answer using LLM
-        answer = llm_client.generate_answer(
+        answer, ok = await llm_gate.generate(
             question=request.question,
-            context=context
+            context=packed["context"]
         )
         
         # Format sources
-        sources = [
-            {
-                "text": result['text'][:200] + "..." if len(result['text']) > 200 else result['text'],
-                "filename": result['metadata'].get('filename', 'Unknown'),
-                "score": result['score']
-            }
-            for result in search_results
-        ]
+        sources = format_sources(packed["results"])
+        
+        # only real answers are cached, not error messages
+        if ok and answer_cache is not None:
+            answer_cache.store(
+                request.question, question_embedding, request.top_k, answer, sources,
+                tenant, scope, corpus_version
+            )
         
-        return QueryResponse(answer=answer, sources=[])
+        return QueryResponse(answer=answer, sources=sources, prompt_tokens=prompt_tokens)
     
+    except LLMUnavailable:
+        raise
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query/stream")
+async def query_chatbot_stream(request: QueryRequest, x_tenant_id: Optional[str] = Header(default=None)):
+    """
+    Query the chatbot and stream the answer as Server-Sent Events
+
+    Frames: one `sources` event, then `token` events as the model
+    produces them, then a final `done` (or `error`) event. `done`
+    carries `cached: true` when the answer came from the answer cache.
+    """
+    tenant = get_tenant(x_tenant_id)
+    scope = AnswerCache.scope_key(request.document_ids)
+    corpus_version = answer_cache.corpus_version(tenant) if answer_cache is not None else 0
+    batcher = await get_query_batcher()
+    vector_store = await services.require("vector_store")
+    try:
+        logger.info(f"Received streaming query: {request.question}")
+        
+        question_embedding = await batcher.embed(request.question)
+        
+        hit = (
+            answer_cache.lookup(question_embedding, request.top_k, tenant, scope)
+            if answer_cache is not None else None
+        )
+        if hit is not None:
+            logger.info(f"Answer cache hit ({hit['similarity']:.3f}): '{hit['question'][:50]}'")
+            
+            async def cached_stream():
+                yield sse_event("sources", {"sources": hit["sources"]})
+                yield sse_event("token", {"token": hit["answer"]})
+                yield sse_event("done", {"cached": True})
+            
+            return StreamingResponse(
+                cached_stream(),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        
+        search_results = await run_io(
+            vector_store.search,
+            query_vector=question_embedding,
+            top_k=request.top_k,
+            tenant=tenant,
+            document_ids=request.document_ids,
+            query_text=request.question
+        )
+    except Exception as e:
+        logger.error(f"Error processing query: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    packed = pack_context(search_results)
+    sources = format_sources(packed["results"])
+    prompt_tokens = llm_client.estimate_prompt_tokens(request.question, packed["context"])
+    if search_results:
+        # reject before the stream starts, while a status code can still be sent
+        llm_gate.check_capacity()
+    
+    async def event_stream():
+        yield sse_event("sources", {"sources": sources})
+        
+        if not search_results:
+            yield sse_event("token", {"token": NO_DOCUMENTS_ANSWER})
+            yield sse_event("done", {})
+            return
+        
+        logger.info(
+            f"Prompt ~{prompt_tokens} tokens: context ~{packed['tokens']} tokens from "
+            f"{len(packed['results'])} of {len(search_results)} chunks"
+        )
+        tokens = []
+        try:
+            async for token in llm_gate.stream(
+                question=request.question,
+                context=packed["context"]
+            ):
+                tokens.append(token)
+                yield sse_event("token", {"token": token})
+            
+            answer = "".join(tokens).strip()
+            if answer and answer_cache is not None:
+                answer_cache.store(
+                    request.question, question_embedding, request.top_k,
+                    answer, sources,
+                    tenant, scope, corpus_version
+                )
+            yield sse_event("done", {"cached": False, "prompt_tokens": prompt_tokens})
+        except Exception as e:
+            logger.error(f"Error streaming answer: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/query/batch")
+async def query_chatbot_batch(request: QueryBatchRequest, x_tenant_id: Optional[str] = Header(default=None)):
+    """
+    Answer many questions at once (evaluation sets, bulk FAQ generation)
+
+    All questions are embedded in one encode call and searched in one
+    vector store request, then up to QUERY_BATCH_CONCURRENCY answers are
+    generated at a time. The response is NDJSON: one line per question in
+    input order, each written once it and the ones before it are done, with
+    index, question, answer, sources, cached and prompt_tokens, or index,
+    question, error and status_code if the LLM couldn't take it.
+    """
+    tenant = get_tenant(x_tenant_id)
+    questions = request.questions
+    if not questions:
+        raise HTTPException(status_code=400, detail="No questions given")
+    if len(questions) > QUERY_BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {QUERY_BATCH_MAX_QUESTIONS} questions per batch"
+        )
+    scope = AnswerCache.scope_key(request.document_ids)
+    corpus_version = answer_cache.corpus_version(tenant) if answer_cache is not None else 0
+    embedding_manager = await services.require("embedding")
+    vector_store = await services.require("vector_store")
+    try:
+        logger.info(f"Received batch of {len(questions)} queries")
+        
+        question_embeddings = await run_embed(embedding_manager.generate_embeddings, questions)
+        
+        hits = [
+            answer_cache.lookup(embedding, request.top_k, tenant, scope) if answer_cache is not None else None
+            for embedding in question_embeddings
+        ]
+        pending = [i for i, hit in enumerate(hits) if hit is None]
+        
+        search_results = await run_io(
+            vector_store.search_batch,
+            query_vectors=question_embeddings[pending],
+            top_k=request.top_k,
+            tenant=tenant,
+            document_ids=request.document_ids,
+            query_texts=[questions[i] for i in pending]
+        ) if pending else []
+        results_by_index = dict(zip(pending, search_results))
+    except Exception as e:
+        logger.error(f"Error processing query batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    slots = asyncio.Semaphore(QUERY_BATCH_CONCURRENCY)
+    
+    async def answer_question(index: int) -> dict:
+        question = questions[index]
+        line = {"index": index, "question": question}
+        
+        hit = hits[index]
+        if hit is not None:
+            return {**line, "answer": hit["answer"], "sources": hit["sources"], "cached": True, "prompt_tokens": None}
+        
+        results = results_by_index[index]
+        if not results:
+            return {**line, "answer": NO_DOCUMENTS_ANSWER, "sources": [], "cached": False, "prompt_tokens": None}
+        
+        packed = pack_context(results)
+        sources = format_sources(packed["results"])
+        prompt_tokens = llm_client.estimate_prompt_tokens(question, packed["context"])
+        try:
+            async with slots:
+                answer, ok = await llm_gate.generate(question=question, context=packed["context"])
+        except LLMUnavailable as e:
+            return {**line, "error": str(e), "status_code": e.status_code}
+        
+        if ok and answer_cache is not None:
+            answer_cache.store(
+                question, question_embeddings[index], request.top_k, answer, sources,
+                tenant, scope, corpus_version
+            )
+        return {**line, "answer": answer, "sources": sources, "cached": False, "prompt_tokens": prompt_tokens}
+    
+    async def ndjson_stream():
+        tasks = [asyncio.create_task(answer_question(i)) for i in range(len(questions))]
+        try:
+            for index, task in enumerate(tasks):
+                try:
+                    line = await task
+                except Exception as e:
+                    logger.error(f"Error answering batch question {index}: {str(e)}")
+                    line = {"index": index, "question": questions[index], "error": str(e), "status_code": 500}
+                yield json.dumps(line) + "\n"
+        finally:
+            # the client went away (or we're done): stop whatever is still waiting
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(
+        ndjson_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.delete("/clear")
-async def clear_database():
+async def clear_database(x_tenant_id: Optional[str] = Header(default=None)):
     """
-    Clear all data from Qdrant 
+    Clear all of the tenant's documents from the vector store
     """
+    tenant = get_tenant(x_tenant_id)
+    vector_store = await services.require("vector_store")
     try:
-        qdrant_manager.clear_collection()
+        await run_io(vector_store.delete_tenant, tenant)
+        corpus_changed(tenant)
         return {"success": True, "message": "Database cleared successfully"}
     except Exception as e:
         logger.error(f"Error clearing database: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/documents")
+async def list_documents(
+    limit: int = Query(default=DOCUMENTS_LIMIT, ge=1, le=DOCUMENTS_MAX_LIMIT),
+    x_tenant_id: Optional[str] = Header(default=None)
+):
+    """
+    List the tenant's documents, largest first
+
+    At most `limit` documents are returned; "truncated" is true when the
+    tenant has more.
+    """
+    tenant = get_tenant(x_tenant_id)
+    vector_store = await services.require("vector_store")
+    try:
+        # one extra tells whether the list was cut
+        documents = await run_io(vector_store.list_documents, tenant, limit + 1)
+        return {
+            "documents": [
+                {**document, "document_id": document_id_for(tenant, document["filename"])}
+                for document in documents[:limit]
+            ],
+            "truncated": len(documents) > limit
+        }
+    except Exception as e:
+        logger.error(f"Error listing documents: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/documents/{document_id}")
+async def delete_document(document_id: str, x_tenant_id: Optional[str] = Header(default=None)):
+    """
+    Delete one of the tenant's documents
+    """
+    tenant = get_tenant(x_tenant_id)
+    vector_store = await services.require("vector_store")
+    try:
+        deleted = await run_io(vector_store.delete_document, tenant, document_id)
+    except Exception as e:
+        logger.error(f"Error deleting document: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if deleted == 0:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    corpus_changed(tenant)
+    return {"success": True, "document_id": document_id, "chunks_deleted": deleted}
+
 @app.get("/stats")
-async def get_stats():
+async def get_stats(x_tenant_id: Optional[str] = Header(default=None)):
     """
     Get statistics about stored documents
     """
+    tenant = get_tenant(x_tenant_id)
+    vector_store = await services.require("vector_store")
     try:
-        count = qdrant_manager.get_collection_count()
+        count = await run_io(vector_store.get_collection_count, tenant)
         return {
             "total_chunks": count,
             "status": "operational"
         }
     except Exception as e:
         logger.error(f"Error getting stats: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Get internal performance metrics (counters and histograms)
+    """
+    return metrics.snapshot()
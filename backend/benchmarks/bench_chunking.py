@@ -0,0 +1,130 @@
+"""
+Benchmark: chunking strategies (fixed, token, sentence, heading)
+
+For each strategy it reports
+  - chunk count and chunking time
+  - mean/max tokens per chunk and how many chunks exceed the model's window
+    (those are truncated when embedded)
+  - embed time for all chunks
+  - retrieval hit rate: sentences sampled from the document are used as
+    queries, and a hit means one of the top-k chunks contains the sentence
+
+Usage:
+    python benchmarks/bench_chunking.py --file contract.pdf --queries 200
+    python benchmarks/bench_chunking.py --strategies fixed sentence --top-k 3
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chunking import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_STRATEGIES, Chunker, get_tokenizer, split_sentences
+from embeddings import EmbeddingManager
+
+
+def load_runs(path):
+    """
+    The document as runs of (text, heading level) segments, one run per chunk() call
+    """
+    if path is None:
+        return [[(synthetic_document(), 0)]]
+
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "rb") as f:
+        if ext == ".pdf":
+            from document_parser import iter_pdf_pages
+            return [[(text, 0)] for _, text in iter_pdf_pages(f)]
+        if ext == ".docx":
+            from docx import Document
+            from document_parser import docx_heading_level
+            return [[
+                (paragraph.text, docx_heading_level(paragraph))
+                for paragraph in Document(f).paragraphs
+                if paragraph.text.strip()
+            ]]
+        return [[(f.read().decode("utf-8"), 0)]]
+
+
+def synthetic_document(sections=40, seed=0):
+    rng = random.Random(seed)
+    topics = ["payment", "delivery", "warranty", "liability", "termination", "confidentiality", "pricing", "support"]
+    words = (
+        "the supplier shall provide customer with all services described in this agreement within "
+        "thirty days of written notice including any fees invoices reports and records required by law"
+    ).split()
+    parts = []
+    for number in range(1, sections + 1):
+        topic = rng.choice(topics)
+        parts.append(f"{number}. {topic.title()} terms")
+        paragraphs = []
+        for _ in range(rng.randint(2, 5)):
+            sentences = [
+                " ".join([topic] + rng.choices(words, k=rng.randint(6, 40))).capitalize() + "."
+                for _ in range(rng.randint(2, 8))
+            ]
+            paragraphs.append(" ".join(sentences))
+        parts.append("\n\n".join(paragraphs))
+    return "\n".join(parts)
+
+
+def normalize(text):
+    return " ".join(text.split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--file", help="PDF, DOCX or text file (default: synthetic document)")
+    parser.add_argument("--strategies", nargs="+", default=list(CHUNK_STRATEGIES))
+    parser.add_argument("--max-tokens", type=int, default=CHUNK_MAX_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = load_runs(args.file)
+    text = "\n\n".join(segment for run in runs for segment, _ in run)
+    tokenizer = get_tokenizer()
+    manager = EmbeddingManager(use_cache=False)
+    # the window the model actually reads, without [CLS] and [SEP]
+    model_window = manager.model.max_seq_length - 2
+
+    rng = random.Random(0)
+    sentences = [sentence for sentence, _ in split_sentences(text) if len(sentence.split()) >= 8]
+    queries = rng.sample(sentences, min(args.queries, len(sentences)))
+    query_vectors = manager.generate_embeddings(queries, normalize=True)
+
+    print(f"{len(text)} characters, {len(queries)} queries, model window {model_window} tokens")
+    for strategy in args.strategies:
+        chunker = Chunker(strategy, args.max_tokens, args.overlap_tokens, tokenizer)
+        start = time.perf_counter()
+        chunks = [chunk for run in runs for chunk in chunker.chunk(run)]
+        chunk_seconds = time.perf_counter() - start
+
+        counts = np.array(tokenizer.count(chunks))
+        over = int(np.sum(counts > model_window))
+
+        start = time.perf_counter()
+        chunk_vectors = manager.generate_embeddings(chunks, normalize=True)
+        embed_seconds = time.perf_counter() - start
+
+        normalized = [normalize(chunk) for chunk in chunks]
+        top = np.argsort(-(query_vectors @ chunk_vectors.T), axis=1)[:, :args.top_k]
+        hits = sum(
+            any(normalize(query) in normalized[i] for i in row)
+            for query, row in zip(queries, top)
+        )
+
+        print(
+            f"  {strategy:8} chunks={len(chunks):6d}  chunk={chunk_seconds * 1000:8.1f} ms  "
+            f"tokens mean={counts.mean():6.1f} max={counts.max():5d} over_window={over:5d}  "
+            f"embed={embed_seconds:7.2f} s  hit@{args.top_k}={hits / max(1, len(queries)):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
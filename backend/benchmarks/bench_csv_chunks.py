@@ -0,0 +1,76 @@
+"""
+Benchmark: DataFrame.iterrows row serialization vs the vectorized serializer
+
+Usage:
+    python benchmarks/bench_csv_chunks.py --rows 100000 1000000 --cols 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from document_parser import serialize_rows
+
+
+def iterrows_path(df):
+    # the previous parse_csv loop
+    chunks = []
+    for idx, row in df.iterrows():
+        row_text = " | ".join([f"{col}: {val}" for col, val in row.items()])
+        chunks.append(row_text)
+    return chunks
+
+
+def make_frame(rows, cols, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(cols):
+        kind = i % 4
+        if kind == 0:
+            data[f"sku_{i}"] = [f"SKU-{n:08d}" for n in rng.integers(0, 10 ** 8, rows)]
+        elif kind == 1:
+            data[f"qty_{i}"] = rng.integers(0, 1000, rows)
+        elif kind == 2:
+            data[f"price_{i}"] = rng.random(rows).round(2) * 100
+        else:
+            data[f"name_{i}"] = rng.choice(["alpha", "beta", "gamma", "delta"], rows)
+    return pd.DataFrame(data)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--cols", type=int, default=8)
+    parser.add_argument("--rows-per-chunk", type=int, default=20)
+    parser.add_argument("--skip-iterrows-above", type=int, default=1000000,
+                        help="skip the slow path for larger frames")
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        df = make_frame(rows, args.cols)
+        print(f"\n{rows} rows x {args.cols} cols")
+
+        if rows <= args.skip_iterrows_above:
+            elapsed, chunks = timed(iterrows_path, df)
+            print(f"  iterrows            {elapsed:8.2f} s  {len(chunks):9} chunks  {rows / elapsed:12.0f} rows/s")
+
+        elapsed, chunks = timed(serialize_rows, df)
+        print(f"  vectorized          {elapsed:8.2f} s  {len(chunks):9} chunks  {rows / elapsed:12.0f} rows/s")
+
+        elapsed, chunks = timed(serialize_rows, df, args.rows_per_chunk)
+        print(f"  vectorized x{args.rows_per_chunk:<5}  {elapsed:8.2f} s  {len(chunks):9} chunks  {rows / elapsed:12.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: embedding backends (torch, onnx, onnx-int8) on the same model
+
+Each backend runs in its own process, so load time and RSS aren't shared.
+For every backend it reports
+  - load time and peak RSS
+  - texts/s over all batches, and p50/p99 latency per batch
+  - retrieval quality against torch: mean cosine between the two vectors
+    of each text, and recall@k of each text's top-k neighbours
+
+Texts come from --corpus (one text per line) or are generated.
+
+Usage:
+    python benchmarks/bench_embedding_backends.py --texts 2000 --batch-size 32
+    python benchmarks/bench_embedding_backends.py --corpus chunks.txt --backends torch onnx-int8
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_texts(corpus, count):
+    if corpus:
+        with open(corpus, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        return texts[:count]
+
+    rng = np.random.default_rng(0)
+    words = (
+        "invoice contract payment delivery customer report quarterly revenue policy "
+        "employee schedule shipment warranty refund account balance tax audit budget "
+        "meeting project deadline supplier order product service support renewal"
+    ).split()
+    return [" ".join(rng.choice(words, size=rng.integers(8, 60))) for _ in range(count)]
+
+
+def run_backend(args):
+    """
+    Worker process: load one backend, encode the texts, write vectors + stats
+    """
+    from embeddings import EmbeddingManager
+
+    texts = load_texts(args.corpus, args.texts)
+
+    start = time.perf_counter()
+    manager = EmbeddingManager(model_name=args.model, use_cache=False, backend=args.worker)
+    load_seconds = time.perf_counter() - start
+
+    # warm-up so one-off graph setup isn't counted
+    manager.generate_embeddings(texts[:args.batch_size])
+
+    latencies = []
+    batches = []
+    start = time.perf_counter()
+    for offset in range(0, len(texts), args.batch_size):
+        batch_start = time.perf_counter()
+        batches.append(manager.generate_embeddings(texts[offset:offset + args.batch_size], normalize=True))
+        latencies.append(time.perf_counter() - batch_start)
+    elapsed = time.perf_counter() - start
+
+    np.save(args.output, np.concatenate(batches))
+    # ru_maxrss is in KB on Linux
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({
+        "load_seconds": load_seconds,
+        "texts_per_second": len(texts) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "rss_mb": rss_mb
+    }))
+
+
+def neighbours(vectors, k):
+    scores = vectors @ vectors.T
+    np.fill_diagonal(scores, -np.inf)
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def quality(reference, vectors, k):
+    cosine = float(np.mean(np.sum(reference * vectors, axis=1)))
+    expected = neighbours(reference, k)
+    found = neighbours(vectors, k)
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(expected, found)])
+    return cosine, float(recall)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--corpus", help="File with one text per line")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_backend(args)
+        return
+
+    results = {}
+    vectors = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in args.backends:
+            output = os.path.join(tmp, f"{backend}.npy")
+            command = [
+                sys.executable, os.path.abspath(__file__),
+                "--worker", backend, "--output", output,
+                "--model", args.model, "--texts", str(args.texts),
+                "--batch-size", str(args.batch_size)
+            ]
+            if args.corpus:
+                command += ["--corpus", args.corpus]
+
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                error = (completed.stderr.strip().splitlines() or [f"exit code {completed.returncode}"])[-1]
+                print(f"  {backend:10} failed: {error}")
+                continue
+            results[backend] = json.loads(completed.stdout.strip().splitlines()[-1])
+            vectors[backend] = np.load(output)
+
+    print(f"{args.model}, {args.texts} texts, batch size {args.batch_size}")
+    for backend, stats in results.items():
+        line = (
+            f"  {backend:10} load={stats['load_seconds']:6.2f} s  "
+            f"{stats['texts_per_second']:8.1f} texts/s  "
+            f"p50={stats['p50_ms']:7.1f} ms  p99={stats['p99_ms']:7.1f} ms  "
+            f"rss={stats['rss_mb']:7.1f} MB"
+        )
+        if "torch" in vectors and backend != "torch":
+            cosine, recall = quality(vectors["torch"], vectors[backend], args.k)
+            line += f"  cos_vs_torch={cosine:.4f}  recall@{args.k}={recall:.3f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: Python-list embeddings vs a float32 ndarray sent in upsert batches
+
+Compares building the upsert request bodies for an upload from
+  - list path:    embedding.tolist() per vector + one PointStruct per chunk
+  - ndarray path: one float32 matrix, converted one upsert batch at a time
+
+Usage:
+    python benchmarks/bench_embedding_buffers.py --chunks 10000 --dim 384
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+from qdrant_client.models import Batch, PointStruct
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def list_path(matrix, texts, batch_size):
+    # what generate_embeddings + add_documents used to do
+    embeddings = [embedding.tolist() for embedding in matrix]
+    points = [
+        PointStruct(id=str(uuid.uuid4()), vector=embedding, payload={"text": text, "chunk_index": i})
+        for i, (text, embedding) in enumerate(zip(texts, embeddings))
+    ]
+    return len(points)
+
+
+def ndarray_path(matrix, texts, batch_size):
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    sent = 0
+    for start in range(0, len(texts), batch_size):
+        end = min(start + batch_size, len(texts))
+        batch = Batch(
+            ids=[str(uuid.uuid4()) for _ in range(start, end)],
+            vectors=matrix[start:end].tolist(),
+            payloads=[{"text": texts[i], "chunk_index": i} for i in range(start, end)]
+        )
+        sent += len(batch.ids)
+    return sent
+
+
+def measure(func, matrix, texts, batch_size):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(matrix, texts, batch_size)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    # model.encode returns float32 already
+    matrix = rng.standard_normal((args.chunks, args.dim), dtype=np.float32)
+    texts = [f"chunk {i}" for i in range(args.chunks)]
+
+    print(f"{args.chunks} chunks x {args.dim} dims, float32 matrix = {matrix.nbytes / 1e6:.1f} MB")
+    for name, func in (("list", list_path), ("ndarray", ndarray_path)):
+        elapsed, peak = measure(func, matrix, texts, args.batch_size)
+        print(f"  {name:8} time={elapsed:7.3f} s  peak_alloc={peak / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Benchmark: local vector store (exact / HNSW) vs Qdrant
+
+Indexes the same synthetic points in each backend and reports
+  - ingest throughput
+  - p50/p95 search latency, dense and hybrid (with query text), over the
+    whole store and scoped to one tenant
+  - recall@k of each backend's dense results against exact top-k
+
+Vectors are clustered like real embeddings, so nearest neighbours are
+meaningful. Qdrant is reached through QDRANT_URL / QDRANT_API_KEY (.env)
+and uses a throwaway collection (--collection), which is deleted afterwards.
+
+Usage:
+    python benchmarks/bench_vector_store.py --points 20000 --queries 200
+    python benchmarks/bench_vector_store.py --points 200000 --backends local local-hnsw
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BACKENDS = ("local", "local-hnsw", "qdrant")
+WORDS = (
+    "invoice contract payment delivery customer report quarterly revenue policy employee "
+    "schedule shipment warranty refund account balance tax audit budget supplier"
+).split()
+# vocabulary for chunk text; word frequencies follow Zipf's law like real text
+VOCABULARY = [f"{word}{n}" if n else word for n in range(100) for word in WORDS]
+
+
+def make_points(count, dim, tenants, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, count // 50), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)] + 0.3 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ranks = np.minimum(rng.zipf(1.3, (count, 40)), len(VOCABULARY)) - 1
+    texts = [
+        " ".join(VOCABULARY[rank] for rank in row) + f" SKU-{i:06d}"
+        for i, row in enumerate(ranks)
+    ]
+    tenant_of = rng.integers(0, tenants, count)
+    return vectors, texts, tenant_of
+
+
+def make_store(backend, path, dim, collection):
+    if backend == "qdrant":
+        os.environ["QDRANT_COLLECTION"] = collection
+        from qdrant_utils import QdrantManager
+        store = QdrantManager()
+        store.clear_collection()
+        return store
+
+    from local_store import LocalVectorStore
+    # local uses exact search throughout; local-hnsw indexes everything
+    threshold = sys.maxsize if backend == "local" else 0
+    return LocalVectorStore(os.path.join(path, backend), vector_size=dim, hnsw_threshold=threshold)
+
+
+def ingest(store, vectors, texts, tenant_of, batch_size=1000):
+    start = time.perf_counter()
+    for tenant in np.unique(tenant_of):
+        rows = np.flatnonzero(tenant_of == tenant)
+
+        def batches():
+            for begin in range(0, len(rows), batch_size):
+                batch = rows[begin:begin + batch_size]
+                yield [{"text": texts[i]} for i in batch], vectors[batch]
+
+        store.add_document_stream(
+            batches(),
+            {"tenant": f"t{tenant}", "document_id": f"doc-{tenant}", "filename": f"doc-{tenant}.txt"}
+        )
+    return time.perf_counter() - start
+
+
+def timed_searches(store, queries, texts, top_k, tenant=None):
+    latencies = []
+    results = []
+    for query, text in zip(queries, texts):
+        start = time.perf_counter()
+        hits = store.search(query, top_k=top_k, tenant=tenant, query_text=text)
+        latencies.append(time.perf_counter() - start)
+        results.append(hits)
+    return np.array(latencies) * 1000, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--tenants", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["local", "qdrant"])
+    parser.add_argument("--collection", default="filefox_benchmark")
+    args = parser.parse_args()
+    load_dotenv()
+
+    vectors, texts, tenant_of = make_points(args.points, args.dim, args.tenants)
+    rng = np.random.default_rng(1)
+    picked = rng.choice(args.points, args.queries, replace=False)
+    queries = vectors[picked] + 0.1 * rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    # a few words of the chunk plus its SKU, like a question about a specific item
+    query_texts = [" ".join(texts[i].split()[:3] + texts[i].split()[-1:]) for i in picked]
+
+    # exact neighbours for recall
+    scores = queries @ vectors.T
+    truth = np.argsort(-scores, axis=1)[:, :args.top_k]
+    point_of = {text: i for i, text in enumerate(texts)}
+
+    print(f"{args.points} points x {args.dim} dims, {args.tenants} tenants, {args.queries} queries, top-{args.top_k}")
+    with tempfile.TemporaryDirectory() as path:
+        for backend in args.backends:
+            store = make_store(backend, path, args.dim, args.collection)
+            try:
+                seconds = ingest(store, vectors, texts, tenant_of)
+
+                dense_ms, dense = timed_searches(store, queries, [None] * len(queries), args.top_k)
+                hybrid_ms, _ = timed_searches(store, queries, query_texts, args.top_k)
+                scoped_ms, _ = timed_searches(store, queries, query_texts, args.top_k, tenant="t0")
+
+                # texts are unique (they end in the point's SKU)
+                recall = np.mean([
+                    len({point_of[hit["text"]] for hit in hits} & set(row)) / args.top_k
+                    for hits, row in zip(dense, truth)
+                ])
+
+                print(
+                    f"  {backend:10} ingest={args.points / seconds:8.0f} points/s  "
+                    f"dense p50={np.percentile(dense_ms, 50):6.2f} p95={np.percentile(dense_ms, 95):6.2f} ms  "
+                    f"hybrid p50={np.percentile(hybrid_ms, 50):6.2f} p95={np.percentile(hybrid_ms, 95):6.2f} ms  "
+                    f"tenant p50={np.percentile(scoped_ms, 50):6.2f} ms  recall@{args.top_k}={recall:.3f}"
+                )
+            finally:
+                if backend == "qdrant":
+                    store.client.delete_collection(args.collection)
+                store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Load test: check that / and /stats stay responsive while uploads run
+
+Usage (backend running on localhost:8000):
+    python benchmarks/load_test.py path/to/large.pdf --uploads 4 --duration 30
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def probe(client, path, stop, latencies, interval):
+    """Hit a light endpoint repeatedly and record its latency"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            print(f"probe {path} failed: {e}")
+        await asyncio.sleep(interval)
+
+
+async def uploader(client, file_path, stop, durations):
+    """Upload the same file in a loop"""
+    filename = os.path.basename(file_path)
+    with open(file_path, "rb") as f:
+        content = f.read()
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.post("/upload", files={"file": (filename, content)})
+        if response.status_code >= 400:
+            print(f"upload failed: HTTP {response.status_code} {response.text[:200]}")
+        durations.append(time.perf_counter() - start)
+
+
+async def run_phase(base_url, file_path, uploads, duration, interval):
+    stop = asyncio.Event()
+    probes = {"/": [], "/stats": []}
+    upload_durations = []
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=600) as client:
+        tasks = [
+            asyncio.create_task(probe(client, path, stop, latencies, interval))
+            for path, latencies in probes.items()
+        ]
+        tasks += [
+            asyncio.create_task(uploader(client, file_path, stop, upload_durations))
+            for _ in range(uploads)
+        ]
+        await asyncio.sleep(duration)
+        stop.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return probes, upload_durations
+
+
+def report(label, probes, upload_durations):
+    print(f"\n== {label}")
+    for path, latencies in probes.items():
+        if not latencies:
+            print(f"  {path:8} no successful requests")
+            continue
+        print(
+            f"  {path:8} n={len(latencies):5}  "
+            f"p50={percentile(latencies, 50) * 1000:8.1f} ms  "
+            f"p95={percentile(latencies, 95) * 1000:8.1f} ms  "
+            f"max={max(latencies) * 1000:8.1f} ms"
+        )
+    if upload_durations:
+        print(f"  uploads  n={len(upload_durations):5}  mean={statistics.mean(upload_durations):.2f} s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("file", help="document to upload repeatedly")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--uploads", type=int, default=4, help="concurrent upload loops")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per phase")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between probes")
+    args = parser.parse_args()
+
+    idle = await run_phase(args.url, args.file, 0, min(args.duration, 10), args.interval)
+    report("idle", *idle)
+
+    loaded = await run_phase(args.url, args.file, args.uploads, args.duration, args.interval)
+    report(f"{args.uploads} concurrent uploads", *loaded)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
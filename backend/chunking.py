@@ -0,0 +1,389 @@
+import functools
+import logging
+import os
+import re
+from collections import deque
+from itertools import groupby, islice
+from typing import Generator, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Chunking settings (override in .env)
+# CHUNK_STRATEGY: fixed (500-character windows), token, sentence or heading
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "fixed").lower()
+# all-MiniLM-L6-v2 reads 256 tokens including [CLS] and [SEP]
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "254"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+# tokenizer used to count tokens; should match the embedding model
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "sentence-transformers/all-MiniLM-L6-v2")
+
+CHUNK_STRATEGIES = ("fixed", "token", "sentence", "heading")
+
+# The token strategy tokenizes text once this much is buffered, then keeps
+# only what follows the last finished window
+TOKEN_BUFFER_CHARS = 64 * 1024
+# Sentences counted per tokenizer call while packing
+PACK_COUNT_BATCH = 256
+
+# (text, heading level): level 0 is body text, 1+ a heading from the
+# document's structure (e.g. DOCX heading styles)
+Segment = Tuple[str, int]
+
+_paragraph_break = re.compile(r"\n\s*\n")
+# sentence end: terminal punctuation (and closing quotes/brackets) before whitespace
+_sentence_end = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+_markdown_heading = re.compile(r"^(#{1,6})\s+(.+?)\s*#*$")
+_numbered_heading = re.compile(r"^((?:\d+\.)*\d+)\.?\s+(\S.*)$")
+
+
+def iter_chunks(
+    segments: Iterable[str],
+    chunk_size: int = 500,
+    overlap: int = 50,
+    separator: str = "\n\n"
+) -> Iterator[str]:
+    """
+    Split a stream of text segments (pages, paragraphs) into overlapping chunks
+
+    Produces the same chunks as chunk_text(separator.join(segments)) while
+    only keeping about one chunk of text in memory.
+    """
+    step = chunk_size - overlap
+    buffer = ""
+    first = True
+
+    for segment in segments:
+        buffer += segment if first else separator + segment
+        first = False
+
+        # every window that starts in the buffer and fits in it is final
+        while len(buffer) >= chunk_size:
+            chunk = buffer[:chunk_size].strip()
+            if chunk:
+                yield chunk
+            buffer = buffer[step:]
+
+    if not buffer.strip():
+        return
+
+    start = 0
+    while start < len(buffer):
+        chunk = buffer[start:start + chunk_size].strip()
+        if chunk:
+            yield chunk
+        start += step
+
+
+class Tokenizer:
+    """
+    Token counts and offsets from the embedding model's (fast) tokenizer
+    """
+
+    def __init__(self, name: str = CHUNK_TOKENIZER):
+        from transformers import AutoTokenizer
+
+        self.name = name
+        self._tokenizer = AutoTokenizer.from_pretrained(name)
+        # windows are cut here, so don't warn about texts longer than the model's limit
+        self._tokenizer.model_max_length = 1 << 30
+
+    def count(self, texts: List[str]) -> List[int]:
+        """
+        Number of tokens in each text (without special tokens)
+        """
+        if not texts:
+            return []
+        return [len(ids) for ids in self._tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+    def offsets(self, text: str) -> List[Tuple[int, int]]:
+        """
+        (start, end) character offsets of each token in text
+        """
+        return self._tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+
+
+@functools.lru_cache(maxsize=None)
+def get_tokenizer(name: str = CHUNK_TOKENIZER) -> Tokenizer:
+    """
+    Shared Tokenizer, loaded on first use
+    """
+    logger.info(f"Loading chunking tokenizer: {name}")
+    return Tokenizer(name)
+
+
+def heading_level(line: str) -> int:
+    """
+    Heading level of a line of plain text (0 if it doesn't look like a heading)
+
+    Recognizes markdown headings ("## Scope"), numbered section titles
+    ("2.1 Scope") and short all-caps lines ("TERMS AND CONDITIONS").
+    """
+    line = line.strip()
+    if not line or len(line) > 100:
+        return 0
+
+    match = _markdown_heading.match(line)
+    if match:
+        return len(match.group(1))
+
+    # titles are short and don't end like sentences
+    if len(line.split()) > 12 or line[-1] in ".,;:!?":
+        return 0
+
+    match = _numbered_heading.match(line)
+    if match and match.group(2)[0].isupper():
+        return match.group(1).count(".") + 1
+
+    if line.isupper() and sum(c.isalpha() for c in line) >= 3:
+        return 1
+
+    return 0
+
+
+def split_sentences(text: str) -> Iterator[Tuple[str, bool]]:
+    """
+    Split text into sentences with whitespace collapsed
+
+    Yields:
+        (sentence, starts a new paragraph) pairs
+    """
+    for paragraph in _paragraph_break.split(text):
+        new_paragraph = True
+        start = 0
+        for match in _sentence_end.finditer(paragraph):
+            sentence = " ".join(paragraph[start:match.end()].split())
+            if sentence:
+                yield sentence, new_paragraph
+                new_paragraph = False
+            start = match.end()
+        sentence = " ".join(paragraph[start:].split())
+        if sentence:
+            yield sentence, new_paragraph
+
+
+class Chunker:
+    """
+    Splits a document's text into chunks using one of CHUNK_STRATEGIES
+
+    - fixed:    overlapping 500-character windows (the original behaviour)
+    - token:    windows of max_tokens model tokens, cut between words
+    - sentence: whole sentences packed up to max_tokens, overlapping by
+                up to overlap_tokens of trailing sentences
+    - heading:  like sentence, but chunks never span a section and each
+                starts with its heading path ("Terms > Payment")
+
+    Every strategy is a single pass over the text that holds about one
+    chunk in memory (plus up to TOKEN_BUFFER_CHARS of text for token).
+    Create one Chunker per document: the heading strategy carries the
+    current section across chunk() calls (e.g. from one PDF page to the next).
+    """
+
+    def __init__(
+        self,
+        strategy: str = CHUNK_STRATEGY,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        tokenizer: Optional[Tokenizer] = None
+    ):
+        """
+        Args:
+            strategy: One of CHUNK_STRATEGIES
+            max_tokens: Token budget per chunk (token, sentence and heading)
+            overlap_tokens: Tokens shared by consecutive chunks
+            tokenizer: Token counter (defaults to the CHUNK_TOKENIZER model's)
+        """
+        if strategy not in CHUNK_STRATEGIES:
+            raise ValueError(f"Unknown chunk strategy: {strategy} (expected one of {', '.join(CHUNK_STRATEGIES)})")
+        if max_tokens <= overlap_tokens:
+            raise ValueError("max_tokens must be larger than overlap_tokens")
+
+        self.strategy = strategy
+        self.max_tokens = max_tokens
+        self.overlap_tokens = max(0, overlap_tokens)
+        self._tokenizer = tokenizer
+        # heading stack of the current section: [(level, title), ...]
+        self._headings: List[Tuple[int, str]] = []
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer()
+        return self._tokenizer
+
+    def chunk(self, segments: Iterable[Segment]) -> Iterator[str]:
+        """
+        Chunk a run of segments (e.g. one PDF page or a DOCX's paragraphs)
+        """
+        if self.strategy == "fixed":
+            return iter_chunks(text for text, _ in segments)
+        if self.strategy == "token":
+            return self._token_chunks(text for text, _ in segments)
+        if self.strategy == "sentence":
+            return self._pack(
+                unit for text, _ in segments for unit in split_sentences(text)
+            )
+        return self._heading_chunks(segments)
+
+    def chunk_text(self, text: str) -> Iterator[str]:
+        """
+        Chunk a single block of body text
+        """
+        return self.chunk([(text, 0)])
+
+    def _token_windows(self, text: str, budget: int, final: bool = True) -> Generator[str, None, str]:
+        """
+        Overlapping windows of at most `budget` tokens, cut between words where possible
+
+        With final=False more text may follow, so the window reaching the end
+        of text isn't emitted; the generator returns the text it would start at.
+        """
+        offsets = [span for span in self.tokenizer.offsets(text) if span[1] > span[0]]
+        count = len(offsets)
+
+        def joined(i: int) -> bool:
+            # token i continues the word of token i - 1
+            return offsets[i][0] == offsets[i - 1][1]
+
+        start = 0
+        while start < count:
+            end = min(start + budget, count)
+            if end >= count and not final:
+                return text[offsets[start][0]:]
+            if end < count:
+                cut = end
+                while cut > start + 1 and joined(cut):
+                    cut -= 1
+                # a single word longer than the budget is cut mid-word
+                if cut > start + 1:
+                    end = cut
+
+            chunk = text[offsets[start][0]:offsets[end - 1][1]].strip()
+            if chunk:
+                yield chunk
+            if end >= count:
+                return ""
+
+            next_start = max(end - self.overlap_tokens, start + 1)
+            while next_start < end and joined(next_start):
+                next_start += 1
+            start = next_start
+        return ""
+
+    def _token_chunks(self, texts: Iterable[str]) -> Iterator[str]:
+        """
+        Token windows over texts joined by blank lines, tokenized TOKEN_BUFFER_CHARS at a time
+        """
+        buffer = ""
+        for text in texts:
+            buffer = buffer + "\n\n" + text if buffer else text
+            if len(buffer) >= TOKEN_BUFFER_CHARS:
+                # segments end on whitespace, so the unfinished tail tokenizes the same on its own
+                buffer = yield from self._token_windows(buffer, self.max_tokens, final=False)
+        if buffer.strip():
+            yield from self._token_windows(buffer, self.max_tokens)
+
+    def _pack(self, units: Iterable[Tuple[str, bool]], prefix: str = "") -> Iterator[str]:
+        """
+        Pack (sentence, new paragraph) units into chunks of at most max_tokens
+
+        Sentences longer than the budget are split into token windows.
+        Units are read and counted PACK_COUNT_BATCH at a time, so only the
+        current window is kept.
+        """
+        units = iter(units)
+        budget = None
+        window = deque()
+        total = 0
+
+        def emit() -> str:
+            parts = []
+            for i, (text, new_paragraph, _) in enumerate(window):
+                if i:
+                    parts.append("\n\n" if new_paragraph else " ")
+                parts.append(text)
+            return prefix + "".join(parts)
+
+        while True:
+            batch = list(islice(units, PACK_COUNT_BATCH))
+            if not batch:
+                break
+            if budget is None:
+                budget = self.max_tokens
+                if prefix:
+                    budget = max(self.overlap_tokens + 1, budget - self.tokenizer.count([prefix])[0])
+            counts = self.tokenizer.count([text for text, _ in batch])
+
+            for (text, new_paragraph), count in zip(batch, counts):
+                if count > budget:
+                    if window:
+                        yield emit()
+                        window.clear()
+                        total = 0
+                    for piece in self._token_windows(text, budget):
+                        yield prefix + piece
+                    continue
+
+                if window and total + count > budget:
+                    yield emit()
+                    # carry trailing sentences into the next chunk as overlap
+                    kept = deque()
+                    kept_total = 0
+                    while window:
+                        last = window[-1][2]
+                        if kept_total + last > self.overlap_tokens or kept_total + last + count > budget:
+                            break
+                        kept.appendleft(window.pop())
+                        kept_total += last
+                    window = kept
+                    total = kept_total
+
+                window.append((text, new_paragraph, count))
+                total += count
+
+        if window:
+            yield emit()
+
+    def _heading_prefix(self) -> str:
+        if not self._headings:
+            return ""
+        return " > ".join(title for _, title in self._headings) + "\n"
+
+    def _enter_heading(self, level: int, title: str):
+        while self._headings and self._headings[-1][0] >= level:
+            self._headings.pop()
+        self._headings.append((level, title))
+
+    def _heading_texts(self, segments: Iterable[Segment]) -> Iterator[Optional[str]]:
+        """
+        Body text of segments, with None where a heading starts a new section
+
+        The heading stack is updated before its None is yielded.
+        """
+        for text, level in segments:
+            if level > 0:
+                self._enter_heading(level, " ".join(text.split()))
+                yield None
+                continue
+
+            # look for headings inside plain text, line by line
+            body: List[str] = []
+            for line in text.splitlines():
+                line_level = heading_level(line)
+                if line_level:
+                    yield "\n".join(body)
+                    body = []
+                    match = _markdown_heading.match(line.strip())
+                    self._enter_heading(line_level, match.group(2) if match else " ".join(line.split()))
+                    yield None
+                else:
+                    body.append(line)
+            yield "\n".join(body)
+
+    def _heading_chunks(self, segments: Iterable[Segment]) -> Iterator[str]:
+        # each run of body text is a section, packed as it streams in
+        for is_body, texts in groupby(self._heading_texts(segments), key=lambda text: text is not None):
+            if is_body:
+                yield from self._pack(
+                    (unit for text in texts for unit in split_sentences(text)),
+                    self._heading_prefix()
+                )
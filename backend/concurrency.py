@@ -0,0 +1,104 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pool sizes (override in .env)
+# EMBED_WORKERS: threads running model.encode (torch releases the GIL while encoding)
+# PARSE_WORKERS: processes parsing documents, 0 parses on the embed threads instead
+# IO_WORKERS: threads running blocking network calls (Qdrant, S3)
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "2"))
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "2"))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+
+_embed_executor: Optional[ThreadPoolExecutor] = None
+_parse_executor: Optional[Executor] = None
+_io_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_embed_executor() -> ThreadPoolExecutor:
+    """
+    Bounded thread pool for CPU-bound model inference
+    """
+    global _embed_executor
+    if _embed_executor is None:
+        _embed_executor = ThreadPoolExecutor(
+            max_workers=max(1, EMBED_WORKERS),
+            thread_name_prefix="filefox-embed"
+        )
+    return _embed_executor
+
+
+def get_parse_executor() -> Executor:
+    """
+    Bounded process pool for document parsing (falls back to the embed threads)
+    """
+    global _parse_executor
+    if _parse_executor is None:
+        if PARSE_WORKERS > 0:
+            # spawn, not fork: the parent has model and client threads running
+            _parse_executor = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            _parse_executor = get_embed_executor()
+    return _parse_executor
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """
+    Bounded thread pool for blocking network clients
+    """
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            max_workers=max(1, IO_WORKERS),
+            thread_name_prefix="filefox-io"
+        )
+    return _io_executor
+
+
+async def _run(executor: Executor, func: Callable, *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_embed(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run model inference off the event loop
+    """
+    return await _run(get_embed_executor(), func, *args, **kwargs)
+
+
+def submit_embed(func: Callable, *args, **kwargs) -> Future:
+    """
+    Run model inference on the embed pool from a worker thread (e.g. an ingest job)
+
+    Sharing the pool with queries keeps at most EMBED_WORKERS encodes running.
+    """
+    return get_embed_executor().submit(func, *args, **kwargs)
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run a blocking network call off the event loop
+    """
+    return await _run(get_io_executor(), func, *args, **kwargs)
+
+
+def shutdown_executors():
+    """
+    Shut down all pools, waiting for running work to finish
+    """
+    global _embed_executor, _parse_executor, _io_executor
+    for executor in (_parse_executor, _embed_executor, _io_executor):
+        if executor is not None:
+            executor.shutdown(wait=True)
+    _embed_executor = _parse_executor = _io_executor = None
+    logger.info("Worker pools shut down")
@@ -0,0 +1,136 @@
+import logging
+import math
+import os
+from typing import Dict, List
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Context packing settings (override in .env)
+# CONTEXT_TOKEN_BUDGET: LLM tokens the retrieved context may use; phi3 runs with a
+# 2048-token window by default, shared with the prompt template, question and answer
+# CONTEXT_CHARS_PER_TOKEN: characters per LLM token, used to estimate token counts
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_CHARS_PER_TOKEN = float(os.getenv("CONTEXT_CHARS_PER_TOKEN", "3.5"))
+
+# Longest text overlap looked for between neighbouring chunks, in characters
+MAX_OVERLAP_CHARS = 300
+# Shorter matches are treated as coincidence, not chunk overlap
+MIN_OVERLAP_CHARS = 8
+
+context_tokens = metrics.histogram(
+    "context_tokens",
+    "Estimated LLM tokens of packed context per query",
+    buckets=(64, 128, 256, 512, 768, 1024, 1536, 2048, 4096)
+)
+context_chunks_dropped = metrics.counter(
+    "context_chunks_dropped",
+    "Retrieved chunks left out of the context (duplicates or over budget)"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimated number of LLM tokens in text
+    """
+    return math.ceil(len(text) / CONTEXT_CHARS_PER_TOKEN)
+
+
+def merge_overlapping(first: str, second: str) -> str:
+    """
+    Join two consecutive chunks, dropping the text they share
+    """
+    for size in range(min(len(first), len(second), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if first.endswith(second[:size]):
+            return first + second[size:]
+    return first + "\n" + second
+
+
+def _passages(results: List[Dict]) -> List[Dict]:
+    """
+    Merge results that are neighbouring chunks of the same document
+    """
+    by_document: Dict[str, List[Dict]] = {}
+    for result in results:
+        key = result["metadata"].get("document_id") or result["metadata"].get("filename", "")
+        by_document.setdefault(key, []).append(result)
+
+    passages = []
+    for document_results in by_document.values():
+        document_results.sort(key=lambda result: result["metadata"].get("chunk_index", 0))
+        passage = None
+        for result in document_results:
+            chunk_index = result["metadata"].get("chunk_index", 0)
+            if passage is not None and chunk_index == passage["last_index"]:
+                # the same chunk twice
+                passage["results"].append(result)
+                continue
+            if passage is not None and chunk_index == passage["last_index"] + 1:
+                passage["text"] = merge_overlapping(passage["text"], result["text"])
+                passage["score"] = max(passage["score"], result["score"])
+                passage["last_index"] = chunk_index
+                passage["results"].append(result)
+                continue
+            passage = {
+                "text": result["text"],
+                "score": result["score"],
+                "last_index": chunk_index,
+                "results": [result]
+            }
+            passages.append(passage)
+    return passages
+
+
+def pack_context(results: List[Dict], budget: int = CONTEXT_TOKEN_BUDGET) -> Dict:
+    """
+    Build the LLM context from search results within a token budget
+
+    Neighbouring chunks of a document are merged (dropping the text they
+    overlap by), passages already contained in another are dropped, and
+    the rest are added best score first until the budget is used up. A
+    passage that doesn't fit is skipped in favour of smaller ones below it;
+    if not even the best one fits, it is truncated.
+
+    Args:
+        results: Output of QdrantManager.search
+        budget: Estimated LLM tokens the context may use
+
+    Returns:
+        Dict with the context text, the results it includes (best first),
+        its estimated token count and how many results were left out
+    """
+    passages = sorted(_passages(results), key=lambda passage: passage["score"], reverse=True)
+
+    selected: List[Dict] = []
+    normalized: List[str] = []
+    used_tokens = 0
+    for passage in passages:
+        text = " ".join(passage["text"].split())
+        if any(text in other for other in normalized):
+            continue
+
+        tokens = estimate_tokens(passage["text"])
+        if used_tokens + tokens > budget:
+            if selected:
+                continue
+            passage["text"] = passage["text"][:int(budget * CONTEXT_CHARS_PER_TOKEN)]
+            tokens = estimate_tokens(passage["text"])
+
+        selected.append(passage)
+        normalized.append(text)
+        used_tokens += tokens
+
+    context = "\n\n".join(passage["text"] for passage in selected)
+    included = [result for passage in selected for result in passage["results"]]
+    dropped = len(results) - len(included)
+
+    context_tokens.observe(estimate_tokens(context))
+    context_chunks_dropped.inc(dropped)
+
+    return {
+        "context": context,
+        "results": included,
+        "tokens": estimate_tokens(context),
+        "dropped": dropped
+    }
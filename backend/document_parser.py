@@ -1,12 +1,24 @@
 import io
 import logging
-from typing import List
+import os
+from collections import deque
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
 from pypdf import PdfReader
 from docx import Document
 import pandas as pd
 
+from concurrency import PARSE_WORKERS, get_parse_executor
+from chunking import Chunker, Segment
+
 logger = logging.getLogger(__name__)
 
+# Rows read from a CSV at a time
+CSV_READ_CHUNKSIZE = int(os.getenv("CSV_READ_CHUNKSIZE", "10000"))
+# CSV rows grouped into one text chunk
+CSV_ROWS_PER_CHUNK = int(os.getenv("CSV_ROWS_PER_CHUNK", "1"))
+# PDF pages extracted per process pool task
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
 def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]:
     """
     Split text into overlapping chunks
@@ -29,23 +41,190 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]
     
     return chunks
 
+def _extract_page_range(source: Union[str, bytes], start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extract text from pages [start, end) of a PDF (runs in a worker process)
+
+    Returns:
+        (1-based page number, text) pairs in page order
+    """
+    reader = PdfReader(source if isinstance(source, str) else io.BytesIO(source))
+    return [
+        (page_number + 1, reader.pages[page_number].extract_text() or "")
+        for page_number in range(start, end)
+    ]
+
+def _pdf_source(file_obj: BinaryIO) -> Union[str, bytes]:
+    """
+    What worker processes open: the file path when there is one, else the bytes
+    """
+    name = getattr(file_obj, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        return name
+    file_obj.seek(0)
+    return file_obj.read()
+
+def iter_pdf_pages(file_obj: BinaryIO) -> Iterator[Tuple[int, str]]:
+    """
+    Extract page texts, in page order, across the parse process pool
+
+    Page ranges of PDF_PAGES_PER_TASK pages are extracted in parallel, with
+    at most PARSE_WORKERS ranges in flight. With PARSE_WORKERS=0, or for
+    short documents, pages are extracted in this process instead.
+
+    Yields:
+        (1-based page number, text) pairs
+    """
+    reader = PdfReader(file_obj)
+    page_count = len(reader.pages)
+
+    if PARSE_WORKERS <= 0 or page_count <= PDF_PAGES_PER_TASK:
+        for page_number, page in enumerate(reader.pages):
+            yield page_number + 1, page.extract_text() or ""
+        return
+
+    source = _pdf_source(file_obj)
+    executor = get_parse_executor()
+    ranges = iter(
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    )
+    in_flight = deque()
+
+    def submit_next() -> bool:
+        page_range = next(ranges, None)
+        if page_range is None:
+            return False
+        in_flight.append(executor.submit(_extract_page_range, source, *page_range))
+        return True
+
+    for _ in range(PARSE_WORKERS):
+        if not submit_next():
+            break
+
+    try:
+        while in_flight:
+            pages = in_flight.popleft().result()
+            submit_next()
+            yield from pages
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+def iter_pdf_chunks(file_obj: BinaryIO, chunker: Optional[Chunker] = None) -> Iterator[Dict]:
+    """
+    Stream text chunks from a PDF page by page
+
+    Chunks don't cross page boundaries, so each one carries its page number.
+    """
+    chunker = chunker or Chunker()
+    for page_number, text in iter_pdf_pages(file_obj):
+        for chunk in chunker.chunk_text(text):
+            yield {"text": chunk, "page": page_number}
+
+def docx_heading_level(paragraph) -> int:
+    """
+    Heading level from a DOCX paragraph's style ("Title" = 1, "Heading 2" = 2, body = 0)
+    """
+    style = paragraph.style.name if paragraph.style is not None else ""
+    if style == "Title":
+        return 1
+    if style.startswith("Heading"):
+        level = style[len("Heading"):].strip()
+        return int(level) if level.isdigit() else 1
+    return 0
+
+def iter_docx_chunks(file_obj: BinaryIO, chunker: Optional[Chunker] = None) -> Iterator[Dict]:
+    """
+    Stream text chunks from a DOCX paragraph by paragraph
+    """
+    doc = Document(file_obj)
+    chunker = chunker or Chunker()
+
+    paragraphs: Iterator[Segment] = (
+        (paragraph.text, docx_heading_level(paragraph))
+        for paragraph in doc.paragraphs
+        if paragraph.text.strip()
+    )
+
+    for chunk in chunker.chunk(paragraphs):
+        yield {"text": chunk}
+
+def serialize_rows(df: pd.DataFrame, rows_per_chunk: int = 1) -> List[str]:
+    """
+    Convert DataFrame rows to "col: val | col: val" strings, column by column
+
+    Args:
+        df: Rows to convert
+        rows_per_chunk: Rows joined (newline separated) into each returned chunk
+
+    Returns:
+        One string per chunk of rows
+    """
+    if df.empty:
+        return []
+
+    row_text = None
+    for col in df.columns:
+        column_text = f"{col}: " + df[col].astype(str)
+        row_text = column_text if row_text is None else row_text + " | " + column_text
+
+    rows = row_text.tolist()
+    if rows_per_chunk <= 1:
+        return rows
+
+    return [
+        "\n".join(rows[start:start + rows_per_chunk])
+        for start in range(0, len(rows), rows_per_chunk)
+    ]
+
+def iter_csv_chunks(
+    file_obj: BinaryIO,
+    chunksize: int = CSV_READ_CHUNKSIZE,
+    rows_per_chunk: int = CSV_ROWS_PER_CHUNK
+) -> Iterator[Dict]:
+    """
+    Stream text chunks from a CSV, reading `chunksize` rows at a time
+    """
+    header_sent = False
+
+    for df in pd.read_csv(file_obj, chunksize=chunksize):
+        if not header_sent:
+            headers = ", ".join(df.columns.tolist())
+            yield {"text": f"Columns: {headers}"}
+            header_sent = True
+
+        for row_text in serialize_rows(df, rows_per_chunk):
+            yield {"text": row_text}
+
+def iter_document_chunks(file_obj: BinaryIO, filename: str) -> Iterator[Dict]:
+    """
+    Stream text chunks from any supported document type
+
+    Each chunk is a dict with "text" plus any location info the format
+    provides (e.g. "page" for PDFs), which is stored in the point payload.
+
+    Parse errors are raised to the caller, which may already have
+    consumed part of the stream.
+    """
+    file_ext = filename.lower().split('.')[-1]
+
+    if file_ext == 'pdf':
+        return iter_pdf_chunks(file_obj)
+    elif file_ext == 'docx':
+        return iter_docx_chunks(file_obj)
+    elif file_ext == 'csv':
+        return iter_csv_chunks(file_obj)
+    else:
+        raise ValueError(f"Unsupported file type: {file_ext}")
+
 def parse_pdf(content: bytes) -> List[str]:
     """
     Parse PDF and extract text chunks
     """
     try:
-        pdf_file = io.BytesIO(content)
-        reader = PdfReader(pdf_file)
-        
-        all_text = []
-        for page in reader.pages:
-            text = page.extract_text()
-            if text:
-                all_text.append(text)
-        
-        full_text = "\n\n".join(all_text)
-        return chunk_text(full_text)
-    
+        return [chunk["text"] for chunk in iter_pdf_chunks(io.BytesIO(content))]
+
     except Exception as e:
         logger.error(f"Error parsing PDF: {str(e)}")
         return []
@@ -55,17 +234,8 @@ def parse_docx(content: bytes) -> List[str]:
     Parse DOCX and extract text chunks
     """
     try:
-        doc_file = io.BytesIO(content)
-        doc = Document(doc_file)
-        
-        all_text = []
-        for paragraph in doc.paragraphs:
-            if paragraph.text.strip():
-                all_text.append(paragraph.text)
-        
-        full_text = "\n\n".join(all_text)
-        return chunk_text(full_text)
-    
+        return [chunk["text"] for chunk in iter_docx_chunks(io.BytesIO(content))]
+
     except Exception as e:
         logger.error(f"Error parsing DOCX: {str(e)}")
         return []
@@ -75,23 +245,8 @@ def parse_csv(content: bytes) -> List[str]:
     Parse CSV and convert to text chunks
     """
     try:
-        csv_file = io.BytesIO(content)
-        df = pd.read_csv(csv_file)
-        
-        # Convert DataFrame to text representation
-        chunks = []
-        
-       
-        headers = ", ".join(df.columns.tolist())
-        chunks.append(f"Columns: {headers}")
-        
-        # Convert each row to a text chunk
-        for idx, row in df.iterrows():
-            row_text = " | ".join([f"{col}: {val}" for col, val in row.items()])
-            chunks.append(row_text)
-        
-        return chunks
-    
+        return [chunk["text"] for chunk in iter_csv_chunks(io.BytesIO(content))]
+
     except Exception as e:
         logger.error(f"Error parsing CSV: {str(e)}")
         return []
@@ -110,4 +265,4 @@ def parse_document(content: bytes, filename: str) -> List[str]:
         return parse_csv(content)
     else:
         logger.error(f"Unsupported file type: {file_ext}")
-        return []
\ No newline at end of file
+        return []
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+import metrics
+from concurrency import run_embed
+
+logger = logging.getLogger(__name__)
+
+# Batching limits (override in .env)
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "2"))
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "64"))
+EMBED_BATCH_MAX_INFLIGHT = int(os.getenv("EMBED_BATCH_MAX_INFLIGHT", os.getenv("EMBED_WORKERS", "2")))
+
+batch_size_histogram = metrics.histogram(
+    "embed_batch_size",
+    "Texts per model.encode call made by the query embedding batcher",
+    buckets=metrics.SIZE_BUCKETS
+)
+batch_wait_histogram = metrics.histogram(
+    "embed_batch_wait_seconds",
+    "Time a query text waited in the batcher before encoding started"
+)
+
+
+class EmbeddingBatcher:
+    """
+    Collects concurrent embedding requests into one model.encode call
+    """
+
+    def __init__(
+        self,
+        embedding_manager,
+        window_ms: float = EMBED_BATCH_WINDOW_MS,
+        max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+        max_inflight: int = EMBED_BATCH_MAX_INFLIGHT
+    ):
+        """
+        Args:
+            embedding_manager: EmbeddingManager used for encoding
+            window_ms: How long to wait for more texts after the first one arrives
+            max_batch_size: Encode as soon as this many texts are waiting
+            max_inflight: Maximum encode calls running at the same time
+        """
+        self.embedding_manager = embedding_manager
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_inflight = max(1, max_inflight)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = set()
+
+        logger.info(
+            f"Embedding batcher: window={window_ms} ms, max_batch_size={self.max_batch_size}, "
+            f"max_inflight={self.max_inflight}"
+        )
+
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_inflight)
+            self._worker = asyncio.create_task(self._run())
+
+    async def embed(self, text: str):
+        """
+        Embed a single text, sharing an encode call with concurrent callers
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Embedding vector
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future, float]]:
+        """
+        Wait for the first request, then gather more until the window closes or the batch is full
+        """
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                # drain whatever is already queued without waiting
+                if self._queue.empty():
+                    break
+                batch.append(self._queue.get_nowait())
+                continue
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            await self._slots.acquire()
+            task = asyncio.create_task(self._encode(batch))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _encode(self, batch: List[Tuple[str, asyncio.Future, float]]):
+        try:
+            # callers that went away (client disconnects) don't need encoding
+            live = [item for item in batch if not item[1].done()]
+            if not live:
+                return
+
+            started = time.perf_counter()
+            for _, _, enqueued in live:
+                batch_wait_histogram.observe(started - enqueued)
+            batch_size_histogram.observe(len(live))
+
+            try:
+                embeddings = await run_embed(
+                    self.embedding_manager.generate_embeddings,
+                    [text for text, _, _ in live]
+                )
+            except Exception as e:
+                for _, future, _ in live:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future, _), embedding in zip(live, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        """
+        Stop the batching loop and fail any requests still waiting
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, future, _ = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Embedding batcher stopped"))
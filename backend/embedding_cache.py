@@ -0,0 +1,213 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Cache settings (override in .env)
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBED_CACHE_MEMORY_ENTRIES", "10000"))
+# empty path disables the on-disk level
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "embedding_cache.sqlite3")
+EMBED_CACHE_MAX_MB = float(os.getenv("EMBED_CACHE_MAX_MB", "512"))
+
+memory_hits = metrics.counter("embed_cache_memory_hits", "Embeddings served from the in-process LRU")
+disk_hits = metrics.counter("embed_cache_disk_hits", "Embeddings served from the on-disk cache")
+misses = metrics.counter("embed_cache_misses", "Embeddings that had to be computed")
+evictions = metrics.counter("embed_cache_disk_evictions", "Entries evicted from the on-disk cache")
+
+_whitespace = re.compile(r"\s+")
+
+# rough per-row SQLite overhead on top of key and vector bytes
+_ROW_OVERHEAD = 64
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text before hashing so trivially different inputs share an entry
+    """
+    return _whitespace.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache: in-process LRU in front of a SQLite store
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        dimension: int,
+        memory_entries: int = EMBED_CACHE_MEMORY_ENTRIES,
+        path: Optional[str] = EMBED_CACHE_PATH,
+        max_mb: float = EMBED_CACHE_MAX_MB
+    ):
+        """
+        Args:
+            namespace: Identifies the model producing the vectors (part of every key)
+            dimension: Embedding dimension
+            memory_entries: Size of the in-process LRU
+            path: SQLite file for the on-disk level, None or "" to disable it
+            max_mb: Size limit of the on-disk level
+        """
+        self.namespace = namespace
+        self.dimension = dimension
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        row_bytes = 32 + dimension * 4 + _ROW_OVERHEAD
+        self.max_disk_entries = max(1, int(max_mb * 1024 * 1024 // row_bytes))
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key BLOB PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+            self._db.commit()
+            self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            logger.info(f"Embedding cache at {path}: {self._disk_count} entries, limit {self.max_disk_entries}")
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.namespace}\x00{normalize_text(text)}".encode("utf-8")).digest()
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings
+
+        Returns:
+            One float32 vector per text, None where the text isn't cached
+        """
+        keys = [self._key(text) for text in texts]
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        disk_lookups = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                else:
+                    disk_lookups.setdefault(key, []).append(i)
+
+            memory_hits.inc(len(texts) - sum(len(indexes) for indexes in disk_lookups.values()))
+
+            if disk_lookups and self._db is not None:
+                for key, vector in self._read_disk(list(disk_lookups)).items():
+                    indexes = disk_lookups.pop(key)
+                    for i in indexes:
+                        results[i] = vector
+                    disk_hits.inc(len(indexes))
+                    self._remember(key, vector)
+
+            misses.inc(sum(len(indexes) for indexes in disk_lookups.values()))
+
+        return results
+
+    def _read_disk(self, keys: List[bytes]) -> dict:
+        found = {}
+        # stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[bytes(key)] = np.frombuffer(blob, dtype=np.float32).copy()
+
+        if found:
+            now = time.time()
+            self._db.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(now, key) for key in found]
+            )
+            self._db.commit()
+        return found
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def put_many(self, texts: Sequence[str], embeddings: np.ndarray):
+        """
+        Store computed embeddings in both levels
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        keys = [self._key(text) for text in texts]
+
+        with self._lock:
+            for key, vector in zip(keys, embeddings):
+                self._remember(key, vector.copy())
+
+            if self._db is None:
+                return
+
+            now = time.time()
+            cursor = self._db.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, vector.tobytes(), now) for key, vector in zip(keys, embeddings)]
+            )
+            self._disk_count += max(cursor.rowcount, 0)
+            self._db.commit()
+
+            if self._disk_count > self.max_disk_entries:
+                self._evict()
+
+    def _evict(self):
+        """
+        Drop the least recently used tenth of the on-disk entries
+        """
+        target = int(self.max_disk_entries * 0.9)
+        excess = self._disk_count - target
+        self._db.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+            (excess,)
+        )
+        self._db.commit()
+        evictions.inc(excess)
+        self._disk_count = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.info(f"Evicted {excess} embeddings from the disk cache")
+
+    def stats(self) -> dict:
+        """
+        Current cache sizes and hit/miss counters
+        """
+        return {
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_count if self._db is not None else 0,
+            "memory_hits": memory_hits.value,
+            "disk_hits": disk_hits.value,
+            "misses": misses.value,
+        }
+
+    def close(self):
+        """
+        Checkpoint the WAL into the cache file and close it (later lookups only use memory)
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                self._db.close()
+                self._db = None
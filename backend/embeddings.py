@@ -1,63 +1,162 @@
-from sentence_transformers import SentenceTransformer
 import logging
-from typing import List
+import os
+import time
+from typing import TYPE_CHECKING, List, Optional
 import numpy as np
 
+from embedding_cache import EmbeddingCache, EMBED_CACHE_ENABLED
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
 logger = logging.getLogger(__name__)
 
+# Embedding backend (override in .env)
+# torch:     PyTorch model (default)
+# onnx:      same model exported to ONNX, run with ONNX Runtime
+# onnx-int8: ONNX model with int8 dynamic quantization
+# The onnx backends need `pip install "sentence-transformers[onnx]"`.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# ONNX file inside the model repo used by onnx-int8; the default is
+# quantized for AVX2 CPUs (also try onnx/model_qint8_avx512.onnx or
+# onnx/model_qint8_arm64.onnx)
+EMBEDDING_ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+
+EMBEDDING_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def load_model(model_name: str, backend: str = EMBEDDING_BACKEND) -> "SentenceTransformer":
+    """
+    Load a sentence-transformer model on the given backend
+
+    Args:
+        model_name: Name of the sentence-transformer model
+        backend: One of EMBEDDING_BACKENDS
+    """
+    # imported here so importing this module doesn't pull in torch
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    if backend == "onnx-int8":
+        return SentenceTransformer(
+            model_name,
+            backend="onnx",
+            model_kwargs={"file_name": EMBEDDING_ONNX_INT8_FILE}
+        )
+    raise ValueError(f"Unknown embedding backend: {backend} (expected one of {', '.join(EMBEDDING_BACKENDS)})")
+
 class EmbeddingManager:
     """
     Manages text embeddings using sentence-transformers
     """
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        use_cache: bool = EMBED_CACHE_ENABLED,
+        backend: str = EMBEDDING_BACKEND
+    ):
         """
         Initialize the embedding model
         
         Args:
             model_name: Name of the sentence-transformer model
+            use_cache: Keep computed embeddings in the memory + disk cache
+            backend: Inference backend, one of EMBEDDING_BACKENDS
         """
-        logger.info(f"Loading embedding model: {model_name}")
+        logger.info(f"Loading embedding model: {model_name} ({backend} backend)")
         try:
-            self.model = SentenceTransformer(model_name)
+            self.model_name = model_name
+            self.backend = backend
+            self.model = load_model(model_name, backend)
             self.dimension = self.model.get_sentence_embedding_dimension()
+            # backends produce slightly different vectors, so they don't share cache entries
+            namespace = model_name if backend == "torch" else f"{model_name}:{backend}"
+            self.cache: Optional[EmbeddingCache] = (
+                EmbeddingCache(namespace=namespace, dimension=self.dimension) if use_cache else None
+            )
             logger.info(f"Model loaded successfully. Embedding dimension: {self.dimension}")
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}")
             raise
     
-    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def generate_embeddings(self, texts: List[str], normalize: bool = False) -> np.ndarray:
         """
         Generate embeddings for a list of texts
         
         Args:
             texts: List of text strings to embed
+            normalize: Scale every vector to unit length
             
         Returns:
-            List of embedding vectors
+            C-contiguous float32 array of shape (len(texts), dimension)
         """
         try:
             if not texts:
-                return []
+                return np.empty((0, self.dimension), dtype=np.float32)
             
-            logger.info(f"Generating embeddings for {len(texts)} texts")
+            if self.cache is None:
+                return self._encode(texts, normalize)
             
-            # Generate embeddings
-            embeddings = self.model.encode(
-                texts,
-                show_progress_bar=False,
-                convert_to_numpy=True
-            )
+            # cached vectors are stored unnormalized
+            cached = self.cache.get_many(texts)
+            missing = [i for i, vector in enumerate(cached) if vector is None]
+            
+            embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+            for i, vector in enumerate(cached):
+                if vector is not None:
+                    embeddings[i] = vector
             
-            # Convert numpy arrays to lists for JSON serialization
-            embeddings_list = [embedding.tolist() for embedding in embeddings]
+            if missing:
+                computed = self._encode([texts[i] for i in missing], normalize=False)
+                embeddings[missing] = computed
+                self.cache.put_many([texts[i] for i in missing], computed)
             
-            return embeddings_list
+            if normalize:
+                norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+                embeddings /= np.maximum(norms, 1e-12)
+            
+            return embeddings
         
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise
     
+    def _encode(self, texts: List[str], normalize: bool) -> np.ndarray:
+        """
+        Run the model on texts
+        """
+        logger.info(f"Generating embeddings for {len(texts)} texts")
+        
+        # Generate embeddings
+        embeddings = self.model.encode(
+            texts,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=normalize
+        )
+        
+        # Keep a single float32 buffer instead of per-vector Python lists
+        return np.ascontiguousarray(embeddings, dtype=np.float32)
+    
+    def warm_up(self):
+        """
+        Run one encode so the first real request doesn't pay for lazy initialization
+        """
+        start = time.perf_counter()
+        self._encode(["warm-up"], normalize=False)
+        logger.info(f"Embedding model warmed up in {time.perf_counter() - start:.2f}s")
+    
+    def close(self):
+        """
+        Flush and close the embedding cache (called on shutdown)
+        """
+        if self.cache is not None:
+            self.cache.close()
+    
     def get_dimension(self) -> int:
         """
         Get the dimension of the embedding vectors
@@ -0,0 +1,206 @@
+import hashlib
+import logging
+import os
+import uuid
+from itertools import islice
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from concurrency import submit_embed
+from document_parser import iter_document_chunks
+
+logger = logging.getLogger(__name__)
+
+# Texts per model.encode call during ingest
+INGEST_EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "256"))
+
+# Namespaces for deterministic IDs, never change them or every chunk gets re-embedded
+CHUNK_ID_NAMESPACE = uuid.UUID("bc75aa97-77c2-4eb5-9fb2-d93558f0bf01")
+DOCUMENT_ID_NAMESPACE = uuid.UUID("5d0b7a4e-2f8c-4c1e-9a3b-6e2f1d8c7b90")
+
+
+class EmptyDocumentError(ValueError):
+    """
+    Raised when no text could be extracted from an uploaded document
+    """
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """
+    Group an iterable into lists of at most `size` items
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def hash_file(file_obj: BinaryIO, block_size: int = 1024 * 1024) -> str:
+    """
+    SHA-256 of a file's content, read in blocks, leaving the file at the start
+    """
+    digest = hashlib.sha256()
+    file_obj.seek(0)
+    for block in iter(lambda: file_obj.read(block_size), b""):
+        digest.update(block)
+    file_obj.seek(0)
+    return digest.hexdigest()
+
+
+def document_id_for(tenant: str, filename: str) -> str:
+    """
+    Deterministic document ID: the same filename uploaded by the same tenant is the same document
+    """
+    return str(uuid.uuid5(DOCUMENT_ID_NAMESPACE, f"{tenant}\x00{filename}"))
+
+
+def chunk_hash(text: str) -> str:
+    """
+    SHA-256 of a chunk's text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_point_id(document_key: str, text_hash: str, occurrence: int = 0) -> str:
+    """
+    Deterministic point ID for a chunk of a document
+
+    The ID depends on the chunk text, not its position, so unchanged
+    chunks keep their ID when an edited document is uploaded again.
+    `occurrence` tells repeated identical chunks apart.
+    """
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{document_key}\x00{text_hash}\x00{occurrence}"))
+
+
+def embed_in_batches(
+    embedding_manager,
+    chunks: Iterable[Dict],
+    batch_size: int = INGEST_EMBED_BATCH_SIZE,
+    on_stage: Optional[Callable[[str], None]] = None
+) -> Iterator[Tuple[List[Dict], np.ndarray]]:
+    """
+    Embed chunks a batch at a time
+
+    Encoding runs on the embed pool, so ingest jobs and queries share its
+    EMBED_WORKERS threads; blocks until each batch is encoded.
+
+    Args:
+        embedding_manager: EmbeddingManager used for encoding
+        chunks: Chunk dicts with a "text" key (any iterable, consumed lazily)
+        batch_size: Chunks per encode call
+        on_stage: Called with "embed" before and "index" after each encode
+
+    Yields:
+        (chunks, float32 embeddings) pairs, ready for VectorStore.add_document_stream
+    """
+    for batch in batched(chunks, batch_size):
+        if on_stage:
+            on_stage("embed")
+        embeddings = submit_embed(
+            embedding_manager.generate_embeddings, [chunk["text"] for chunk in batch]
+        ).result()
+        if on_stage:
+            on_stage("index")
+        yield batch, embeddings
+
+
+def ingest_document(
+    file_obj: BinaryIO,
+    filename: str,
+    document_id: str,
+    embedding_manager,
+    vector_store,
+    metadata: Dict,
+    content_hash: str,
+    progress: Optional[Callable[..., None]] = None,
+    before_commit: Optional[Callable[[], None]] = None
+) -> Dict:
+    """
+    Parse, embed and index a document as one streaming pipeline
+
+    Chunks flow from the parser into embedding batches and from there
+    into vector store batches, so memory use is bounded by the batch
+    sizes rather than the file size. Blocking, run it on a worker thread.
+
+    Re-ingest is incremental: chunks whose deterministic ID is already
+    stored for this document are not embedded again, and points for
+    chunks that no longer exist are deleted. The content hash is written
+    to every point last, so an interrupted ingest never looks complete.
+
+    Args:
+        file_obj: Seekable binary file positioned at the start of the document
+        filename: Original filename (selects the parser)
+        document_id: Identifies the document across uploads (see document_id_for)
+        embedding_manager: EmbeddingManager used for encoding
+        vector_store: VectorStore receiving the points
+        metadata: Metadata to attach to all points (tenant, document_id, filename, s3_url, etc.)
+        content_hash: SHA-256 of the file (see hash_file)
+        progress: Called as progress(stage=..., chunks_done=..., chunks_embedded=...)
+            while the pipeline runs; may raise to abort the ingest
+        before_commit: Called once every chunk is stored, before the content
+            hash is written (e.g. to wait for the S3 copy); may raise to abort
+
+    Returns:
+        Ingest stats: chunks seen, points embedded, reused and deleted, throughput
+    """
+    existing = vector_store.get_document_points(document_id)
+    seen = set()
+    moved = {}
+    occurrences: Dict[str, int] = {}
+    total = 0
+    embedded = 0
+
+    def report(stage: str):
+        if progress:
+            progress(stage=stage, chunks_done=total, chunks_embedded=embedded)
+
+    def new_chunks():
+        nonlocal total, embedded
+        report("parse")
+        for chunk_index, chunk in enumerate(iter_document_chunks(file_obj, filename)):
+            total += 1
+            text_hash = chunk_hash(chunk["text"])
+            occurrence = occurrences.get(text_hash, 0)
+            occurrences[text_hash] = occurrence + 1
+
+            point_id = chunk_point_id(document_id, text_hash, occurrence)
+            seen.add(point_id)
+
+            if point_id in existing:
+                if existing[point_id] != chunk_index:
+                    moved[point_id] = chunk_index
+                continue
+
+            embedded += 1
+            yield {**chunk, "id": point_id, "chunk_index": chunk_index}
+            report("parse")
+
+    stats = vector_store.add_document_stream(
+        embed_in_batches(embedding_manager, new_chunks(), on_stage=report),
+        metadata
+    )
+    report("index")
+
+    if total == 0:
+        raise EmptyDocumentError("couldn't extract text fron file")
+
+    stale = [point_id for point_id in existing if point_id not in seen]
+    vector_store.delete_points(stale)
+    vector_store.set_chunk_indexes(moved)
+    if before_commit:
+        before_commit()
+    vector_store.mark_document(document_id, {**metadata, "content_hash": content_hash})
+
+    stats.update({
+        "chunks": total,
+        "reused": total - stats["points"],
+        "deleted": len(stale)
+    })
+    logger.info(
+        f"Ingested {filename}: {total} chunks, {stats['points']} embedded, "
+        f"{stats['reused']} reused, {stats['deleted']} deleted"
+    )
+    return stats
@@ -0,0 +1,344 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job queue settings (override in .env)
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", "upload_spool")
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Seconds between progress writes to SQLite
+PROGRESS_FLUSH_INTERVAL = 1.0
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job when it has been cancelled
+    """
+
+
+class JobInterrupted(Exception):
+    """
+    Raised inside a job when the server shuts down; the job is re-queued on restart
+    """
+
+
+class JobStore:
+    """
+    SQLite-backed job records, so job state survives restarts
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                tenant TEXT NOT NULL,
+                document_id TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                spool_path TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                chunks_done INTEGER NOT NULL DEFAULT 0,
+                chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                points_per_second REAL NOT NULL DEFAULT 0,
+                error TEXT,
+                result TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                updated_at REAL NOT NULL,
+                finished_at REAL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        self._db.commit()
+
+    def create(self, **fields) -> Dict:
+        now = time.time()
+        job = {
+            "id": str(uuid.uuid4()),
+            "status": QUEUED,
+            "stage": QUEUED,
+            "created_at": now,
+            "updated_at": now,
+            **fields
+        }
+        columns = ", ".join(job)
+        placeholders = ", ".join("?" * len(job))
+        with self._lock:
+            self._db.execute(f"INSERT INTO jobs ({columns}) VALUES ({placeholders})", list(job.values()))
+            self._db.commit()
+        return self.get(job["id"])
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        if "result" in fields and not isinstance(fields["result"], (str, type(None))):
+            fields["result"] = json.dumps(fields["result"])
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", [*fields.values(), job_id])
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def list_unfinished(self) -> List[Dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [self.get(row["id"]) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class JobProgress:
+    """
+    Progress reporter handed to a running job
+
+    Calls are cheap: state is kept in memory and written to the store at
+    most once per PROGRESS_FLUSH_INTERVAL. Every call also checks for
+    cancellation, so long-running stages stop promptly.
+    """
+
+    def __init__(self, store: JobStore, job_id: str, cancel_event: threading.Event, shutdown_event: threading.Event):
+        self.store = store
+        self.job_id = job_id
+        self._cancel_event = cancel_event
+        self._shutdown_event = shutdown_event
+        self._started = time.perf_counter()
+        self._last_flush = 0.0
+        self.stage_name = RUNNING
+        self.chunks_done = 0
+        self.chunks_embedded = 0
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled(f"Job {self.job_id} cancelled")
+        if self._shutdown_event.is_set():
+            raise JobInterrupted(f"Job {self.job_id} interrupted by shutdown")
+
+    def update(self, stage: Optional[str] = None, chunks_done: Optional[int] = None, chunks_embedded: Optional[int] = None):
+        """
+        Record progress (stage: parse, embed, index or s3)
+        """
+        self.check_cancelled()
+
+        changed_stage = stage is not None and stage != self.stage_name
+        if stage is not None:
+            self.stage_name = stage
+        if chunks_done is not None:
+            self.chunks_done = chunks_done
+        if chunks_embedded is not None:
+            self.chunks_embedded = chunks_embedded
+
+        now = time.perf_counter()
+        if changed_stage or now - self._last_flush >= PROGRESS_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        elapsed = time.perf_counter() - self._started
+        self._last_flush = time.perf_counter()
+        self.store.update(
+            self.job_id,
+            stage=self.stage_name,
+            chunks_done=self.chunks_done,
+            chunks_embedded=self.chunks_embedded,
+            # only newly embedded chunks become upserts; reused ones cost no writes
+            points_per_second=self.chunks_embedded / elapsed if elapsed > 0 else 0.0
+        )
+
+
+class JobManager:
+    """
+    Runs ingestion jobs on a bounded local worker pool
+
+    Jobs for the same document run one at a time, in the order they were
+    submitted: a job whose document already has one queued or running waits
+    in that document's queue (without holding a worker) until it finishes.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict, JobProgress], Dict],
+        store: Optional[JobStore] = None,
+        workers: int = INGEST_WORKERS
+    ):
+        """
+        Args:
+            handler: Does the work for a job, reporting through the JobProgress;
+                its return value is stored as the job result
+            store: Job records (defaults to JOBS_DB_PATH)
+            workers: Jobs run at the same time
+        """
+        self.handler = handler
+        self.store = store or JobStore()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingest-job")
+        self._cancel_events: Dict[str, threading.Event] = {}
+        # document_id -> jobs waiting behind the one queued or running for it
+        self._document_queues: Dict[str, Deque[str]] = {}
+        self._shutdown_event = threading.Event()
+        self._lock = threading.Lock()
+        os.makedirs(INGEST_SPOOL_DIR, exist_ok=True)
+        logger.info(f"Job manager started with {max(1, workers)} workers")
+
+    def new_spool_path(self, file_type: str) -> str:
+        """
+        Unique path in INGEST_SPOOL_DIR to save an upload to until its job finishes
+        """
+        return os.path.join(INGEST_SPOOL_DIR, f"{uuid.uuid4()}{file_type}")
+
+    def submit(self, job: Dict) -> Dict:
+        """
+        Queue a job created in the store
+        """
+        with self._lock:
+            self._cancel_events[job["id"]] = threading.Event()
+            waiting = self._document_queues.get(job["document_id"])
+            if waiting is not None:
+                waiting.append(job["id"])
+                logger.info(f"Job {job['id']} waits for an earlier job on document {job['document_id']}")
+                return job
+            self._document_queues[job["document_id"]] = deque()
+        self._executor.submit(self._run, job["id"])
+        return job
+
+    def _next_for_document(self, document_id: str):
+        """
+        Start the next job waiting for a document, if any
+        """
+        with self._lock:
+            waiting = self._document_queues.get(document_id)
+            if not waiting or self._shutdown_event.is_set():
+                # jobs left waiting at shutdown stay queued in the store for recover()
+                self._document_queues.pop(document_id, None)
+                return
+            job_id = waiting.popleft()
+        try:
+            self._executor.submit(self._run, job_id)
+        except RuntimeError:
+            # shut down in the meantime; the job is still queued in the store
+            pass
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job
+
+        Returns:
+            False if the job already finished
+        """
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return False
+
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        if event is not None:
+            event.set()
+
+        if job["status"] == QUEUED:
+            self._finish(job, CANCELLED, error="Cancelled before it started")
+        return True
+
+    def recover(self):
+        """
+        Re-queue jobs left unfinished by a previous run of the server
+        """
+        for job in self.store.list_unfinished():
+            if os.path.exists(job["spool_path"]):
+                logger.info(f"Re-queueing interrupted job {job['id']} ({job['filename']})")
+                self.store.update(job["id"], status=QUEUED, stage=QUEUED)
+                self.submit(job)
+            else:
+                self._finish(job, FAILED, error="Upload was lost when the server restarted")
+
+    def _run(self, job_id: str):
+        job = self.store.get(job_id)
+        try:
+            if job is not None and job["status"] == QUEUED:
+                self._run_job(job)
+        finally:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
+            if job is not None:
+                self._next_for_document(job["document_id"])
+
+    def _run_job(self, job: Dict):
+        job_id = job["id"]
+
+        with self._lock:
+            cancel_event = self._cancel_events.setdefault(job_id, threading.Event())
+        progress = JobProgress(self.store, job_id, cancel_event, self._shutdown_event)
+
+        try:
+            progress.check_cancelled()
+            self.store.update(job_id, status=RUNNING, stage=RUNNING, started_at=time.time())
+            result = self.handler(job, progress)
+            progress.flush()
+            self._finish(job, SUCCEEDED, result=result)
+            logger.info(f"Job {job_id} finished: {job['filename']}")
+        except JobInterrupted:
+            # left for recover() on the next start
+            self.store.update(job_id, status=QUEUED, stage=QUEUED)
+            logger.info(f"Job {job_id} interrupted, will resume on restart")
+        except JobCancelled:
+            self._finish(job, CANCELLED, error="Cancelled")
+            logger.info(f"Job {job_id} cancelled")
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+            logger.error(f"Job {job_id} failed: {str(e)}")
+
+    def _finish(self, job: Dict, status: str, error: Optional[str] = None, result: Optional[Dict] = None):
+        self.store.update(
+            job["id"],
+            status=status,
+            stage="done" if status == SUCCEEDED else status,
+            error=error,
+            result=result,
+            finished_at=time.time()
+        )
+        try:
+            os.remove(job["spool_path"])
+        except FileNotFoundError:
+            pass
+
+    def shutdown(self):
+        """
+        Stop accepting work and interrupt running jobs (they resume on restart)
+        """
+        self._shutdown_event.set()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self.store.close()
@@ -1,10 +1,49 @@
-import requests
+import httpx
+import asyncio
+import json
 import os
 import logging
-from typing import Optional
+import time
+from typing import Optional, AsyncIterator, List, Tuple
+
+import metrics
+from context_packer import estimate_tokens
+from transport import ollama_client
 
 logger = logging.getLogger(__name__)
 
+# Model residency (override in .env)
+# OLLAMA_KEEP_ALIVE: how long Ollama keeps the model loaded after a request ("30m", "-1" = forever)
+# OLLAMA_WARM_INTERVAL: seconds between keep-warm pings while idle, 0 disables them
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_WARM_INTERVAL = float(os.getenv("OLLAMA_WARM_INTERVAL", "120"))
+
+# Fixed instructions, sent as the first message of every chat so Ollama can
+# reuse their evaluated prefix instead of processing them on each request
+SYSTEM_PROMPT = """You are FileFox, a helpful AI assistant that answers questions based on provided documents.
+
+IMPORTANT: Answer ONLY using the context provided by the user. If the context doesn't contain information to answer the question, say "I don't have information about that in the uploaded documents."
+
+Instructions:
+- Base your answer ONLY on the context provided
+- Be specific about relevant information
+- If the context is not relevant to the question, clearly state that
+- Do not make up information not in the context"""
+
+prompt_eval_seconds = metrics.histogram("llm_prompt_eval_seconds", "Ollama prompt_eval_duration per request")
+prompt_eval_tokens = metrics.histogram(
+    "llm_prompt_eval_tokens",
+    "Ollama prompt_eval_count per request (prompt tokens not served from the cache)",
+    buckets=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+)
+load_seconds = metrics.histogram("llm_load_seconds", "Ollama load_duration per request (model load time)")
+warm_pings = metrics.counter("llm_warm_pings", "Keep-warm requests sent to Ollama")
+
+
+def _keep_alive(value: str):
+    # Ollama reads bare numbers as seconds and needs them as JSON numbers
+    return int(value) if value.lstrip("-").isdigit() else value
+
 class LLMClient:
     """
     Client for interacting with Ollama (local LLM)
@@ -17,16 +56,17 @@ class LLMClient:
         self.base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         self.model = os.getenv("OLLAMA_MODEL", "phi3:latest")
         
-        logger.info(f"Initialized LLM client with model: {self.model}")
+        self.keep_alive = _keep_alive(OLLAMA_KEEP_ALIVE)
         
-      
-        if not self.check_connection():
-            logger.error("❌ Cannot connect to Ollama!")
-            logger.error(f"   Start it with: ollama serve")
-        else:
-            logger.info("✓ Connected to Ollama successfully")
+        # async client, created lazily and reused across requests
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._warm_task: Optional[asyncio.Task] = None
+        self._last_request = 0.0
+        
+        # no network calls here; check_connection() runs during app startup
+        logger.info(f"Initialized LLM client with model: {self.model}")
     
-    def generate_answer(
+    async def generate_answer(
         self, 
         question: str, 
         context: str, 
@@ -41,80 +81,258 @@ class LLMClient:
             max_tokens: Maximum tokens to generate
             
         Returns:
-            Generated answer
+            Generated answer (or a user-facing error message)
+        """
+        answer, _ = await self.generate_answer_with_status(question, context, max_tokens)
+        return answer
+    
+    async def generate_answer_with_status(
+        self,
+        question: str,
+        context: str,
+        max_tokens: int = 500
+    ) -> Tuple[str, bool]:
+        """
+        Generate an answer using Ollama, reporting whether generation succeeded
+        
+        Returns:
+            (answer or user-facing error message, True if the model produced an answer)
         """
         try:
-            # Construct prompt
-            prompt = f"""You are FileFox, a helpful AI assistant that answers questions based on provided documents.
-
-IMPORTANT: Answer ONLY using the context provided below. If the context doesn't contain information to answer the question, say "I don't have information about that in the uploaded documents."
-
-Context from documents:
-{context}
-
-User question: {question}
-
-Instructions:
-- Base your answer ONLY on the context above
-- Be specific about relevant information
-- If the context is not relevant to the question, clearly state that
-- Do not make up information not in the context
-
-Answer:"""
+            messages = self._build_messages(question, context)
 
             logger.info(f"Generating answer for: '{question[:50]}...'")
             logger.info(f"Using model: {self.model}")
             
             # Call Ollama API
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "num_predict": max_tokens,
-                        "temperature": 0.7,
-                        "top_p": 0.9,
-                    }
-                },
-                timeout=120  
+            self._last_request = time.monotonic()
+            response = await self._get_async_client().post(
+                "/api/chat",
+                json=self._build_payload(messages, max_tokens, stream=False)
             )
             
             logger.info(f"Ollama response status: {response.status_code}")
             
             if response.status_code == 200:
                 result = response.json()
-                answer = result.get("response", "").strip()
+                self._record_stats(result)
+                answer = result.get("message", {}).get("content", "").strip()
                 
                 if not answer:
                     logger.error("Ollama returned empty response")
-                    return "I received an empty response from the AI model."
+                    return "I received an empty response from the AI model.", False
                 
                 logger.info(f"Generated answer length: {len(answer)} characters")
-                return answer
+                return answer, True
             else:
                 error_text = response.text
                 logger.error(f"Ollama API error {response.status_code}: {error_text}")
                 
                 if response.status_code == 404:
-                    return f"Model '{self.model}' not found. Please run: ollama pull {self.model}"
+                    return f"Model '{self.model}' not found. Please run: ollama pull {self.model}", False
                 else:
-                    return f"AI model error (HTTP {response.status_code}). Check backend logs for details."
+                    return f"AI model error (HTTP {response.status_code}). Check backend logs for details.", False
         
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             logger.error("Could not connect to Ollama. Is it running?")
-            return "❌ Cannot connect to Ollama. Please start it with: ollama serve"
+            return "❌ Cannot connect to Ollama. Please start it with: ollama serve", False
         
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             logger.error("Ollama request timed out")
-            return "⏱️ The AI model took too long to respond. Please Try a shorter."
+            return "⏱️ The AI model took too long to respond. Please Try a shorter.", False
         
         except Exception as e:
             logger.error(f"Unexpected error generating answer: {str(e)}")
-            return f"An unexpected error occurred: {str(e)}"
+            return f"An unexpected error occurred: {str(e)}", False
+    
+    def _build_user_message(self, question: str, context: str) -> str:
+        """
+        The per-request part of the prompt: retrieved context and the question
+        """
+        return f"""Context from documents:
+{context}
+
+User question: {question}
+
+Answer:"""
+    
+    def _build_messages(self, question: str, context: str) -> List[dict]:
+        """
+        Chat messages for a question: the fixed system prompt, then context and question
+        """
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": self._build_user_message(question, context)}
+        ]
+    
+    def estimate_prompt_tokens(self, question: str, context: str) -> int:
+        """
+        Estimated LLM tokens of the prompt built for question and context
+        """
+        return estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(self._build_user_message(question, context))
+    
+    def _build_payload(self, messages: List[dict], max_tokens: int, stream: bool) -> dict:
+        """
+        Build the /api/chat request body
+        """
+        return {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "num_predict": max_tokens,
+                "temperature": 0.7,
+                "top_p": 0.9,
+            }
+        }
+    
+    def _record_stats(self, result: dict):
+        """
+        Record Ollama's timings from a final response (durations are in nanoseconds)
+        """
+        if "prompt_eval_duration" in result:
+            prompt_eval_seconds.observe(result["prompt_eval_duration"] / 1e9)
+        if "prompt_eval_count" in result:
+            prompt_eval_tokens.observe(result["prompt_eval_count"])
+        if "load_duration" in result:
+            load_seconds.observe(result["load_duration"] / 1e9)
+        logger.info(
+            f"Ollama: {result.get('prompt_eval_count', 0)} prompt tokens evaluated in "
+            f"{result.get('prompt_eval_duration', 0) / 1e6:.0f} ms, load {result.get('load_duration', 0) / 1e6:.0f} ms"
+        )
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """
+        Return the shared pooled HTTP client, creating it on first use
+        """
+        if self._async_client is None:
+            self._async_client = ollama_client(
+                self.base_url,
+                # for streams the read timeout applies per line, not to the whole answer
+                timeout=httpx.Timeout(120.0, connect=5.0)
+            )
+        return self._async_client
+    
+    async def stream_answer(
+        self,
+        question: str,
+        context: str,
+        max_tokens: int = 500
+    ) -> AsyncIterator[str]:
+        """
+        Stream an answer from Ollama token by token
+        
+        Args:
+            question: User's question
+            context: Retrieved context from documents
+            max_tokens: Maximum tokens to generate
+            
+        Yields:
+            Text fragments as Ollama produces them
+        """
+        messages = self._build_messages(question, context)
+        client = self._get_async_client()
+        
+        logger.info(f"Streaming answer for: '{question[:50]}...'")
+        
+        self._last_request = time.monotonic()
+        async with client.stream(
+            "POST",
+            "/api/chat",
+            json=self._build_payload(messages, max_tokens, stream=True)
+        ) as response:
+            if response.status_code != 200:
+                error_text = (await response.aread()).decode(errors="replace")
+                logger.error(f"Ollama API error {response.status_code}: {error_text}")
+                
+                if response.status_code == 404:
+                    raise RuntimeError(f"Model '{self.model}' not found. Please run: ollama pull {self.model}")
+                raise RuntimeError(f"AI model error (HTTP {response.status_code}). Check backend logs for details.")
+            
+            # Ollama streams one JSON object per line
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise RuntimeError(chunk["error"])
+                
+                token = chunk.get("message", {}).get("content", "")
+                if token:
+                    yield token
+                
+                if chunk.get("done"):
+                    self._record_stats(chunk)
+                    break
+    
+    async def warm(self) -> bool:
+        """
+        Load the model and evaluate the system prompt, so the next question only
+        pays for its own tokens
+        
+        Returns:
+            True if Ollama answered
+        """
+        self._last_request = time.monotonic()
+        try:
+            response = await self._get_async_client().post(
+                "/api/chat",
+                json=self._build_payload(
+                    [{"role": "system", "content": SYSTEM_PROMPT}],
+                    max_tokens=1,
+                    stream=False
+                )
+            )
+            warm_pings.inc()
+            if response.status_code != 200:
+                logger.warning(f"Keep-warm request failed: HTTP {response.status_code}")
+                return False
+            self._record_stats(response.json())
+            return True
+        except httpx.HTTPError as e:
+            logger.warning(f"Keep-warm request failed: {str(e)}")
+            return False
+    
+    def start_keep_warm(self, interval: float = OLLAMA_WARM_INTERVAL):
+        """
+        Warm the model now, then again whenever it has been idle for `interval` seconds
+        """
+        if interval <= 0 or self._warm_task is not None:
+            return
+        
+        async def keep_warm():
+            while True:
+                idle = time.monotonic() - self._last_request
+                if idle >= interval:
+                    try:
+                        await self.warm()
+                    except Exception as e:
+                        # warm() handles HTTP errors; anything else mustn't end the loop
+                        logger.error(f"Keep-warm request failed unexpectedly: {str(e)}")
+                    idle = 0.0
+                await asyncio.sleep(interval - idle)
+        
+        self._warm_task = asyncio.create_task(keep_warm())
+        logger.info(f"Keeping {self.model} warm (keep_alive={self.keep_alive}, ping after {interval:.0f}s idle)")
+    
+    async def aclose(self):
+        """
+        Stop the keep-warm task and close the shared async HTTP client
+        """
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+            try:
+                await self._warm_task
+            except asyncio.CancelledError:
+                pass
+            self._warm_task = None
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
     
-    def check_connection(self) -> bool:
+    async def check_connection(self) -> bool:
         """
         Check if Ollama is running and accessible
         
@@ -122,7 +340,7 @@ Answer:"""
             True if connected, False otherwise
         """
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = await self._get_async_client().get("/api/tags", timeout=5)
             return response.status_code == 200
-        except:
+        except Exception:
             return False
\ No newline at end of file
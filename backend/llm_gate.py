@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Admission control settings (override in .env)
+# LLM_MAX_CONCURRENCY: generations sent to Ollama at once (match OLLAMA_NUM_PARALLEL)
+# LLM_MAX_QUEUE: requests allowed to wait for a slot; more are rejected with 429
+# LLM_QUEUE_TIMEOUT_SECONDS: longest wait for a slot before giving up with 503
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "1"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+
+queue_wait_seconds = metrics.histogram("llm_queue_wait_seconds", "Time a generation waited for an LLM slot")
+generation_seconds = metrics.histogram(
+    "llm_generation_seconds",
+    "Time a generation held an LLM slot",
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+)
+queue_depth = metrics.gauge("llm_queue_depth", "Generations waiting for an LLM slot")
+in_flight = metrics.gauge("llm_in_flight", "Generations running in Ollama")
+rejected = metrics.counter("llm_rejected", "Generations rejected because the queue was full")
+queue_timeouts = metrics.counter("llm_queue_timeouts", "Generations that gave up waiting for a slot")
+coalesced = metrics.counter("llm_coalesced", "Requests that shared an identical in-flight generation")
+
+
+class LLMUnavailable(RuntimeError):
+    """
+    The LLM can't take the request right now
+    """
+    status_code = 503
+
+
+class LLMOverloaded(LLMUnavailable):
+    """
+    Raised when too many generations are already waiting
+    """
+    status_code = 429
+
+
+class LLMQueueTimeout(LLMUnavailable):
+    """
+    Raised when a generation waited LLM_QUEUE_TIMEOUT_SECONDS without getting a slot
+    """
+    status_code = 503
+
+
+class _SharedStream:
+    """
+    Tokens of one streamed generation, replayed to every subscriber
+    """
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+
+class LLMGate:
+    """
+    Admission control in front of LLMClient
+
+    At most max_concurrency generations run at once and at most max_queue
+    wait for a slot; beyond that requests fail fast with LLMOverloaded
+    instead of piling up in Ollama until they time out. Concurrent
+    requests with the same question and context share one generation.
+    """
+
+    def __init__(
+        self,
+        llm_client,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS
+    ):
+        """
+        Args:
+            llm_client: LLMClient doing the generation
+            max_concurrency: Generations running at the same time
+            max_queue: Generations allowed to wait for a slot
+            queue_timeout: Seconds a generation may wait for a slot
+        """
+        self.llm_client = llm_client
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._waiting = 0
+        self._answers: Dict[str, asyncio.Task] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+
+    @staticmethod
+    def _key(question: str, context: str, max_tokens: int) -> str:
+        return hashlib.sha256(f"{max_tokens}\x00{question}\x00{context}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _forget(in_flight_by_key: Dict, key: str, value):
+        # only if it hasn't been replaced by a newer generation for the same key
+        if in_flight_by_key.get(key) is value:
+            del in_flight_by_key[key]
+
+    def check_capacity(self):
+        """
+        Raise LLMOverloaded if a new generation would be rejected
+
+        Lets streaming endpoints fail with a status code before the
+        response starts.
+        """
+        if self._slots.locked() and self._waiting >= self.max_queue:
+            rejected.inc()
+            raise LLMOverloaded("Too many questions are waiting for the AI model, please retry shortly")
+
+    async def _acquire(self):
+        if not self._slots.locked():
+            # a free slot is taken without suspending, so a burst can't
+            # overshoot the queue limit before the first acquire lands
+            await self._slots.acquire()
+            queue_wait_seconds.observe(0.0)
+            in_flight.inc()
+            return
+
+        self.check_capacity()
+
+        self._waiting += 1
+        queue_depth.set(self._waiting)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            queue_timeouts.inc()
+            raise LLMQueueTimeout("The AI model is busy, please retry shortly")
+        finally:
+            self._waiting -= 1
+            queue_depth.set(self._waiting)
+            queue_wait_seconds.observe(time.perf_counter() - start)
+
+        in_flight.inc()
+
+    def _release(self, started: float):
+        generation_seconds.observe(time.perf_counter() - started)
+        in_flight.dec()
+        self._slots.release()
+
+    async def _generate(self, question: str, context: str, max_tokens: int) -> Tuple[str, bool]:
+        await self._acquire()
+        started = time.perf_counter()
+        try:
+            return await self.llm_client.generate_answer_with_status(question, context, max_tokens)
+        finally:
+            self._release(started)
+
+    async def generate(self, question: str, context: str, max_tokens: int = 500) -> Tuple[str, bool]:
+        """
+        LLMClient.generate_answer_with_status behind the limiter
+
+        Raises:
+            LLMOverloaded: If the queue is full
+            LLMQueueTimeout: If no slot freed up in time
+        """
+        key = self._key(question, context, max_tokens)
+        task = self._answers.get(key)
+        if task is not None:
+            coalesced.inc()
+        else:
+            task = asyncio.create_task(self._generate(question, context, max_tokens))
+            self._answers[key] = task
+            task.add_done_callback(lambda _: self._forget(self._answers, key, task))
+
+        # shielded so a caller disconnecting doesn't cancel a generation others wait on
+        return await asyncio.shield(task)
+
+    async def _produce(self, shared: _SharedStream, question: str, context: str, max_tokens: int):
+        started = None
+        try:
+            await self._acquire()
+            started = time.perf_counter()
+            async for token in self.llm_client.stream_answer(question, context, max_tokens):
+                async with shared.changed:
+                    shared.tokens.append(token)
+                    shared.changed.notify_all()
+        except BaseException as e:
+            shared.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            if started is not None:
+                self._release(started)
+            async with shared.changed:
+                shared.done = True
+                shared.changed.notify_all()
+
+    async def stream(self, question: str, context: str, max_tokens: int = 500) -> AsyncIterator[str]:
+        """
+        LLMClient.stream_answer behind the limiter
+
+        Subscribers to an identical in-flight stream get every token from
+        the start. The generation is cancelled when its last subscriber leaves.
+
+        Raises:
+            LLMOverloaded: If the queue is full
+            LLMQueueTimeout: If no slot freed up in time
+        """
+        key = self._key(question, context, max_tokens)
+        shared = self._streams.get(key)
+        if shared is not None:
+            coalesced.inc()
+        else:
+            shared = _SharedStream()
+            self._streams[key] = shared
+            shared.task = asyncio.create_task(self._produce(shared, question, context, max_tokens))
+            shared.task.add_done_callback(lambda _: self._forget(self._streams, key, shared))
+
+        shared.subscribers += 1
+        sent = 0
+        try:
+            while True:
+                async with shared.changed:
+                    await shared.changed.wait_for(lambda: len(shared.tokens) > sent or shared.done)
+                    tokens = shared.tokens[sent:]
+                    done = shared.done
+                for token in tokens:
+                    yield token
+                sent += len(tokens)
+                if done and sent >= len(shared.tokens):
+                    break
+
+            if shared.error is not None:
+                raise shared.error
+        finally:
+            shared.subscribers -= 1
+            if shared.subscribers == 0 and not shared.done:
+                self._forget(self._streams, key, shared)
+                shared.task.cancel()
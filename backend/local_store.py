@@ -0,0 +1,842 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import metrics
+import sparse
+from sparse import HYBRID_SEARCH, HYBRID_CANDIDATES, HYBRID_LEXICAL_CUTOFF
+from vector_store import VectorStore, format_result
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    import fcntl
+except ImportError:
+    # no cross-process lock on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Local vector store settings (override in .env)
+# LOCAL_STORE_PATH: directory holding the vector matrix, payloads and HNSW index
+# LOCAL_STORE_HNSW_THRESHOLD: searches over more points than this use an HNSW index
+# (needs `pip install hnswlib`); smaller ones are exact
+# LOCAL_STORE_HNSW_M / LOCAL_STORE_HNSW_EF_CONSTRUCTION: HNSW graph degree and build beam width
+# LOCAL_STORE_HNSW_EF: HNSW search beam width (higher = better recall, slower)
+LOCAL_STORE_PATH = os.getenv("LOCAL_STORE_PATH", "vector_data")
+LOCAL_STORE_HNSW_THRESHOLD = int(os.getenv("LOCAL_STORE_HNSW_THRESHOLD", "50000"))
+LOCAL_STORE_HNSW_M = int(os.getenv("LOCAL_STORE_HNSW_M", "16"))
+LOCAL_STORE_HNSW_EF_CONSTRUCTION = int(os.getenv("LOCAL_STORE_HNSW_EF_CONSTRUCTION", "200"))
+LOCAL_STORE_HNSW_EF = int(os.getenv("LOCAL_STORE_HNSW_EF", "128"))
+
+# Rows the vector file starts with; it doubles when full
+INITIAL_CAPACITY = 1024
+
+
+
+class LocalStoreLocked(RuntimeError):
+    """
+    Raised when another process (usually the server) has the store open
+    """
+
+
+def _iter_payloads(db: sqlite3.Connection, lock, fields: List[str], batch_size: int) -> Iterator[Dict]:
+    columns = ", ".join("json_extract(payload, ?)" for _ in fields)
+    paths = tuple(f"$.{field}" for field in fields)
+    last_slot = -1
+    while True:
+        # keyset pagination, so the lock is only held for one page
+        with lock:
+            rows = db.execute(
+                f"SELECT slot, {columns} FROM points WHERE slot > ? ORDER BY slot LIMIT ?",
+                (*paths, last_slot, batch_size)
+            ).fetchall()
+        for slot, *values in rows:
+            yield {field: value for field, value in zip(fields, values) if value is not None}
+        if len(rows) < batch_size:
+            return
+        last_slot = rows[-1][0]
+
+
+def read_payloads(path: str = LOCAL_STORE_PATH, fields: Sequence[str] = (), batch_size: int = 1000) -> Iterator[Dict]:
+    """
+    Stream payload fields of a store another process has open, without writing to it
+
+    Reads points.sqlite3 read-only (SQLite's WAL lets it run next to the
+    writer), for tools like reconcile.py while the server is running.
+    """
+    db = sqlite3.connect(f"file:{os.path.join(path, 'points.sqlite3')}?mode=ro", uri=True, timeout=30)
+    try:
+        yield from _iter_payloads(db, nullcontext(), list(fields), batch_size)
+    finally:
+        db.close()
+
+
+local_points = metrics.gauge("local_store_points", "Points in the local vector store")
+exact_searches = metrics.counter("local_store_exact_searches", "Local store searches answered by exact matrix multiply")
+hnsw_searches = metrics.counter("local_store_hnsw_searches", "Local store searches answered by the HNSW index")
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store persisted to a directory
+
+    Embeddings are unit-normalized rows of a memory-mapped float32 matrix
+    (vectors.f32), so cosine similarity is a matrix-vector product. Point
+    payloads and BM25 postings live in SQLite (points.sqlite3); a point's
+    row in the matrix is its slot. Rows of deleted points are reused.
+
+    Searches scoped to fewer than LOCAL_STORE_HNSW_THRESHOLD points (the
+    usual case with tenant filters) scan them exactly; larger ones use an
+    HNSW index when hnswlib is installed. All access is serialized by one
+    lock, which keeps the matrix, SQLite and index consistent. Filters and
+    the index live in memory, so only one process may open a store: it
+    holds an exclusive lock on the LOCK file until close().
+    """
+
+    def __init__(
+        self,
+        path: str = LOCAL_STORE_PATH,
+        vector_size: int = 384,
+        hnsw_threshold: int = LOCAL_STORE_HNSW_THRESHOLD
+    ):
+        """
+        Args:
+            path: Directory for the store's files (created if missing)
+            vector_size: Embedding dimension
+            hnsw_threshold: Searches over more points use the HNSW index
+        """
+        self.path = path
+        self.vector_size = vector_size
+        self.hnsw_threshold = hnsw_threshold
+        self.hybrid = HYBRID_SEARCH
+        self._warned_no_hnsw = False
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._lock_file = self._lock_store(path)
+
+        self._db = sqlite3.connect(os.path.join(path, "points.sqlite3"), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS points (
+                slot INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                tenant TEXT,
+                document_id TEXT,
+                filename TEXT,
+                content_hash TEXT,
+                payload TEXT NOT NULL
+            )
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS points_tenant ON points (tenant, filename)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS points_document ON points (document_id)")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS postings (
+                token INTEGER NOT NULL,
+                slot INTEGER NOT NULL,
+                weight REAL NOT NULL,
+                PRIMARY KEY (token, slot)
+            ) WITHOUT ROWID
+            """
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS postings_slot ON postings (slot)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+
+        try:
+            self._load()
+        except Exception as e:
+            logger.error(f"Error opening local vector store: {str(e)}")
+            self._db.close()
+            self._lock_file.close()
+            raise
+
+    @staticmethod
+    def _lock_store(path: str):
+        """
+        Take the store's process lock
+
+        Raises:
+            LocalStoreLocked: If another process has the store open
+        """
+        lock_file = open(os.path.join(path, "LOCK"), "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                raise LocalStoreLocked(f"Local vector store at {path} is in use by another process")
+        return lock_file
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _load(self):
+        """
+        Open the vector file and rebuild the in-memory filter columns from SQLite
+        """
+        self._vectors_path = os.path.join(self.path, "vectors.f32")
+        self._index_path = os.path.join(self.path, "hnsw.bin")
+        row_bytes = self.vector_size * 4
+        if not os.path.exists(self._vectors_path) or os.path.getsize(self._vectors_path) < row_bytes:
+            with open(self._vectors_path, "wb") as f:
+                f.truncate(INITIAL_CAPACITY * row_bytes)
+        capacity = os.path.getsize(self._vectors_path) // row_bytes
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.vector_size))
+
+        # per-slot liveness, tenant and document codes, so filters are vectorized
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._tenants = np.full(capacity, -1, dtype=np.int32)
+        self._documents = np.full(capacity, -1, dtype=np.int32)
+        self._tenant_codes: Dict[str, int] = {}
+        self._document_codes: Dict[str, int] = {}
+        for slot, tenant, document_id in self._db.execute("SELECT slot, tenant, document_id FROM points"):
+            self._set_slot(slot, tenant, document_id)
+
+        self._size = int(np.flatnonzero(self._alive)[-1]) + 1 if self._alive.any() else 0
+        self._free = [int(slot) for slot in np.flatnonzero(~self._alive[:self._size])]
+        self._count = int(self._alive.sum())
+        self._generation = int(self._meta("generation") or 0)
+        local_points.set(self._count)
+
+        self._index = None
+        if (
+            hnswlib is not None
+            and os.path.exists(self._index_path)
+            and self._meta("index_generation") == str(self._generation)
+        ):
+            self._index = hnswlib.Index(space="ip", dim=self.vector_size)
+            self._index.load_index(self._index_path, max_elements=capacity)
+        else:
+            self._maybe_build_index()
+
+        logger.info(
+            f"Local vector store at {self.path}: {self._count} points, "
+            f"{'HNSW index' if self._index is not None else 'exact search'}"
+        )
+
+    def _code(self, codes: Dict[str, int], value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        return codes.setdefault(value, len(codes))
+
+    def _set_slot(self, slot: int, tenant: Optional[str], document_id: Optional[str]):
+        self._alive[slot] = True
+        self._tenants[slot] = self._code(self._tenant_codes, tenant)
+        self._documents[slot] = self._code(self._document_codes, document_id)
+
+    def _grow(self, needed: int):
+        """
+        Enlarge the vector file (and filter columns) to at least `needed` rows
+        """
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        self._vectors.flush()
+        del self._vectors
+        with open(self._vectors_path, "r+b") as f:
+            f.truncate(new_capacity * self.vector_size * 4)
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(new_capacity, self.vector_size)
+        )
+
+        extra = new_capacity - capacity
+        self._alive = np.concatenate([self._alive, np.zeros(extra, dtype=bool)])
+        self._tenants = np.concatenate([self._tenants, np.full(extra, -1, dtype=np.int32)])
+        self._documents = np.concatenate([self._documents, np.full(extra, -1, dtype=np.int32)])
+        if self._index is not None:
+            self._index.resize_index(new_capacity)
+
+    def _allocate(self, count: int) -> List[int]:
+        reused = [self._free.pop() for _ in range(min(count, len(self._free)))]
+        fresh = list(range(self._size, self._size + count - len(reused)))
+        self._size += len(fresh)
+        self._grow(self._size)
+        return reused + fresh
+
+    def _maybe_build_index(self):
+        """
+        Build the HNSW index once the store is big enough to need it
+        """
+        if self._index is not None or self._count <= self.hnsw_threshold:
+            return
+        if hnswlib is None:
+            if self._warned_no_hnsw:
+                return
+            self._warned_no_hnsw = True
+            logger.warning(
+                f"Local vector store has {self._count} points but hnswlib isn't installed, "
+                f"searches stay exact (pip install hnswlib)"
+            )
+            return
+
+        start = time.perf_counter()
+        slots = np.flatnonzero(self._alive)
+        index = hnswlib.Index(space="ip", dim=self.vector_size)
+        index.init_index(
+            max_elements=len(self._vectors),
+            M=LOCAL_STORE_HNSW_M,
+            ef_construction=LOCAL_STORE_HNSW_EF_CONSTRUCTION
+        )
+        for begin in range(0, len(slots), 10000):
+            batch = slots[begin:begin + 10000]
+            index.add_items(np.asarray(self._vectors[batch]), batch)
+        self._index = index
+        logger.info(f"Built HNSW index over {len(slots)} points in {time.perf_counter() - start:.1f}s")
+
+    def _commit(self):
+        self._generation += 1
+        self._set_meta("generation", str(self._generation))
+        self._db.commit()
+        self._vectors.flush()
+        local_points.set(self._count)
+
+    def add_document_stream(
+        self,
+        batches: Iterable[Tuple[List[Dict], np.ndarray]],
+        metadata: Dict
+    ) -> Dict:
+        """
+        Add documents to the local store from a stream of (chunks, embeddings) batches
+
+        Each batch is written and committed as it arrives. Points whose ID
+        already exists are replaced in place.
+
+        Args:
+            batches: Iterable of (chunks, float32 embeddings) pairs, where each
+                chunk is a dict with "text" and optional extra payload (e.g. "page",
+                "chunk_index"). An "id" key sets the point ID, otherwise a random one is used
+            metadata: Metadata to attach to all points (filename, s3_url, etc.)
+
+        Returns:
+            Dict with points added, elapsed seconds and points per second
+        """
+        chunk_index = 0
+        start_time = time.perf_counter()
+
+        try:
+            for chunks, embeddings in batches:
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+                if len(chunks) != len(embeddings):
+                    raise ValueError(f"Got {len(chunks)} chunks but {len(embeddings)} embeddings")
+                if not chunks:
+                    continue
+
+                with self._lock:
+                    self._add_batch(chunks, embeddings, metadata, chunk_index)
+                chunk_index += len(chunks)
+
+            elapsed = time.perf_counter() - start_time
+            rate = chunk_index / elapsed if elapsed > 0 else 0.0
+            logger.info(f"Added {chunk_index} points to the local store in {elapsed:.2f}s ({rate:.0f} points/s)")
+
+            return {
+                "points": chunk_index,
+                "seconds": elapsed,
+                "points_per_second": rate
+            }
+
+        except Exception as e:
+            logger.error(f"Error adding documents: {str(e)}")
+            raise
+
+    def _add_batch(self, chunks: List[Dict], embeddings: np.ndarray, metadata: Dict, chunk_index: int):
+        ids = [chunk.get("id") or str(uuid.uuid4()) for chunk in chunks]
+        existing = dict(self._select(
+            "SELECT id, slot FROM points WHERE id IN ({})", ids
+        ))
+        new_ids = [point_id for point_id in dict.fromkeys(ids) if point_id not in existing]
+        existing.update(zip(new_ids, self._allocate(len(new_ids))))
+        slots = np.array([existing[point_id] for point_id in ids], dtype=np.int64)
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        vectors = embeddings / np.where(norms > 0, norms, 1.0)
+        self._vectors[slots] = vectors
+
+        payloads = [
+            {
+                "chunk_index": chunk_index + i,
+                **{k: v for k, v in chunk.items() if k != "id"},
+                **metadata
+            }
+            for i, chunk in enumerate(chunks)
+        ]
+        self._db.executemany(
+            "INSERT OR REPLACE INTO points (slot, id, tenant, document_id, filename, content_hash, payload) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    int(slot), point_id, payload.get("tenant"), payload.get("document_id"),
+                    payload.get("filename"), payload.get("content_hash"), json.dumps(payload)
+                )
+                for slot, point_id, payload in zip(slots, ids, payloads)
+            ]
+        )
+
+        if self.hybrid:
+            self._execute_many("DELETE FROM postings WHERE slot IN ({})", [int(slot) for slot in slots])
+            postings = {}
+            for slot, chunk in zip(slots, chunks):
+                indices, values = sparse.document_vector(chunk["text"])
+                for token, weight in zip(indices, values):
+                    postings[(token, int(slot))] = weight
+            self._db.executemany(
+                "INSERT INTO postings (token, slot, weight) VALUES (?, ?, ?)",
+                [(token, slot, weight) for (token, slot), weight in postings.items()]
+            )
+
+        for slot, payload in zip(slots, payloads):
+            if not self._alive[slot]:
+                self._count += 1
+            self._set_slot(slot, payload.get("tenant"), payload.get("document_id"))
+
+        if self._index is not None:
+            self._index.add_items(vectors, slots)
+        else:
+            self._maybe_build_index()
+        self._commit()
+
+    def _select(self, sql: str, values: Sequence, params: tuple = ()) -> List[tuple]:
+        """
+        Run a query with an IN ({}) placeholder over values, in batches under SQLite's parameter limit
+
+        `params` are bound before the IN list, in every batch.
+        """
+        rows = []
+        values = list(values)
+        for start in range(0, len(values), 500):
+            batch = values[start:start + 500]
+            rows.extend(self._db.execute(sql.format(",".join("?" * len(batch))), (*params, *batch)).fetchall())
+        return rows
+
+    def _execute_many(self, sql: str, values: Sequence):
+        values = list(values)
+        for start in range(0, len(values), 500):
+            batch = values[start:start + 500]
+            self._db.execute(sql.format(",".join("?" * len(batch))), batch)
+
+    def _delete_slots(self, slots: List[int]) -> int:
+        """
+        Delete the points in these slots and free the slots for reuse
+        """
+        if not slots:
+            return 0
+        self._execute_many("DELETE FROM points WHERE slot IN ({})", slots)
+        self._execute_many("DELETE FROM postings WHERE slot IN ({})", slots)
+        for slot in slots:
+            self._alive[slot] = False
+            self._tenants[slot] = -1
+            self._documents[slot] = -1
+            if self._index is not None:
+                self._index.mark_deleted(slot)
+        self._free.extend(slots)
+        self._count -= len(slots)
+        self._commit()
+        return len(slots)
+
+    def document_exists(self, document_id: str, content_hash: str) -> bool:
+        """
+        Check whether this exact version of a document is already fully indexed
+
+        The content hash is only written once an ingest completes, so a
+        document counts as present when all of its points carry the hash.
+        """
+        with self._lock:
+            total, matching = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(content_hash = ?), 0) FROM points WHERE document_id = ?",
+                (content_hash, document_id)
+            ).fetchone()
+        return total > 0 and matching == total
+
+    def get_document_points(self, document_id: str) -> Dict[str, int]:
+        """
+        Get the points already stored for a document
+
+        Returns:
+            Mapping of point ID to its chunk_index
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, COALESCE(json_extract(payload, '$.chunk_index'), 0) FROM points WHERE document_id = ?",
+                (document_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def delete_points(self, point_ids: Iterable[str]) -> int:
+        """
+        Delete points by ID
+
+        Returns:
+            Number of points deleted
+        """
+        try:
+            with self._lock:
+                slots = [slot for slot, in self._select("SELECT slot FROM points WHERE id IN ({})", point_ids)]
+                deleted = self._delete_slots(slots)
+            if deleted:
+                logger.info(f"Deleted {deleted} points from the local store")
+            return deleted
+
+        except Exception as e:
+            logger.error(f"Error deleting points: {str(e)}")
+            raise
+
+    def set_chunk_indexes(self, chunk_indexes: Dict[str, int]):
+        """
+        Update the chunk_index of existing points (after chunks moved in an edited document)
+        """
+        with self._lock:
+            self._db.executemany(
+                "UPDATE points SET payload = json_set(payload, '$.chunk_index', ?) WHERE id = ?",
+                [(index, point_id) for point_id, index in chunk_indexes.items()]
+            )
+            self._commit()
+
+    def mark_document(self, document_id: str, payload: Dict):
+        """
+        Set payload fields (content_hash, s3_url, ...) on every point of a document
+        """
+        try:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT slot, payload FROM points WHERE document_id = ?", (document_id,)
+                ).fetchall()
+                updated = []
+                for slot, stored in rows:
+                    merged = {**json.loads(stored), **payload}
+                    updated.append((
+                        merged.get("tenant"), merged.get("filename"), merged.get("content_hash"),
+                        json.dumps(merged), slot
+                    ))
+                    self._set_slot(slot, merged.get("tenant"), merged.get("document_id"))
+                self._db.executemany(
+                    "UPDATE points SET tenant = ?, filename = ?, content_hash = ?, payload = ? WHERE slot = ?",
+                    updated
+                )
+                self._commit()
+
+        except Exception as e:
+            logger.error(f"Error updating document payload: {str(e)}")
+            raise
+
+    def delete_document(self, tenant: str, document_id: str) -> int:
+        """
+        Delete every point of one of a tenant's documents
+
+        Returns:
+            Number of points deleted
+        """
+        with self._lock:
+            slots = [
+                slot for slot, in self._db.execute(
+                    "SELECT slot FROM points WHERE tenant = ? AND document_id = ?", (tenant, document_id)
+                )
+            ]
+            count = self._delete_slots(slots)
+        logger.info(f"Deleted document {document_id} ({count} points) for tenant '{tenant}'")
+        return count
+
+    def delete_tenant(self, tenant: str):
+        """
+        Delete every point belonging to a tenant
+        """
+        with self._lock:
+            slots = [slot for slot, in self._db.execute("SELECT slot FROM points WHERE tenant = ?", (tenant,))]
+            self._delete_slots(slots)
+        logger.info(f"Deleted all documents for tenant '{tenant}'")
+
+    def list_documents(self, tenant: str, limit: int = 1000) -> List[Dict]:
+        """
+        List a tenant's documents (by filename) with their chunk counts
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT filename, COUNT(*) AS chunks FROM points WHERE tenant = ? AND filename IS NOT NULL "
+                "GROUP BY filename ORDER BY chunks DESC, filename LIMIT ?",
+                (tenant, limit)
+            ).fetchall()
+        return [{"filename": filename, "chunks": chunks} for filename, chunks in rows]
+
+    def iter_payloads(self, fields: List[str], batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Stream some payload fields of every point, a page at a time
+        """
+        return _iter_payloads(self._db, self._lock, fields, batch_size)
+
+    def _scope_mask(self, tenant: Optional[str], document_ids: Optional[List[str]]) -> np.ndarray:
+        """
+        Boolean mask over slots [0, size) of the live points a search may return
+        """
+        mask = self._alive[:self._size].copy()
+        if tenant is not None:
+            code = self._tenant_codes.get(tenant)
+            if code is None:
+                return np.zeros(self._size, dtype=bool)
+            mask &= self._tenants[:self._size] == code
+        if document_ids:
+            codes = [self._document_codes[d] for d in document_ids if d in self._document_codes]
+            mask &= np.isin(self._documents[:self._size], codes)
+        return mask
+
+    def _dense_search(self, queries: np.ndarray, mask: np.ndarray, limit: int) -> List[List[Tuple[int, float]]]:
+        """
+        Top (slot, cosine similarity) pairs among the masked slots, for each query row
+        """
+        candidates = int(mask.sum())
+        limit = min(limit, candidates)
+        if limit == 0:
+            return [[] for _ in queries]
+
+        if self._index is not None and candidates > self.hnsw_threshold:
+            self._index.set_ef(max(LOCAL_STORE_HNSW_EF, limit))
+            try:
+                scoped = None if candidates == self._count else (lambda slot: bool(mask[slot]))
+                labels, distances = self._index.knn_query(queries, k=limit, filter=scoped)
+                hnsw_searches.inc(len(queries))
+                # inner-product distance is 1 - similarity
+                return [
+                    [(int(slot), 1.0 - float(distance)) for slot, distance in zip(row_labels, row_distances)]
+                    for row_labels, row_distances in zip(labels, distances)
+                ]
+            except RuntimeError:
+                # a restrictive filter can leave the graph walk short of `limit` hits
+                pass
+
+        # one matrix multiply for all queries
+        exact_searches.inc(len(queries))
+        if candidates * 2 < self._size:
+            slots = np.flatnonzero(mask)
+            scores = queries @ self._vectors[slots].T
+        else:
+            slots = np.arange(self._size)
+            scores = np.where(mask, queries @ self._vectors[:self._size].T, -np.inf)
+
+        top = np.argpartition(-scores, limit - 1, axis=1)[:, :limit]
+        ranked = []
+        for row_scores, row_top in zip(scores, top):
+            row_top = row_top[np.argsort(-row_scores[row_top])]
+            ranked.append([(int(slots[i]), float(row_scores[i])) for i in row_top])
+        return ranked
+
+    def _postings(self, token: int, slots: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (slots, weights) of a token's postings, optionally only those in `slots`
+        """
+        if slots is None:
+            rows = self._db.execute("SELECT slot, weight FROM postings WHERE token = ?", (token,)).fetchall()
+        else:
+            rows = self._select(
+                "SELECT slot, weight FROM postings WHERE token = ? AND slot IN ({})",
+                [int(slot) for slot in slots],
+                params=(token,)
+            )
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        found, weights = zip(*rows)
+        return np.array(found, dtype=np.int64), np.array(weights)
+
+    def _lexical_search(
+        self,
+        terms: List[int],
+        mask: np.ndarray,
+        limit: int,
+        cutoff: float = HYBRID_LEXICAL_CUTOFF
+    ) -> List[Tuple[int, float]]:
+        """
+        Top (slot, BM25 score) pairs among the masked slots, without those
+        scoring below `cutoff` times the best
+
+        IDF is computed over the whole store at query time, like Qdrant's
+        IDF modifier. Terms are scored rarest first; once the terms left
+        can't lift an unscored point into the result (each adds at most
+        idf * (k1 + 1)), their postings are only read for points already
+        scored, so common words don't pull in most of the store.
+        """
+        df = dict(self._select(
+            "SELECT token, COUNT(*) FROM postings WHERE token IN ({}) GROUP BY token", terms
+        ))
+        if not df:
+            return []
+
+        tokens = sorted(df, key=df.get)
+        idf = {token: np.log(1 + (self._count - df[token] + 0.5) / (df[token] + 0.5)) for token in tokens}
+        remaining = sum(idf[token] * (sparse.BM25_K1 + 1) for token in tokens)
+
+        scores = np.zeros(len(mask))
+        hits = np.empty(0, dtype=np.int64)
+        for position, token in enumerate(tokens):
+            remaining -= idf[token] * (sparse.BM25_K1 + 1)
+            slots, weights = self._postings(token)
+            scores += np.bincount(slots, weights=idf[token] * weights, minlength=len(mask))[:len(mask)]
+
+            hits = np.flatnonzero(mask & (scores > 0))
+            if position + 1 < len(tokens) and len(hits):
+                # points under this score can't make the result: outside the top `limit`, or cut off
+                threshold = scores[hits].max() * cutoff
+                if len(hits) >= limit:
+                    threshold = max(threshold, np.partition(scores[hits], len(hits) - limit)[len(hits) - limit])
+                if remaining < threshold:
+                    for rest in tokens[position + 1:]:
+                        slots, weights = self._postings(rest, hits)
+                        np.add.at(scores, slots, idf[rest] * weights)
+                    break
+
+        if len(hits):
+            hits = hits[scores[hits] >= scores[hits].max() * cutoff]
+        if len(hits) > limit:
+            hits = hits[np.argpartition(-scores[hits], limit - 1)[:limit]]
+        hits = hits[np.argsort(-scores[hits])]
+        return [(int(slot), float(scores[slot])) for slot in hits]
+
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 3,
+        tenant: Optional[str] = None,
+        document_ids: Optional[List[str]] = None,
+        query_text: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Search for similar documents
+
+        With hybrid search enabled and query_text given, the dense and BM25
+        rankings are fused with reciprocal rank fusion; the score is then
+        the fused score.
+
+        Args:
+            query_vector: Query embedding vector (float32 array or list)
+            top_k: Number of results to return
+            tenant: Only search this tenant's documents
+            document_ids: Only search these documents
+            query_text: The query, for the lexical (BM25) side of hybrid search
+
+        Returns:
+            List of search results with text, metadata, and score
+        """
+        return self.search_batch([query_vector], top_k, tenant, document_ids, [query_text])[0]
+
+    def search_batch(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 3,
+        tenant: Optional[str] = None,
+        document_ids: Optional[List[str]] = None,
+        query_texts: Optional[List[Optional[str]]] = None
+    ) -> List[List[Dict]]:
+        """
+        Search for several queries over the same scope
+
+        The scope filter is built once and the dense side is one matrix
+        multiply (or one HNSW batch query) for all queries.
+
+        Args:
+            query_vectors: Query embeddings, one row per query
+            top_k: Number of results per query
+            tenant: Only search this tenant's documents
+            document_ids: Only search these documents
+            query_texts: The queries, for the lexical (BM25) side of hybrid search
+
+        Returns:
+            One list of search results per query, in query order
+        """
+        try:
+            queries = np.asarray(query_vectors, dtype=np.float32).reshape(len(query_vectors), -1)
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            queries = queries / np.where(norms > 0, norms, 1.0)
+
+            query_texts = query_texts or [None] * len(queries)
+            terms = [
+                sparse.query_vector(query_text)[0] if self.hybrid and query_text else []
+                for query_text in query_texts
+            ]
+            limit = max(top_k, HYBRID_CANDIDATES) if any(terms) else top_k
+
+            with self._lock:
+                mask = self._scope_mask(tenant, document_ids)
+                ranked = []
+                for dense, query_terms in zip(self._dense_search(queries, mask, limit), terms):
+                    if not query_terms:
+                        ranked.append(dense[:top_k])
+                        continue
+                    lexical = self._lexical_search(query_terms, mask, limit)
+                    ranked.append(sparse.hybrid_fuse([slot for slot, _ in dense], lexical)[:top_k])
+
+                payloads = dict(self._select(
+                    "SELECT slot, payload FROM points WHERE slot IN ({})",
+                    {slot for results in ranked for slot, _ in results}
+                ))
+
+            return [
+                [format_result(json.loads(payloads[slot]), score) for slot, score in results]
+                for results in ranked
+            ]
+
+        except Exception as e:
+            logger.error(f"Error searching: {str(e)}")
+            raise
+
+    def clear_collection(self):
+        """
+        Delete every point and shrink the store's files
+        """
+        try:
+            logger.info(f"Clearing local vector store: {self.path}")
+            with self._lock:
+                self._db.execute("DELETE FROM points")
+                self._db.execute("DELETE FROM postings")
+                self._db.execute("DELETE FROM meta")
+                self._db.commit()
+                self._vectors.flush()
+                del self._vectors
+                os.remove(self._vectors_path)
+                if os.path.exists(self._index_path):
+                    os.remove(self._index_path)
+                self._load()
+            logger.info("Collection cleared successfully")
+
+        except Exception as e:
+            logger.error(f"Error clearing collection: {str(e)}")
+            raise
+
+    def get_collection_count(self, tenant: Optional[str] = None) -> int:
+        """
+        Get the number of points in the store (or belonging to one tenant)
+        """
+        with self._lock:
+            if tenant is None:
+                return self._count
+            return self._db.execute("SELECT COUNT(*) FROM points WHERE tenant = ?", (tenant,)).fetchone()[0]
+
+    def close(self):
+        """
+        Flush the vector file, save the HNSW index, close SQLite and release the process lock
+        """
+        with self._lock:
+            self._vectors.flush()
+            if self._index is not None:
+                self._index.save_index(self._index_path)
+                # the saved index is only reused if nothing changed after this point
+                self._set_meta("index_generation", str(self._generation))
+            self._db.commit()
+            self._db.close()
+            self._lock_file.close()
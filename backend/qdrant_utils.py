@@ -1,14 +1,38 @@
 
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import (
+    Distance, VectorParams, Batch, Filter, FieldCondition, MatchValue, MatchAny,
+    FilterSelector, PayloadSchemaType, PointIdsList, SetPayload, SetPayloadOperation,
+    SparseVectorParams, SparseVector, Modifier, QueryRequest
+)
+from concurrent.futures import ThreadPoolExecutor, Future
+import numpy as np
 import os
 import logging
-from typing import List, Dict
+import threading
+import time
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 import uuid
 
+import metrics
+import sparse
+from sparse import HYBRID_SEARCH, HYBRID_CANDIDATES
+from transport import qdrant_client_args
+from vector_store import VectorStore, format_result
+
 logger = logging.getLogger(__name__)
 
-class QdrantManager:
+points_upserted = metrics.counter("qdrant_points_upserted", "Points sent to Qdrant")
+upsert_retries = metrics.counter("qdrant_upsert_retries", "Upsert batches retried after an error")
+ingest_throughput = metrics.gauge("qdrant_ingest_points_per_second", "Throughput of the most recent ingest")
+
+# Payload fields with keyword indexes, used for tenant and per-document filters
+INDEXED_FIELDS = ("tenant", "document_id", "filename", "content_hash")
+
+# Named sparse vector holding BM25 term weights (the embedding is the unnamed vector)
+SPARSE_VECTOR_NAME = "bm25"
+
+class QdrantManager(VectorStore):
     """
     Manages Qdrant vector database operations
     """
@@ -17,22 +41,33 @@ class QdrantManager:
         """
         Initialize Qdrant client and create collection if needed
         """
-        self.collection_name = "filefox_documents"
+        self.collection_name = os.getenv("QDRANT_COLLECTION", "filefox_documents")
         self.vector_size = 384  
+        # set by _ensure_collection: whether the collection has the BM25 sparse vector
+        self.hybrid = False
+        self.upsert_batch_size = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+        self.upsert_parallel = max(1, int(os.getenv("QDRANT_UPSERT_PARALLEL", "4")))
+        self.upsert_retries = int(os.getenv("QDRANT_UPSERT_RETRIES", "3"))
+        self._upsert_executor = ThreadPoolExecutor(
+            max_workers=self.upsert_parallel,
+            thread_name_prefix="qdrant-upsert"
+        )
         
         # client
         qdrant_url = os.getenv("QDRANT_URL")
         qdrant_api_key = os.getenv("QDRANT_API_KEY")
         
         if not qdrant_url or not qdrant_api_key:
-            raise ValueError 
+            raise ValueError("QDRANT_URL and QDRANT_API_KEY must be set")
         
         logger.info(f"Connecting to Qdrant at {qdrant_url}")
         
         try:
+            # pooled keep-alive REST transport, or gRPC with QDRANT_PREFER_GRPC
             self.client = QdrantClient(
                 url=qdrant_url,
                 api_key=qdrant_api_key,
+                **qdrant_client_args()
             )
             
             
@@ -59,94 +94,504 @@ class QdrantManager:
                     vectors_config=VectorParams(
                         size=self.vector_size,
                         distance=Distance.COSINE
-                    )
+                    ),
+                    # Qdrant applies IDF at query time, so only term weights are stored
+                    sparse_vectors_config={
+                        SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)
+                    } if HYBRID_SEARCH else None
                 )
                 logger.info("Collection created successfully")
             else:
                 logger.info(f"Collection '{self.collection_name}' already exists")
+            
+            sparse_vectors = self.client.get_collection(self.collection_name).config.params.sparse_vectors or {}
+            self.hybrid = HYBRID_SEARCH and SPARSE_VECTOR_NAME in sparse_vectors
+            if HYBRID_SEARCH and not self.hybrid:
+                logger.warning(
+                    f"Collection '{self.collection_name}' has no '{SPARSE_VECTOR_NAME}' sparse vector, "
+                    f"using dense search only (recreate the collection to enable hybrid search)"
+                )
+            
+            # idempotent, also adds indexes to collections created before they existed
+            for field in INDEXED_FIELDS:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field,
+                    field_schema=PayloadSchemaType.KEYWORD
+                )
         
         except Exception as e:
             logger.error(f"Error ensuring collection: {str(e)}")
             raise
     
-    def add_documents(
-        self, 
-        texts: List[str], 
-        embeddings: List[List[float]], 
+    def add_document_stream(
+        self,
+        batches: Iterable[Tuple[List[Dict], np.ndarray]],
         metadata: Dict
-    ) -> int:
+    ) -> Dict:
         """
-        Add documents to Qdrant
+        Add documents to Qdrant from a stream of (chunks, embeddings) batches
+        
+        Points are upserted in QDRANT_UPSERT_BATCH_SIZE batches with at most
+        QDRANT_UPSERT_PARALLEL requests in flight. Reading the next batch from
+        the stream blocks while that many requests are pending, so a fast
+        producer can't pile up unsent points in memory.
         
         Args:
-            texts: List of text chunks
-            embeddings: List of embedding vectors
+            batches: Iterable of (chunks, float32 embeddings) pairs, where each
+                chunk is a dict with "text" and optional extra payload (e.g. "page",
+                "chunk_index"). An "id" key sets the point ID, otherwise a random one is used
             metadata: Metadata to attach to all points (filename, s3_url, etc.)
             
         Returns:
-            Number of points added
+            Dict with points added, elapsed seconds and points per second
         """
+        in_flight = threading.BoundedSemaphore(self.upsert_parallel)
+        futures: List[Future] = []
+        chunk_index = 0
+        start_time = time.perf_counter()
+        
+        def release(_future):
+            in_flight.release()
+        
         try:
-            points = []
+            for chunks, embeddings in batches:
+                embeddings = np.asarray(embeddings, dtype=np.float32)
+                if len(chunks) != len(embeddings):
+                    raise ValueError(f"Got {len(chunks)} chunks but {len(embeddings)} embeddings")
+                
+                for start in range(0, len(chunks), self.upsert_batch_size):
+                    end = min(start + self.upsert_batch_size, len(chunks))
+                    
+                    # Only the batch being sent is converted for the request body,
+                    # the full matrix stays in one float32 buffer
+                    vectors = embeddings[start:end].tolist()
+                    if self.hybrid:
+                        vectors = {
+                            "": vectors,
+                            SPARSE_VECTOR_NAME: [
+                                self._sparse_vector(sparse.document_vector(chunks[i]["text"]))
+                                for i in range(start, end)
+                            ]
+                        }
+                    batch = Batch(
+                        ids=[chunks[i].get("id") or str(uuid.uuid4()) for i in range(start, end)],
+                        vectors=vectors,
+                        payloads=[
+                            {
+                                "chunk_index": chunk_index + i,
+                                **{k: v for k, v in chunks[i].items() if k != "id"},
+                                **metadata
+                            }
+                            for i in range(start, end)
+                        ]
+                    )
+                    
+                    in_flight.acquire()
+                    future = self._upsert_executor.submit(self._upsert_batch, batch)
+                    future.add_done_callback(release)
+                    futures.append(future)
+                    
+                    # surface failures early instead of after the whole stream
+                    pending = []
+                    for f in futures:
+                        if not f.done():
+                            pending.append(f)
+                        elif f.exception() is not None:
+                            raise f.exception()
+                    futures = pending
+                
+                chunk_index += len(chunks)
+            
+            for future in futures:
+                future.result()
+            
+            elapsed = time.perf_counter() - start_time
+            rate = chunk_index / elapsed if elapsed > 0 else 0.0
+            ingest_throughput.set(rate)
+            logger.info(f"Added {chunk_index} points to Qdrant in {elapsed:.2f}s ({rate:.0f} points/s)")
             
-            for i, (text, embedding) in enumerate(zip(texts, embeddings)):
-                point_id = str(uuid.uuid4())
+            return {
+                "points": chunk_index,
+                "seconds": elapsed,
+                "points_per_second": rate
+            }
+        
+        except Exception as e:
+            for future in futures:
+                future.cancel()
+            logger.error(f"Error adding documents: {str(e)}")
+            raise
+    
+    def _upsert_batch(self, batch: Batch):
+        """
+        Upsert one batch, retrying with exponential backoff
+        """
+        attempt = 0
+        while True:
+            try:
+                # wait=False lets Qdrant index in the background
+                self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=batch,
+                    wait=False
+                )
+                points_upserted.inc(len(batch.ids))
+                return
+            except Exception as e:
+                if attempt >= self.upsert_retries:
+                    raise
+                attempt += 1
+                upsert_retries.inc()
+                delay = 0.5 * 2 ** (attempt - 1)
+                logger.warning(f"Upsert of {len(batch.ids)} points failed ({e}), retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _document_filter(self, document_id: str, content_hash: Optional[str] = None) -> Filter:
+        """
+        Filter matching the points of one document (optionally one version of it)
+        """
+        conditions = [FieldCondition(key="document_id", match=MatchValue(value=document_id))]
+        if content_hash is not None:
+            conditions.append(FieldCondition(key="content_hash", match=MatchValue(value=content_hash)))
+        return Filter(must=conditions)
+    
+    def _scope_filter(self, tenant: Optional[str], document_ids: Optional[List[str]] = None) -> Optional[Filter]:
+        """
+        Filter restricting search to a tenant and optionally a set of its documents
+        """
+        conditions = []
+        if tenant is not None:
+            conditions.append(FieldCondition(key="tenant", match=MatchValue(value=tenant)))
+        if document_ids:
+            conditions.append(FieldCondition(key="document_id", match=MatchAny(any=list(document_ids))))
+        return Filter(must=conditions) if conditions else None
+    
+    def document_exists(self, document_id: str, content_hash: str) -> bool:
+        """
+        Check whether this exact version of a document is already fully indexed
+        
+        The content hash is only written once an ingest completes, so a
+        document counts as present when all of its points carry the hash.
+        """
+        try:
+            total = self.client.count(
+                collection_name=self.collection_name,
+                count_filter=self._document_filter(document_id),
+                exact=True
+            ).count
+            if total == 0:
+                return False
+            
+            matching = self.client.count(
+                collection_name=self.collection_name,
+                count_filter=self._document_filter(document_id, content_hash),
+                exact=True
+            ).count
+            return matching == total
+        
+        except Exception as e:
+            logger.error(f"Error checking document: {str(e)}")
+            raise
+    
+    def get_document_points(self, document_id: str) -> Dict[str, int]:
+        """
+        Get the points already stored for a document
+        
+        Returns:
+            Mapping of point ID to its chunk_index
+        """
+        try:
+            points = {}
+            offset = None
+            
+            while True:
+                records, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=self._document_filter(document_id),
+                    with_payload=["chunk_index"],
+                    with_vectors=False,
+                    limit=1000,
+                    offset=offset
+                )
+                for record in records:
+                    points[str(record.id)] = record.payload.get("chunk_index", 0)
                 
-                point = PointStruct(
-                    id=point_id,
-                    vector=embedding,
-                    payload={
-                        "text": text,
-                        "chunk_index": i,
-                        **metadata
-                    }
+                if offset is None:
+                    return points
+        
+        except Exception as e:
+            logger.error(f"Error listing document points: {str(e)}")
+            raise
+    
+    def delete_points(self, point_ids: Iterable[str]) -> int:
+        """
+        Delete points by ID
+        
+        Returns:
+            Number of points deleted
+        """
+        try:
+            point_ids = list(point_ids)
+            for start in range(0, len(point_ids), self.upsert_batch_size):
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=PointIdsList(points=point_ids[start:start + self.upsert_batch_size]),
+                    wait=False
+                )
+            
+            if point_ids:
+                logger.info(f"Deleted {len(point_ids)} points from Qdrant")
+            return len(point_ids)
+        
+        except Exception as e:
+            logger.error(f"Error deleting points: {str(e)}")
+            raise
+    
+    def set_chunk_indexes(self, chunk_indexes: Dict[str, int]):
+        """
+        Update the chunk_index of existing points (after chunks moved in an edited document)
+        """
+        try:
+            items = list(chunk_indexes.items())
+            for start in range(0, len(items), self.upsert_batch_size):
+                self.client.batch_update_points(
+                    collection_name=self.collection_name,
+                    update_operations=[
+                        SetPayloadOperation(
+                            set_payload=SetPayload(payload={"chunk_index": index}, points=[point_id])
+                        )
+                        for point_id, index in items[start:start + self.upsert_batch_size]
+                    ],
+                    wait=False
+                )
+        
+        except Exception as e:
+            logger.error(f"Error updating chunk indexes: {str(e)}")
+            raise
+    
+    def mark_document(self, document_id: str, payload: Dict):
+        """
+        Set payload fields (content_hash, s3_url, ...) on every point of a document
+        """
+        try:
+            self.client.set_payload(
+                collection_name=self.collection_name,
+                payload=payload,
+                points=self._document_filter(document_id),
+                wait=True
+            )
+        
+        except Exception as e:
+            logger.error(f"Error updating document payload: {str(e)}")
+            raise
+    
+    def delete_document(self, tenant: str, document_id: str) -> int:
+        """
+        Delete every point of one of a tenant's documents
+        
+        Returns:
+            Number of points deleted
+        """
+        try:
+            document_filter = self._scope_filter(tenant, [document_id])
+            count = self.client.count(
+                collection_name=self.collection_name,
+                count_filter=document_filter,
+                exact=True
+            ).count
+            
+            if count:
+                self.client.delete(
+                    collection_name=self.collection_name,
+                    points_selector=FilterSelector(filter=document_filter),
+                    wait=True
                 )
-                points.append(point)
             
-           
-            self.client.upsert(
+            logger.info(f"Deleted document {document_id} ({count} points) for tenant '{tenant}'")
+            return count
+        
+        except Exception as e:
+            logger.error(f"Error deleting document: {str(e)}")
+            raise
+    
+    def delete_tenant(self, tenant: str):
+        """
+        Delete every point belonging to a tenant
+        """
+        try:
+            self.client.delete(
                 collection_name=self.collection_name,
-                points=points
+                points_selector=FilterSelector(filter=self._scope_filter(tenant)),
+                wait=True
             )
+            logger.info(f"Deleted all documents for tenant '{tenant}'")
+        
+        except Exception as e:
+            logger.error(f"Error deleting tenant documents: {str(e)}")
+            raise
+    
+    def list_documents(self, tenant: str, limit: int = 1000) -> List[Dict]:
+        """
+        List a tenant's documents (by filename) with their chunk counts
+        """
+        try:
+            response = self.client.facet(
+                collection_name=self.collection_name,
+                key="filename",
+                facet_filter=self._scope_filter(tenant),
+                limit=limit,
+                exact=True
+            )
+            return [{"filename": hit.value, "chunks": hit.count} for hit in response.hits]
+        
+        except Exception as e:
+            logger.error(f"Error listing documents: {str(e)}")
+            raise
+    
+    def iter_payloads(self, fields: List[str], batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Stream some payload fields of every point, a page at a time
+        """
+        try:
+            offset = None
             
-            logger.info(f"Added {len(points)} points to Qdrant")
-            return len(points)
+            while True:
+                records, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    with_payload=fields,
+                    with_vectors=False,
+                    limit=batch_size,
+                    offset=offset
+                )
+                for record in records:
+                    yield record.payload or {}
+                
+                if offset is None:
+                    return
         
         except Exception as e:
-            logger.error(f"Error adding documents: {str(e)}")
+            logger.error(f"Error scrolling points: {str(e)}")
             raise
     
-    def search(self, query_vector: List[float], top_k: int = 3) -> List[Dict]:
+    @staticmethod
+    def _sparse_vector(vector: sparse.SparseVector) -> SparseVector:
+        indices, values = vector
+        return SparseVector(indices=indices, values=values)
+    
+    @staticmethod
+    def _format_result(point) -> Dict:
+        return format_result(point.payload, point.score)
+    
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 3,
+        tenant: Optional[str] = None,
+        document_ids: Optional[List[str]] = None,
+        query_text: Optional[str] = None
+    ) -> List[Dict]:
         """
         Search for similar documents
         
+        With hybrid search enabled and query_text given, the dense and BM25
+        rankings are fetched in one request and fused with reciprocal rank
+        fusion; the score is then the fused score.
+        
         Args:
-            query_vector: Query embedding vector
+            query_vector: Query embedding vector (float32 array or list)
             top_k: Number of results to return
+            tenant: Only search this tenant's documents
+            document_ids: Only search these documents
+            query_text: The query, for the lexical (BM25) side of hybrid search
             
         Returns:
             List of search results with text, metadata, and score
         """
+        return self.search_batch([query_vector], top_k, tenant, document_ids, [query_text])[0]
+    
+    def search_batch(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 3,
+        tenant: Optional[str] = None,
+        document_ids: Optional[List[str]] = None,
+        query_texts: Optional[List[Optional[str]]] = None
+    ) -> List[List[Dict]]:
+        """
+        Search for several queries in one Qdrant request
+        
+        Every query's dense (and, for hybrid, BM25) request goes into a
+        single query_batch_points call.
+        
+        Args:
+            query_vectors: Query embeddings, one row per query
+            top_k: Number of results per query
+            tenant: Only search this tenant's documents
+            document_ids: Only search these documents
+            query_texts: The queries, for the lexical (BM25) side of hybrid search
+            
+        Returns:
+            One list of search results per query, in query order
+        """
         try:
-            results = self.client.search(
+            query_filter = self._scope_filter(tenant, document_ids)
+            query_texts = query_texts or [None] * len(query_vectors)
+            
+            requests = []
+            # per query: (index of its dense request, index of its lexical request or None)
+            plan = []
+            for query_vector, query_text in zip(query_vectors, query_texts):
+                terms = sparse.query_vector(query_text) if self.hybrid and query_text else ([], [])
+                limit = max(top_k, HYBRID_CANDIDATES) if terms[0] else top_k
+                requests.append(QueryRequest(
+                    query=np.asarray(query_vector, dtype=np.float32).tolist(),
+                    filter=query_filter,
+                    limit=limit,
+                    with_payload=True
+                ))
+                if not terms[0]:
+                    plan.append((len(requests) - 1, None))
+                    continue
+                requests.append(QueryRequest(
+                    query=self._sparse_vector(terms),
+                    using=SPARSE_VECTOR_NAME,
+                    filter=query_filter,
+                    limit=limit,
+                    with_payload=True
+                ))
+                plan.append((len(requests) - 2, len(requests) - 1))
+            
+            if not requests:
+                return []
+            responses = self.client.query_batch_points(
                 collection_name=self.collection_name,
-                query_vector=query_vector,
-                limit=top_k
+                requests=requests
             )
             
-            formatted_results = []
-            for result in results:
-                formatted_results.append({
-                    "text": result.payload.get("text", ""),
-                    "metadata": {
-                        "filename": result.payload.get("filename", ""),
-                        "file_type": result.payload.get("file_type", ""),
-                        "chunk_index": result.payload.get("chunk_index", 0)
-                    },
-                    "score": result.score
-                })
+            results = []
+            for dense_index, lexical_index in plan:
+                dense = responses[dense_index].points
+                if lexical_index is None:
+                    results.append([self._format_result(point) for point in dense])
+                    continue
+                
+                lexical = responses[lexical_index].points
+                points = {point.id: point for point in lexical}
+                points.update((point.id, point) for point in dense)
+                fused = sparse.hybrid_fuse(
+                    [point.id for point in dense],
+                    [(point.id, point.score) for point in lexical]
+                )
+                
+                formatted_results = []
+                for point_id, score in fused[:top_k]:
+                    result = self._format_result(points[point_id])
+                    result["score"] = score
+                    formatted_results.append(result)
+                results.append(formatted_results)
             
-            return formatted_results
+            return results
         
         except Exception as e:
             logger.error(f"Error searching: {str(e)}")
@@ -166,11 +611,18 @@ class QdrantManager:
             logger.error(f"Error clearing collection: {str(e)}")
             raise
     
-    def get_collection_count(self) -> int:
+    def get_collection_count(self, tenant: Optional[str] = None) -> int:
         """
-        Get the number of points in the collection
+        Get the number of points in the collection (or belonging to one tenant)
         """
         try:
+            if tenant is not None:
+                return self.client.count(
+                    collection_name=self.collection_name,
+                    count_filter=self._scope_filter(tenant),
+                    exact=True
+                ).count
+            
             collection_info = self.client.get_collection(
                 collection_name=self.collection_name
             )
@@ -178,4 +630,10 @@ class QdrantManager:
         
         except Exception as e:
             logger.error(f"Error getting collection count: {str(e)}")
-            return 0
\ No newline at end of file
+            return 0    
+    def close(self):
+        """
+        Wait for pending upserts, then close the Qdrant connection
+        """
+        self._upsert_executor.shutdown(wait=True)
+        self.client.close()
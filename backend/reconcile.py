@@ -0,0 +1,199 @@
+"""
+Reconcile S3 files with the vector store
+
+Finds
+  - orphaned files: S3 objects no point's s3_url refers to (left behind by
+    failed or deleted uploads)
+  - missing files: indexed documents whose s3_url isn't in the bucket
+
+Both sides are streamed a page at a time into a temporary SQLite database
+and compared there, so memory use doesn't grow with the bucket or the
+collection. Nothing is changed unless asked: --delete-orphans removes
+orphaned files with batched DeleteObjects requests, --delete-missing
+removes the points of documents whose file is gone.
+
+Files newer than --min-age-hours are never reported as orphans, since their
+ingest may still be running; documents are only checked once fully indexed
+(their content hash is written after the upload finished).
+
+With VECTOR_STORE=local and the server running, the store is read without
+being opened (read-only SQLite) and --delete-missing is refused: the server
+keeps the store's filters in memory and wouldn't see the deletions.
+
+Usage:
+    python reconcile.py
+    python reconcile.py --delete-orphans --min-age-hours 24
+    python reconcile.py --prefix 2024 --show 100
+"""
+import argparse
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from itertools import islice
+
+from dotenv import load_dotenv
+
+# Rows written to the temporary database per executemany
+INSERT_BATCH_SIZE = 5000
+
+logger = logging.getLogger(__name__)
+
+
+def insert_stream(db: sqlite3.Connection, sql: str, rows) -> int:
+    """
+    Insert rows from an iterator in batches
+
+    Returns:
+        Number of rows passed in
+    """
+    rows = iter(rows)
+    total = 0
+    while True:
+        batch = list(islice(rows, INSERT_BATCH_SIZE))
+        if not batch:
+            return total
+        db.executemany(sql, batch)
+        total += len(batch)
+
+
+def load_objects(db: sqlite3.Connection, s3_manager, prefix: str, min_age: timedelta) -> int:
+    """
+    Record every S3 object (key, size, whether it is too new to judge)
+    """
+    cutoff = datetime.now(timezone.utc) - min_age
+    return insert_stream(
+        db,
+        "INSERT OR IGNORE INTO objects (key, size, recent) VALUES (?, ?, ?)",
+        (
+            (obj["Key"], obj.get("Size", 0), obj["LastModified"] > cutoff)
+            for obj in s3_manager.iter_objects(prefix)
+        )
+    )
+
+
+def load_documents(db: sqlite3.Connection, s3_manager, iter_payloads, prefix: str) -> dict:
+    """
+    Record the S3 key of every indexed document, one row per (key, document)
+
+    Args:
+        iter_payloads: VectorStore.iter_payloads, or local_store.read_payloads
+            for a store the server has open
+    """
+    counts = {"points": 0, "foreign": 0}
+
+    def rows():
+        for payload in iter_payloads(
+            fields=["s3_url", "tenant", "document_id", "filename", "content_hash"]
+        ):
+            counts["points"] += 1
+            if not payload.get("s3_url") or not payload.get("content_hash"):
+                continue
+            key = s3_manager.key_for_url(payload["s3_url"])
+            if key is None:
+                # uploaded to another bucket or endpoint, can't be checked here
+                counts["foreign"] += 1
+                continue
+            if key.startswith(prefix):
+                yield key, payload.get("tenant"), payload.get("document_id", ""), payload.get("filename")
+
+    insert_stream(
+        db,
+        "INSERT OR IGNORE INTO documents (key, tenant, document_id, filename) VALUES (?, ?, ?, ?)",
+        rows()
+    )
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--prefix", default="", help="Only reconcile keys starting with this")
+    parser.add_argument("--min-age-hours", type=float, default=1.0,
+                        help="Ignore S3 files uploaded more recently than this")
+    parser.add_argument("--delete-orphans", action="store_true", help="Delete orphaned S3 files")
+    parser.add_argument("--delete-missing", action="store_true",
+                        help="Delete the points of documents whose S3 file is missing")
+    parser.add_argument("--show", type=int, default=20, help="Orphans and missing files to print")
+    args = parser.parse_args()
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    from s3_utils import S3Manager
+    from vector_store import create_vector_store, vector_store_backend
+
+    vector_store = None
+    if vector_store_backend() == "local":
+        from local_store import LOCAL_STORE_PATH, LocalStoreLocked, read_payloads
+        try:
+            vector_store = create_vector_store()
+        except LocalStoreLocked:
+            if args.delete_missing:
+                parser.error("--delete-missing can't change the local vector store while the server has it open")
+            logger.info("Local vector store is in use, reading it read-only")
+            iter_payloads = partial(read_payloads, LOCAL_STORE_PATH)
+    else:
+        vector_store = create_vector_store()
+    if vector_store is not None:
+        iter_payloads = vector_store.iter_payloads
+
+    s3_manager = S3Manager()
+
+    # "" opens a temporary on-disk database, removed when it is closed
+    db = sqlite3.connect("")
+    db.executescript("""
+        CREATE TABLE objects (key TEXT PRIMARY KEY, size INTEGER, recent INTEGER) WITHOUT ROWID;
+        CREATE TABLE documents (
+            key TEXT NOT NULL,
+            tenant TEXT,
+            document_id TEXT NOT NULL,
+            filename TEXT,
+            PRIMARY KEY (key, document_id)
+        ) WITHOUT ROWID;
+    """)
+
+    try:
+        objects = load_objects(db, s3_manager, args.prefix, timedelta(hours=args.min_age_hours))
+        counts = load_documents(db, s3_manager, iter_payloads, args.prefix)
+        documents = db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        print(f"S3 files: {objects}, points: {counts['points']}, indexed documents: {documents}")
+        if counts["foreign"]:
+            print(f"Skipped {counts['foreign']} points with an s3_url outside bucket {s3_manager.bucket_name}")
+
+        orphans_sql = (
+            "FROM objects o WHERE NOT o.recent "
+            "AND NOT EXISTS (SELECT 1 FROM documents d WHERE d.key = o.key)"
+        )
+        orphans, orphan_bytes = db.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) {orphans_sql}").fetchone()
+        recent = db.execute("SELECT COUNT(*) FROM objects WHERE recent").fetchone()[0]
+        print(f"\nOrphaned S3 files: {orphans} ({orphan_bytes / 1024 / 1024:.1f} MB), {recent} too recent to check")
+        for key, size in db.execute(f"SELECT key, size {orphans_sql} ORDER BY key LIMIT ?", (args.show,)):
+            print(f"  {key}  {size} bytes")
+
+        missing_sql = "FROM documents d WHERE NOT EXISTS (SELECT 1 FROM objects o WHERE o.key = d.key)"
+        missing = db.execute(f"SELECT COUNT(*) {missing_sql}").fetchone()[0]
+        print(f"\nDocuments with a missing S3 file: {missing}")
+        for tenant, filename, key in db.execute(
+            f"SELECT tenant, filename, key {missing_sql} ORDER BY tenant, key LIMIT ?", (args.show,)
+        ):
+            print(f"  {tenant}/{filename}  {key}")
+
+        if args.delete_orphans and orphans:
+            result = s3_manager.delete_files(key for key, in db.execute(f"SELECT key {orphans_sql}"))
+            print(f"\nDeleted {result['deleted']} orphaned S3 files, {len(result['failed'])} failed")
+
+        if args.delete_missing and missing:
+            deleted = 0
+            for tenant, document_id in db.execute(f"SELECT DISTINCT tenant, document_id {missing_sql}"):
+                deleted += vector_store.delete_document(tenant, document_id)
+            print(f"\nDeleted {deleted} points of {missing} documents with a missing S3 file")
+
+    finally:
+        db.close()
+        if vector_store is not None:
+            vector_store.close()
+        s3_manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,84 @@
 import boto3
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
 from botocore.exceptions import ClientError
+from s3transfer.subscribers import BaseSubscriber
+import io
 import os
 import logging
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Union
+
+from transport import instrument_s3, s3_config
 
 logger = logging.getLogger(__name__)
 
+# Multipart upload settings (override in .env)
+# S3_MULTIPART_THRESHOLD_MB: files at least this large are uploaded in parts
+# S3_PART_SIZE_MB: size of each part (S3 requires at least 5 MB)
+# S3_UPLOAD_CONCURRENCY: threads uploading parts, shared by all uploads in flight
+MB = 1024 * 1024
+S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "16"))
+S3_PART_SIZE_MB = max(5, int(os.getenv("S3_PART_SIZE_MB", "8")))
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "8"))
+
+# Bulk delete settings (override in .env)
+# S3_DELETE_WORKERS: DeleteObjects requests sent in parallel
+S3_DELETE_WORKERS = int(os.getenv("S3_DELETE_WORKERS", "4"))
+
+# Keys per DeleteObjects request (the S3 maximum)
+DELETE_BATCH_SIZE = 1000
+
+
+class _DoneSubscriber(BaseSubscriber):
+    def __init__(self, done: threading.Event):
+        self._done = done
+
+    def on_done(self, future, **kwargs):
+        self._done.set()
+
+
+class S3Upload:
+    """
+    An upload running in the background (see S3Manager.start_upload)
+    """
+
+    def __init__(self, key: str, url: str):
+        self.key = key
+        self.url = url
+        self.future = None
+        self._done = threading.Event()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the upload to finish or fail
+
+        Returns:
+            True if it is done
+        """
+        return self._done.wait(timeout)
+
+    def result(self) -> str:
+        """
+        Wait for the upload and return its public URL (raises if the upload failed)
+        """
+        self.future.result()
+        return self.url
+
+    def cancel(self):
+        """
+        Stop the upload and wait until its parts are aborted, so the source file can be removed
+        """
+        if not self.done():
+            self.future.cancel()
+            self.wait()
+
 class S3Manager:
     """
     Manages file uploads to DigitalOcean Spaces (S3-compatible)
@@ -33,8 +106,19 @@ class S3Manager:
                 region_name=self.region,
                 endpoint_url=self.endpoint_url,
                 aws_access_key_id=self.access_key,
-                aws_secret_access_key=self.secret_key
+                aws_secret_access_key=self.secret_key,
+                # pool sized for the IO workers and ingest jobs sharing this client
+                config=s3_config()
             )
+            instrument_s3(self.client)
+            
+            # uploads stream from the source file in parts, S3_UPLOAD_CONCURRENCY at a time
+            self.transfer = create_transfer_manager(self.client, TransferConfig(
+                multipart_threshold=S3_MULTIPART_THRESHOLD_MB * MB,
+                multipart_chunksize=S3_PART_SIZE_MB * MB,
+                max_concurrency=S3_UPLOAD_CONCURRENCY,
+                use_threads=True
+            ))
             
             logger.info("S3 client initialized successfully")
         
@@ -42,36 +126,75 @@ class S3Manager:
             logger.error(f"Error initializing S3 client: {str(e)}")
             raise
     
-    def upload_file(self, file_content: bytes, filename: str) -> str:
+    def object_key(self, filename: str) -> str:
+        """
+        Generate a unique object key for a file (timestamp prefix)
+
+        The random part keeps uploads of the same filename within one second
+        from overwriting each other.
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"{timestamp}_{uuid.uuid4().hex[:12]}_{filename}"
+    
+    def public_url(self, key: str) -> str:
+        """
+        Public URL of an object
+        """
+        # Format: https://bucket-name.region.digitaloceanspaces.com/filename
+        base_url = self.endpoint_url.replace('https://', '')
+        return f"https://{self.bucket_name}.{base_url}/{key}"
+    
+    def key_for_url(self, url: str) -> Optional[str]:
+        """
+        Object key of a public URL from this bucket (None for other URLs)
+        """
+        prefix = self.public_url("")
+        return url[len(prefix):] if url.startswith(prefix) else None
+    
+    def start_upload(self, source: Union[str, BinaryIO], key: str) -> S3Upload:
+        """
+        Start uploading a file in the background
+        
+        Files from S3_MULTIPART_THRESHOLD_MB up are sent as a multipart
+        upload with parts going out in parallel; parts are read from the
+        source as they are sent, so the file is never held in memory.
+        
+        Args:
+            source: Path of the file, or a seekable binary file positioned at its start
+            key: Object key (see object_key)
+            
+        Returns:
+            S3Upload to wait on or cancel
+        """
+        upload = S3Upload(key, self.public_url(key))
+        logger.info(f"Uploading file: {key}")
+        upload.future = self.transfer.upload(
+            source,
+            self.bucket_name,
+            key,
+            extra_args={"ACL": "public-read"},  # publicly accessible
+            subscribers=[_DoneSubscriber(upload._done)]
+        )
+        return upload
+    
+    def upload_file(self, file_content: Union[bytes, BinaryIO], filename: str) -> str:
         """
         Upload file to DigitalOcean Spaces
         
         Args:
-            file_content: File content as bytes
+            file_content: File content as bytes or a seekable binary file
             filename: Original filename
             
         Returns:
             Public URL of the uploaded file
         """
         try:
-            # Generate unique filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            unique_filename = f"{timestamp}_{filename}"
-            
-            logger.info(f"Uploading file: {unique_filename}")
-            
-            # Upload file
-            self.client.put_object(
-                Bucket=self.bucket_name,
-                Key=unique_filename,
-                Body=file_content,
-                ACL='public-read'  # publicly accessible
-            )
+            if isinstance(file_content, bytes):
+                file_content = io.BytesIO(file_content)
+            else:
+                file_content.seek(0)
             
-            # Construct public URL
-            # Format: https://bucket-name.region.digitaloceanspaces.com/filename
-            base_url = self.endpoint_url.replace('https://', '')
-            public_url = f"https://{self.bucket_name}.{base_url}/{unique_filename}"
+            public_url = self.start_upload(file_content, self.object_key(filename)).result()
             
             logger.info(f"File uploaded successfully: {public_url}")
             return public_url
@@ -108,21 +231,100 @@ class S3Manager:
             logger.error(f"Error deleting file: {str(e)}")
             return False
     
+    def delete_files(self, keys: Iterable[str], workers: int = S3_DELETE_WORKERS) -> Dict:
+        """
+        Delete many files with batched DeleteObjects requests
+        
+        Keys are consumed lazily, DELETE_BATCH_SIZE per request with up to
+        `workers` requests in flight, so any number of keys can be streamed in.
+        
+        Args:
+            keys: Keys of the files to delete
+            workers: DeleteObjects requests sent in parallel
+            
+        Returns:
+            Dict with the number of files deleted and the keys that failed
+        """
+        keys = iter(keys)
+        deleted = 0
+        failed = []
+        
+        def delete_batch(batch):
+            response = self.client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+            )
+            # in quiet mode only failures are listed
+            return len(batch), [error["Key"] for error in response.get("Errors", [])]
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="filefox-s3-delete") as executor:
+            pending = set()
+            while True:
+                while len(pending) < max(1, workers):
+                    batch = list(islice(keys, DELETE_BATCH_SIZE))
+                    if not batch:
+                        break
+                    pending.add(executor.submit(delete_batch, batch))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        count, errors = future.result()
+                    except ClientError as e:
+                        logger.error(f"Error deleting files: {str(e)}")
+                        raise
+                    deleted += count - len(errors)
+                    failed.extend(errors)
+        
+        if failed:
+            logger.error(f"Failed to delete {len(failed)} files, e.g. {failed[0]}")
+        logger.info(f"Deleted {deleted} files")
+        return {"deleted": deleted, "failed": failed}
+    
+    def iter_objects(self, prefix: str = "") -> Iterator[Dict]:
+        """
+        Stream the bucket's objects, one ListObjectsV2 page at a time
+        
+        Args:
+            prefix: Only list keys starting with this
+            
+        Yields:
+            Object summaries with Key, Size and LastModified
+        """
+        try:
+            paginator = self.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=self.bucket_name, Prefix=prefix):
+                yield from page.get("Contents", [])
+        
+        except ClientError as e:
+            logger.error(f"Error listing files: {str(e)}")
+            raise
+    
+    def iter_files(self, prefix: str = "") -> Iterator[str]:
+        """
+        Stream the bucket's file keys (see iter_objects)
+        """
+        for obj in self.iter_objects(prefix):
+            yield obj["Key"]
+    
     def list_files(self) -> list:
         """
         List all files in the bucket
         
+        Holds every key in memory; use iter_files for large buckets.
+        
         Returns:
             List of file keys
         """
         try:
-            response = self.client.list_objects_v2(Bucket=self.bucket_name)
-            
-            if 'Contents' in response:
-                return [obj['Key'] for obj in response['Contents']]
-            else:
-                return []
+            return list(self.iter_files())
         
-        except ClientError as e:
-            logger.error(f"Error listing files: {str(e)}")
-            return []
\ No newline at end of file
+        except ClientError:
+            return []
+    
+    def close(self):
+        """
+        Stop the upload threads (called on shutdown, after ingest jobs cancelled their uploads)
+        """
+        self.transfer.shutdown()
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from concurrency import run_io
+
+logger = logging.getLogger(__name__)
+
+# Startup settings (override in .env)
+# SERVICE_RETRY_SECONDS: delay before retrying a dependency that failed to initialize
+# SERVICE_WAIT_SECONDS: how long a request waits for a dependency that is still starting
+SERVICE_RETRY_SECONDS = float(os.getenv("SERVICE_RETRY_SECONDS", "10"))
+SERVICE_WAIT_SECONDS = float(os.getenv("SERVICE_WAIT_SECONDS", "10"))
+
+
+class ServiceUnavailable(RuntimeError):
+    """
+    Raised when a dependency isn't initialized (yet)
+    """
+
+
+class Service:
+    """
+    One lazily built dependency and its state
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        warm_up: Optional[Callable[[Any], Any]] = None,
+        runner: Callable[..., Awaitable[Any]] = run_io,
+        critical: bool = True,
+        close: Optional[Callable[[Any], Any]] = None
+    ):
+        self.name = name
+        self.factory = factory
+        self.warm_up = warm_up
+        self.runner = runner
+        self.critical = critical
+        self.close = close
+        self.instance: Any = None
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.init_seconds: Optional[float] = None
+        self.ready = threading.Event()
+        self.ready_async: Optional[asyncio.Event] = None
+
+
+class ServiceManager:
+    """
+    Builds the app's clients in the background and tracks their readiness
+
+    Dependencies initialize concurrently once start() is called, so the
+    server accepts connections (and answers liveness probes) right away.
+    A dependency that fails to initialize is retried every
+    SERVICE_RETRY_SECONDS instead of taking the process down.
+    """
+
+    def __init__(self, retry_seconds: float = SERVICE_RETRY_SECONDS):
+        self.retry_seconds = retry_seconds
+        self._services: Dict[str, Service] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        warm_up: Optional[Callable[[Any], Any]] = None,
+        runner: Callable[..., Awaitable[Any]] = run_io,
+        critical: bool = True,
+        close: Optional[Callable[[Any], Any]] = None
+    ):
+        """
+        Add a dependency
+
+        Args:
+            name: Name used by get()/require() and in readiness reports
+            factory: Builds the instance; blocking factories run on `runner`'s
+                pool, async ones on the event loop
+            warm_up: Called with the new instance before it's marked ready
+            runner: run_io or run_embed, the pool factory and warm_up run on
+            critical: Whether /readyz waits for this dependency
+            close: Called with the instance by close() at shutdown
+        """
+        self._services[name] = Service(name, factory, warm_up, runner, critical, close)
+
+    async def start(self):
+        """
+        Start initializing every registered dependency (returns immediately)
+        """
+        for service in self._services.values():
+            service.ready_async = asyncio.Event()
+            self._tasks[service.name] = asyncio.create_task(self._initialize(service))
+
+    async def _initialize(self, service: Service):
+        while True:
+            service.attempts += 1
+            start = time.perf_counter()
+            try:
+                if asyncio.iscoroutinefunction(service.factory):
+                    instance = await service.factory()
+                else:
+                    instance = await service.runner(service.factory)
+                if service.warm_up is not None:
+                    await service.runner(service.warm_up, instance)
+            except Exception as e:
+                service.error = str(e) or type(e).__name__
+                logger.error(
+                    f"Initializing {service.name} failed (attempt {service.attempts}): {str(e)}; "
+                    f"retrying in {self.retry_seconds:.0f}s"
+                )
+                await asyncio.sleep(self.retry_seconds)
+                continue
+
+            service.instance = instance
+            service.error = None
+            service.init_seconds = time.perf_counter() - start
+            service.ready.set()
+            service.ready_async.set()
+            logger.info(f"{service.name} ready in {service.init_seconds:.2f}s")
+            return
+
+    def get(self, name: str) -> Any:
+        """
+        The dependency's instance
+
+        Raises:
+            ServiceUnavailable: If it isn't ready
+        """
+        service = self._services[name]
+        if not service.ready.is_set():
+            raise ServiceUnavailable(self._unavailable_message(service))
+        return service.instance
+
+    async def require(self, name: str, timeout: float = SERVICE_WAIT_SECONDS) -> Any:
+        """
+        The dependency's instance, waiting up to `timeout` seconds while it starts
+
+        Raises:
+            ServiceUnavailable: If it isn't ready in time
+        """
+        service = self._services[name]
+        if not service.ready.is_set() and service.ready_async is not None:
+            try:
+                await asyncio.wait_for(service.ready_async.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.get(name)
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> Any:
+        """
+        Blocking require() for worker threads (timeout None waits indefinitely)
+        """
+        self._services[name].ready.wait(timeout)
+        return self.get(name)
+
+    def is_ready(self) -> bool:
+        """
+        Whether every critical dependency is ready
+        """
+        return all(service.ready.is_set() for service in self._services.values() if service.critical)
+
+    def status(self) -> Dict[str, Dict]:
+        """
+        Readiness of every dependency
+        """
+        return {
+            service.name: {
+                "ready": service.ready.is_set(),
+                "critical": service.critical,
+                "attempts": service.attempts,
+                "init_seconds": round(service.init_seconds, 3) if service.init_seconds is not None else None,
+                "error": service.error
+            }
+            for service in self._services.values()
+        }
+
+    @staticmethod
+    def _unavailable_message(service: Service) -> str:
+        if service.error:
+            return f"{service.name} is unavailable: {service.error}"
+        return f"{service.name} is still starting"
+
+    async def stop(self):
+        """
+        Cancel initializations still in progress
+        """
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+    async def close(self):
+        """
+        Release ready dependencies that registered a close function
+        """
+        for service in self._services.values():
+            if service.close is None or not service.ready.is_set():
+                continue
+            try:
+                await service.runner(service.close, service.instance)
+            except Exception as e:
+                logger.error(f"Closing {service.name} failed: {str(e)}")
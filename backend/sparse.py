@@ -0,0 +1,129 @@
+import os
+import re
+import zlib
+from collections import Counter
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+# Lexical search settings (override in .env)
+# BM25_K1 / BM25_B: term frequency saturation and length normalization
+# BM25_AVG_DOC_TOKENS: typical chunk length in tokens, stands in for the corpus average
+# RRF_K: reciprocal rank fusion constant (higher flattens the rank weighting)
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+BM25_AVG_DOC_TOKENS = float(os.getenv("BM25_AVG_DOC_TOKENS", "100"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Hybrid search settings (override in .env)
+# HYBRID_SEARCH: index BM25 sparse vectors next to the embeddings and fuse both rankings
+# HYBRID_CANDIDATES: results taken from each retriever before fusion
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+# HYBRID_LEXICAL_CUTOFF: drop BM25 hits scoring below this fraction of the best one, so
+# chunks sharing only common terms with the query don't get rank credit in the fusion
+HYBRID_LEXICAL_CUTOFF = float(os.getenv("HYBRID_LEXICAL_CUTOFF", "0.1"))
+
+# letters/digits, keeping identifiers like SKU-00123, v2.1 or A/B-7 together
+_token = re.compile(r"[^\W_]+(?:[-_./:#][^\W_]+)*")
+_identifier_separators = re.compile(r"[-_./:#]")
+
+_stopwords = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the "
+    "this to was were what when where which who will with how do does can".split()
+)
+
+# (indices, values) of a sparse vector
+SparseVector = Tuple[List[int], List[float]]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased word and identifier tokens, without stopwords
+
+    Compound identifiers are kept whole and also split into their parts,
+    so "SKU-00123" matches both "sku-00123" and "00123".
+    """
+    tokens = []
+    for match in _token.finditer(text.lower()):
+        token = match.group()
+        if token in _stopwords:
+            continue
+        tokens.append(token)
+        if not token.isalnum():
+            tokens.extend(part for part in _identifier_separators.split(token) if part)
+    return tokens
+
+
+def token_index(token: str) -> int:
+    """
+    Stable sparse-vector dimension for a token
+    """
+    return zlib.crc32(token.encode("utf-8")) & 0x7FFFFFFF
+
+
+def document_vector(text: str) -> SparseVector:
+    """
+    BM25-weighted term frequencies of a chunk
+
+    IDF isn't included: the index applies it at query time, so it stays
+    correct as documents are added and removed.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return [], []
+
+    length_norm = 1 - BM25_B + BM25_B * len(tokens) / BM25_AVG_DOC_TOKENS
+    weights: Dict[int, float] = {}
+    for token, tf in Counter(tokens).items():
+        index = token_index(token)
+        # hash collisions add up
+        weights[index] = weights.get(index, 0.0) + tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+    return list(weights), list(weights.values())
+
+
+def query_vector(text: str) -> SparseVector:
+    """
+    Sparse vector of a query's unique terms
+    """
+    indices = sorted({token_index(token) for token in tokenize(text)})
+    return indices, [1.0] * len(indices)
+
+
+def rrf_fuse(rankings: Sequence[Sequence[Hashable]], k: int = RRF_K) -> List[Tuple[Hashable, float]]:
+    """
+    Reciprocal rank fusion of several ranked lists of ids
+
+    Args:
+        rankings: Ranked ids from each retriever, best first
+        k: Fusion constant
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+def hybrid_fuse(
+    dense: Sequence[Hashable],
+    lexical: Sequence[Tuple[Hashable, float]],
+    cutoff: float = HYBRID_LEXICAL_CUTOFF
+) -> List[Tuple[Hashable, float]]:
+    """
+    Fuse a dense ranking with a BM25 ranking
+
+    Args:
+        dense: Ranked ids from the embedding search, best first
+        lexical: (id, BM25 score) pairs, best first
+        cutoff: Lexical hits scoring below this fraction of the best one are dropped
+
+    Returns:
+        (id, fused score) pairs, best first
+    """
+    best_lexical = lexical[0][1] if lexical else 0.0
+    return rrf_fuse([
+        dense,
+        [item for item, score in lexical if score >= best_lexical * cutoff]
+    ])
@@ -0,0 +1,47 @@
+import os
+import socket
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def moto_endpoint():
+    """
+    Local S3 stand-in (moto's server) for the session
+    """
+    server_module = pytest.importorskip("moto.server")
+    port = _free_port()
+    server = server_module.ThreadedMotoServer(ip_address="127.0.0.1", port=port, verbose=False)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3_env(moto_endpoint, monkeypatch):
+    """
+    DO Spaces settings pointing at an empty bucket on the moto server
+    """
+    import boto3
+
+    bucket = f"test-{uuid.uuid4().hex[:12]}"
+    monkeypatch.setenv("DO_SPACES_KEY", "test")
+    monkeypatch.setenv("DO_SPACES_SECRET", "test")
+    monkeypatch.setenv("DO_SPACES_ENDPOINT", moto_endpoint)
+    monkeypatch.setenv("DO_SPACES_BUCKET", bucket)
+    monkeypatch.setenv("DO_SPACES_REGION", "us-east-1")
+    boto3.client(
+        "s3", endpoint_url=moto_endpoint, region_name="us-east-1",
+        aws_access_key_id="test", aws_secret_access_key="test"
+    ).create_bucket(Bucket=bucket)
+    return bucket
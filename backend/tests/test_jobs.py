@@ -0,0 +1,139 @@
+"""
+Tests for ingest jobs and /upload, against a local
+vector store, a moto S3 server and a fake embedding model
+"""
+import hashlib
+import time
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+import jobs
+from ingest import document_id_for, hash_file
+from jobs import JobManager, JobStore, SUCCEEDED, FINISHED_STATUSES
+from local_store import LocalVectorStore
+from s3_utils import S3Manager
+
+
+class SlowEmbeddings:
+    """
+    Deterministic vectors, slow enough that concurrent jobs overlap
+    """
+    dimension = 384
+
+    def generate_embeddings(self, texts, normalize=False):
+        time.sleep(0.02)
+        vectors = [
+            np.frombuffer(hashlib.sha256(text.encode()).digest() * 48, dtype=np.uint8)[:384].astype(np.float32)
+            for text in texts
+        ]
+        return np.stack(vectors) if vectors else np.empty((0, 384), dtype=np.float32)
+
+
+@pytest.fixture
+def manager(tmp_path, s3_env, monkeypatch):
+    store = LocalVectorStore(str(tmp_path / "vectors"))
+    services = {"s3": S3Manager(), "embedding": SlowEmbeddings(), "vector_store": store}
+    monkeypatch.setattr(app, "wait_for_service", lambda name, progress: services[name])
+    monkeypatch.setattr(jobs, "INGEST_SPOOL_DIR", str(tmp_path / "spool"))
+    manager = JobManager(app.run_ingest_job, store=JobStore(str(tmp_path / "jobs.sqlite3")), workers=2)
+    manager.vector_store = store
+    manager.spool_dir = tmp_path
+    yield manager
+    manager.shutdown()
+    services["s3"].close()
+    store.close()
+
+
+def submit(manager, filename, content):
+    spool_path = manager.new_spool_path(".csv")
+    with open(spool_path, "wb") as spool:
+        spool.write(content)
+    with open(spool_path, "rb") as spool:
+        content_hash = hash_file(spool)
+    job = manager.store.create(
+        tenant="t",
+        document_id=document_id_for("t", filename),
+        filename=filename,
+        file_type=".csv",
+        spool_path=spool_path,
+        content_hash=content_hash
+    )
+    return manager.submit(job)
+
+
+def wait_finished(manager, job_ids, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        found = [manager.store.get(job_id) for job_id in job_ids]
+        if all(job["status"] in FINISHED_STATUSES for job in found):
+            return found
+        time.sleep(0.05)
+    raise TimeoutError("jobs didn't finish")
+
+
+def csv_rows(count, label):
+    return b"id,value\n" + b"".join(b"%d,%s %d\n" % (i, label, i) for i in range(count))
+
+
+def test_versions_of_one_document_ingest_in_order(manager):
+    v1, v2 = csv_rows(600, b"first"), csv_rows(400, b"second")
+    first = submit(manager, "x.csv", v1)
+    second = submit(manager, "x.csv", v2)
+
+    first, second = wait_finished(manager, [first["id"], second["id"]])
+
+    assert first["status"] == SUCCEEDED and second["status"] == SUCCEEDED
+    # the second job started after the first was done
+    assert second["started_at"] >= first["finished_at"]
+    document_id = document_id_for("t", "x.csv")
+    store = manager.vector_store
+    assert store.get_collection_count("t") == second["result"]["chunks_processed"]
+    assert store.document_exists(document_id, second["content_hash"])
+    assert not store.document_exists(document_id, first["content_hash"])
+    assert first["result"]["s3_url"] != second["result"]["s3_url"]
+
+
+def test_duplicate_upload_waiting_behind_its_twin_is_skipped(manager):
+    content = csv_rows(300, b"same")
+    first = submit(manager, "y.csv", content)
+    second = submit(manager, "y.csv", content)
+
+    first, second = wait_finished(manager, [first["id"], second["id"]])
+
+    assert first["result"]["unchanged"] is False
+    assert second["status"] == SUCCEEDED
+    assert second["result"]["unchanged"] is True
+
+
+def test_other_documents_run_in_parallel(manager):
+    first = submit(manager, "a.csv", csv_rows(600, b"a"))
+    second = submit(manager, "b.csv", csv_rows(600, b"b"))
+
+    first, second = wait_finished(manager, [first["id"], second["id"]])
+
+    assert second["started_at"] < first["finished_at"]
+
+
+def test_upload_of_unchanged_file_returns_200_without_job(manager, monkeypatch):
+    async def require(name, timeout=None):
+        return manager.vector_store
+
+    monkeypatch.setattr(app, "job_manager", manager)
+    monkeypatch.setattr(app.services, "require", require)
+    # no lifespan: the job manager and store are the fixture's
+    client = TestClient(app.app)
+    content = csv_rows(50, b"row")
+
+    queued = client.post("/upload", files={"file": ("z.csv", content)}, headers={"X-Tenant-ID": "t"})
+    assert queued.status_code == 202
+    assert queued.json()["unchanged"] is False
+    job, = wait_finished(manager, [queued.json()["job_id"]])
+    assert job["status"] == SUCCEEDED
+
+    again = client.post("/upload", files={"file": ("z.csv", content)}, headers={"X-Tenant-ID": "t"})
+    assert again.status_code == 200
+    assert again.json()["unchanged"] is True
+    assert again.json()["job_id"] is None
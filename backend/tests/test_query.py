@@ -0,0 +1,88 @@
+"""
+Tests for POST /query, with the embedding model, vector store and LLM faked
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+from answer_cache import AnswerCache
+
+VECTOR = np.ones(384, dtype=np.float32) / np.sqrt(384)
+RESULTS = [
+    {
+        "text": "Invoices are due within 30 days.",
+        "metadata": {"document_id": "doc-1", "filename": "terms.pdf", "file_type": ".pdf", "chunk_index": 0, "page": 2},
+        "score": 0.91
+    },
+    {
+        "text": "Late payments incur a 2% fee.",
+        "metadata": {"document_id": "doc-1", "filename": "terms.pdf", "file_type": ".pdf", "chunk_index": 4, "page": 3},
+        "score": 0.84
+    }
+]
+
+
+class FakeBatcher:
+    async def embed(self, text):
+        return VECTOR
+
+
+class FakeStore:
+    def __init__(self, results):
+        self.results = results
+        self.searches = 0
+
+    def search(self, **kwargs):
+        self.searches += 1
+        return self.results
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = FakeStore(RESULTS)
+
+    async def require(name, timeout=None):
+        return store
+
+    async def generate(question, context, max_tokens=500):
+        return "Within 30 days.", True
+
+    monkeypatch.setattr(app, "query_batcher", FakeBatcher())
+    monkeypatch.setattr(app.services, "require", require)
+    monkeypatch.setattr(app.llm_gate, "generate", generate)
+    monkeypatch.setattr(app, "answer_cache", AnswerCache())
+    # no lifespan: the fakes stand in for the services it would start
+    client = TestClient(app.app)
+    client.store = store
+    return client
+
+
+def test_query_returns_sources(client):
+    response = client.post("/query", json={"question": "When are invoices due?"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["answer"] == "Within 30 days."
+    assert body["cached"] is False
+    assert body["sources"]
+    assert body["sources"][0]["filename"] == "terms.pdf"
+    assert body["sources"][0]["page"] == 2
+
+
+def test_cached_query_returns_sources(client):
+    first = client.post("/query", json={"question": "When are invoices due?"}).json()
+    second = client.post("/query", json={"question": "When are invoices due?"}).json()
+
+    assert second["cached"] is True
+    assert client.store.searches == 1
+    assert second["sources"] == first["sources"]
+    assert second["sources"]
+
+
+def test_query_without_results_has_no_sources(client):
+    client.store.results = []
+    body = client.post("/query", json={"question": "Anything?"}).json()
+
+    assert body["answer"] == app.NO_DOCUMENTS_ANSWER
+    assert body["sources"] == []
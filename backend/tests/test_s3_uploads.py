@@ -0,0 +1,90 @@
+"""
+Tests for S3Manager uploads against a moto S3 server
+"""
+import os
+import threading
+import time
+
+import pytest
+from botocore.exceptions import ClientError
+from s3transfer.exceptions import CancelledError
+
+import s3_utils
+from s3_utils import MB, S3Manager
+
+
+@pytest.fixture
+def s3(s3_env, monkeypatch):
+    monkeypatch.setattr(s3_utils, "S3_MULTIPART_THRESHOLD_MB", 5)
+    monkeypatch.setattr(s3_utils, "S3_PART_SIZE_MB", 5)
+    s3 = S3Manager()
+    s3.calls = []
+    s3.client.meta.events.register("before-call.s3", lambda model, **kwargs: s3.calls.append(model.name))
+    yield s3
+    s3.close()
+
+
+@pytest.fixture
+def big_file(tmp_path):
+    path = tmp_path / "big.bin"
+    path.write_bytes(os.urandom(12 * MB))
+    return str(path)
+
+
+def open_uploads(s3):
+    return s3.client.list_multipart_uploads(Bucket=s3.bucket_name).get("Uploads", [])
+
+
+def test_large_file_is_uploaded_in_parts(s3, big_file):
+    upload = s3.start_upload(big_file, s3.object_key("big.bin"))
+
+    assert upload.result() == s3.public_url(upload.key)
+    assert s3.calls.count("CreateMultipartUpload") == 1
+    assert s3.calls.count("UploadPart") == 3
+    assert s3.calls.count("CompleteMultipartUpload") == 1
+    with open(big_file, "rb") as source:
+        assert s3.client.get_object(Bucket=s3.bucket_name, Key=upload.key)["Body"].read() == source.read()
+
+
+def test_small_file_is_uploaded_in_one_request(s3):
+    url = s3.upload_file(b"x" * (4 * MB), "small.bin")
+
+    assert s3.calls.count("PutObject") == 1
+    assert "CreateMultipartUpload" not in s3.calls
+    assert s3.client.head_object(Bucket=s3.bucket_name, Key=s3.key_for_url(url))["ContentLength"] == 4 * MB
+
+
+def test_failed_part_aborts_the_upload(s3, big_file):
+    def fail_second_part(params, **kwargs):
+        if params["PartNumber"] == 2:
+            raise ClientError({"Error": {"Code": "InternalError", "Message": "part failed"}}, "UploadPart")
+
+    s3.client.meta.events.register("provide-client-params.s3.UploadPart", fail_second_part)
+    upload = s3.start_upload(big_file, s3.object_key("big.bin"))
+
+    with pytest.raises(ClientError):
+        upload.result()
+    assert "AbortMultipartUpload" in s3.calls
+    assert open_uploads(s3) == []
+    assert "Contents" not in s3.client.list_objects_v2(Bucket=s3.bucket_name)
+
+
+def test_cancel_aborts_an_upload_in_flight(s3, big_file):
+    started = threading.Event()
+
+    def slow_part(**kwargs):
+        started.set()
+        time.sleep(0.2)
+
+    s3.client.meta.events.register("before-call.s3.UploadPart", slow_part)
+    upload = s3.start_upload(big_file, s3.object_key("big.bin"))
+    assert started.wait(10)
+
+    upload.cancel()
+
+    assert upload.done()
+    with pytest.raises(CancelledError):
+        upload.result()
+    assert "AbortMultipartUpload" in s3.calls
+    assert "CompleteMultipartUpload" not in s3.calls
+    assert open_uploads(s3) == []
@@ -0,0 +1,230 @@
+import os
+import time
+from typing import Callable, Dict, Optional
+
+import httpx
+from botocore.config import Config
+
+import metrics
+
+# Connection pool settings (override in .env)
+# OLLAMA_MAX_CONNECTIONS / QDRANT_MAX_CONNECTIONS: pooled HTTP connections per client
+# HTTP_KEEPALIVE_SECONDS: how long an idle pooled connection stays open (httpx closes them after 5s by default)
+# S3_MAX_POOL_CONNECTIONS: boto3 S3 connection pool size (botocore defaults to 10)
+# QDRANT_PREFER_GRPC: talk to Qdrant over gRPC (one multiplexed HTTP/2 channel) instead of REST
+# QDRANT_GRPC_PORT: Qdrant's gRPC port
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "8"))
+QDRANT_MAX_CONNECTIONS = int(os.getenv("QDRANT_MAX_CONNECTIONS", "32"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "120"))
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32"))
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+
+
+class PoolStats:
+    """
+    Utilization metrics of one connection pool
+
+    `<name>_pool_in_use` counts requests holding a connection (from send
+    until the response body is closed), `<name>_pool_utilization` is that
+    as a fraction of the pool size and `<name>_pool_saturated` counts
+    requests that had to wait for one. With track_connects, `<name>_pool_connects`
+    and `<name>_connect_seconds` show how often and how slowly new
+    connections (TCP + TLS) are opened instead of reused.
+    """
+
+    def __init__(self, name: str, size: int, track_connects: bool = True):
+        self.name = name
+        self.size = max(1, size)
+        self.in_use = metrics.gauge(f"{name}_pool_in_use", f"Requests holding a {name} connection")
+        self.utilization = metrics.gauge(f"{name}_pool_utilization", f"Fraction of the {name} pool in use")
+        self.waits = metrics.counter(
+            f"{name}_pool_saturated", f"{name} requests sent while every pooled connection was busy"
+        )
+        if track_connects:
+            self.connects = metrics.counter(f"{name}_pool_connects", f"New {name} connections opened")
+            self.connect_seconds = metrics.histogram(
+                f"{name}_connect_seconds", f"Time to open a {name} connection (TCP + TLS)"
+            )
+        metrics.gauge(f"{name}_pool_size", f"Connections in the {name} pool").set(self.size)
+
+    def acquire(self):
+        if self.in_use.value >= self.size:
+            self.waits.inc()
+        self.in_use.inc()
+        self.utilization.set(self.in_use.value / self.size)
+
+    def release(self):
+        self.in_use.dec()
+        self.utilization.set(self.in_use.value / self.size)
+
+    def _on_trace(self, started: Dict[str, float], event: str):
+        # httpcore trace events: connection.connect_tcp.started, connection.start_tls.complete, ...
+        if event == "connection.connect_tcp.started":
+            started["connect"] = time.perf_counter()
+        elif event in ("connection.connect_tcp.complete", "connection.start_tls.complete") and "connect" in started:
+            started["done"] = time.perf_counter()
+        elif event.startswith("http") and "done" in started:
+            # the first request event after connecting: the connection is up
+            self.connects.inc()
+            self.connect_seconds.observe(started.pop("done") - started.pop("connect"))
+
+    def trace(self) -> Callable:
+        started: Dict[str, float] = {}
+
+        def trace(event: str, info: dict):
+            self._on_trace(started, event)
+        return trace
+
+    def async_trace(self) -> Callable:
+        started: Dict[str, float] = {}
+
+        async def trace(event: str, info: dict):
+            self._on_trace(started, event)
+        return trace
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    def __init__(self, stream, release: Callable[[], None]):
+        self._stream = stream
+        self._release: Optional[Callable[[], None]] = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, release: Callable[[], None]):
+        self._stream = stream
+        self._release: Optional[Callable[[], None]] = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+class PooledTransport(httpx.BaseTransport):
+    """
+    httpx connection pool that reports PoolStats
+    """
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self.stats = stats
+        self._transport = httpx.HTTPTransport(limits=_limits(stats.size), **kwargs)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = self.stats.trace()
+        self.stats.acquire()
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException:
+            self.stats.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, self.stats.release)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+
+class AsyncPooledTransport(httpx.AsyncBaseTransport):
+    """
+    Async httpx connection pool that reports PoolStats
+    """
+
+    def __init__(self, stats: PoolStats, **kwargs):
+        self.stats = stats
+        self._transport = httpx.AsyncHTTPTransport(limits=_limits(stats.size), **kwargs)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = self.stats.async_trace()
+        self.stats.acquire()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.stats.release()
+            raise
+        response.stream = _AsyncReleasingStream(response.stream, self.stats.release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def _limits(size: int) -> httpx.Limits:
+    # every connection may stay pooled, so bursts don't end in reconnects
+    return httpx.Limits(
+        max_connections=size,
+        max_keepalive_connections=size,
+        keepalive_expiry=HTTP_KEEPALIVE_SECONDS
+    )
+
+
+def ollama_client(base_url: str, timeout: httpx.Timeout) -> httpx.AsyncClient:
+    """
+    Pooled async HTTP client for Ollama
+    """
+    return httpx.AsyncClient(
+        base_url=base_url,
+        timeout=timeout,
+        transport=AsyncPooledTransport(PoolStats("ollama", OLLAMA_MAX_CONNECTIONS))
+    )
+
+
+def qdrant_client_args() -> Dict:
+    """
+    Connection arguments for QdrantClient
+
+    With QDRANT_PREFER_GRPC, point operations use one multiplexed gRPC
+    channel; the pooled REST transport still serves the calls gRPC doesn't
+    cover, and the pool metrics only see REST traffic.
+    """
+    return {
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "grpc_port": QDRANT_GRPC_PORT,
+        # passed through to the REST client's httpx.Client
+        "transport": PooledTransport(PoolStats("qdrant", QDRANT_MAX_CONNECTIONS))
+    }
+
+
+def s3_config() -> Config:
+    """
+    botocore client config with a pool sized for the app's concurrency
+    """
+    return Config(
+        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+        tcp_keepalive=True,
+        retries={"mode": "standard"}
+    )
+
+
+def instrument_s3(client):
+    """
+    Report a boto3 S3 client's pool use through PoolStats
+
+    Counts operations in flight (each holds one pooled connection while it
+    runs); botocore doesn't expose connection setup, so only in-use and
+    utilization are reported.
+    """
+    stats = PoolStats("s3", S3_MAX_POOL_CONNECTIONS, track_connects=False)
+    events = client.meta.events
+    events.register("before-call.s3", lambda **kwargs: stats.acquire())
+    events.register("after-call.s3", lambda **kwargs: stats.release())
+    events.register("after-call-error.s3", lambda **kwargs: stats.release())
+    return client
@@ -0,0 +1,246 @@
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Vector store backend (override in .env)
+# VECTOR_STORE: "qdrant" (Qdrant server) or "local" (in-process store on disk, see local_store.py)
+# read when the store is built, so a .env loaded after import still applies
+VECTOR_STORES = ("qdrant", "local")
+
+
+class VectorStore(ABC):
+    """
+    Storage and search of document chunk embeddings
+
+    Points carry the chunk text and its payload (tenant, document_id,
+    filename, chunk_index, content_hash, ...); ingest.py and app.py only
+    use the methods below, so backends are interchangeable.
+    """
+
+    def add_documents(
+        self,
+        texts: List[str],
+        embeddings: np.ndarray,
+        metadata: Dict
+    ) -> int:
+        """
+        Add documents to the store
+
+        Args:
+            texts: List of text chunks
+            embeddings: float32 array of shape (len(texts), vector_size)
+            metadata: Metadata to attach to all points (filename, s3_url, etc.)
+
+        Returns:
+            Number of points added
+        """
+        chunks = [{"text": text} for text in texts]
+        stats = self.add_document_stream([(chunks, embeddings)], metadata)
+        return stats["points"]
+
+    @abstractmethod
+    def add_document_stream(
+        self,
+        batches: Iterable[Tuple[List[Dict], np.ndarray]],
+        metadata: Dict
+    ) -> Dict:
+        """
+        Add documents from a stream of (chunks, embeddings) batches
+
+        Args:
+            batches: Iterable of (chunks, float32 embeddings) pairs, where each
+                chunk is a dict with "text" and optional extra payload (e.g. "page",
+                "chunk_index"). An "id" key sets the point ID, otherwise a random one is used
+            metadata: Metadata to attach to all points (filename, s3_url, etc.)
+
+        Returns:
+            Dict with points added, elapsed seconds and points per second
+        """
+
+    @abstractmethod
+    def document_exists(self, document_id: str, content_hash: str) -> bool:
+        """
+        Check whether this exact version of a document is already fully indexed
+        """
+
+    @abstractmethod
+    def get_document_points(self, document_id: str) -> Dict[str, int]:
+        """
+        Get the points already stored for a document
+
+        Returns:
+            Mapping of point ID to its chunk_index
+        """
+
+    @abstractmethod
+    def delete_points(self, point_ids: Iterable[str]) -> int:
+        """
+        Delete points by ID
+
+        Returns:
+            Number of points deleted
+        """
+
+    @abstractmethod
+    def set_chunk_indexes(self, chunk_indexes: Dict[str, int]):
+        """
+        Update the chunk_index of existing points (after chunks moved in an edited document)
+        """
+
+    @abstractmethod
+    def mark_document(self, document_id: str, payload: Dict):
+        """
+        Set payload fields (content_hash, s3_url, ...) on every point of a document
+        """
+
+    @abstractmethod
+    def delete_document(self, tenant: str, document_id: str) -> int:
+        """
+        Delete every point of one of a tenant's documents
+
+        Returns:
+            Number of points deleted
+        """
+
+    @abstractmethod
+    def delete_tenant(self, tenant: str):
+        """
+        Delete every point belonging to a tenant
+        """
+
+    @abstractmethod
+    def list_documents(self, tenant: str, limit: int = 1000) -> List[Dict]:
+        """
+        List a tenant's documents (by filename) with their chunk counts
+
+        Returns:
+            At most `limit` documents, most chunks first
+        """
+
+    @abstractmethod
+    def iter_payloads(self, fields: List[str], batch_size: int = 1000) -> Iterator[Dict]:
+        """
+        Stream some payload fields of every point, a page at a time
+
+        Args:
+            fields: Payload keys to return (e.g. "document_id", "s3_url")
+            batch_size: Points fetched per page
+
+        Yields:
+            One dict per point with the requested fields that it has
+        """
+
+    @abstractmethod
+    def search(
+        self,
+        query_vector: np.ndarray,
+        top_k: int = 3,
+        tenant: Optional[str] = None,
+        document_ids: Optional[List[str]] = None,
+        query_text: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Search for similar documents
+
+        Args:
+            query_vector: Query embedding vector (float32 array or list)
+            top_k: Number of results to return
+            tenant: Only search this tenant's documents
+            document_ids: Only search these documents
+            query_text: The query, for the lexical (BM25) side of hybrid search
+
+        Returns:
+            List of search results with text, metadata, and score
+        """
+
+    def search_batch(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 3,
+        tenant: Optional[str] = None,
+        document_ids: Optional[List[str]] = None,
+        query_texts: Optional[List[Optional[str]]] = None
+    ) -> List[List[Dict]]:
+        """
+        Search for several queries over the same scope
+
+        Backends override this to answer all queries in one pass; the
+        default runs search() for each.
+
+        Args:
+            query_vectors: Query embeddings, one row per query
+            top_k: Number of results per query
+            tenant: Only search this tenant's documents
+            document_ids: Only search these documents
+            query_texts: The queries, for the lexical side of hybrid search
+
+        Returns:
+            One list of search results per query, in query order
+        """
+        query_texts = query_texts or [None] * len(query_vectors)
+        return [
+            self.search(query_vector, top_k, tenant, document_ids, query_text)
+            for query_vector, query_text in zip(query_vectors, query_texts)
+        ]
+
+    @abstractmethod
+    def clear_collection(self):
+        """
+        Delete all points
+        """
+
+    @abstractmethod
+    def get_collection_count(self, tenant: Optional[str] = None) -> int:
+        """
+        Get the number of points in the store (or belonging to one tenant)
+        """
+
+    def close(self):
+        """
+        Release the store's resources (called on shutdown)
+        """
+
+
+def format_result(payload: Dict, score: float) -> Dict:
+    """
+    Search result (text, metadata, score) from a point's payload
+    """
+    return {
+        "text": payload.get("text", ""),
+        "metadata": {
+            "document_id": payload.get("document_id", ""),
+            "filename": payload.get("filename", ""),
+            "file_type": payload.get("file_type", ""),
+            "chunk_index": payload.get("chunk_index", 0),
+            "page": payload.get("page")
+        },
+        "score": score
+    }
+
+
+def vector_store_backend() -> str:
+    """
+    Backend selected by VECTOR_STORE
+    """
+    return os.getenv("VECTOR_STORE", "qdrant").lower()
+
+
+def create_vector_store(backend: Optional[str] = None) -> VectorStore:
+    """
+    Build a vector store (the one selected by VECTOR_STORE unless backend is given)
+
+    Backends are imported here so the unused one's dependencies aren't loaded.
+    """
+    backend = backend or vector_store_backend()
+    if backend == "qdrant":
+        from qdrant_utils import QdrantManager
+        return QdrantManager()
+    if backend == "local":
+        from local_store import LocalVectorStore
+        return LocalVectorStore()
+    raise ValueError(f"Unknown VECTOR_STORE '{backend}', expected one of {', '.join(VECTOR_STORES)}")
@@ -108,16 +108,37 @@ function App() {
       }
 
       const data = JSON.parse(responseText);
-      
+
+      const setStatus = (content) => {
+        setMessages(prev => {
+          const newMessages = [...prev];
+          newMessages[newMessages.length - 1] = { role: 'system', content };
+          return newMessages;
+        });
+      };
+
+      if (data.unchanged) {
+        setStatus(`✓ ${file.name} is already up to date`);
+        return;
+      }
+
+      // Processing runs in the background; poll the job until it finishes
+      let job;
+      while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const jobResponse = await fetch(`${API_URL}/jobs/${data.job_id}`);
+        if (!jobResponse.ok) throw new Error(`HTTP ${jobResponse.status}: Could not get upload status`);
+        job = await jobResponse.json();
+
+        if (job.status === 'succeeded') break;
+        if (job.status === 'failed' || job.status === 'cancelled') {
+          throw new Error(job.error || `Processing ${job.status}`);
+        }
+        setStatus(`Processing ${file.name}... ${job.stage} (${job.chunks_done} chunks)`);
+      }
+
       // Update system message with success
-      setMessages(prev => {
-        const newMessages = [...prev];
-        newMessages[newMessages.length - 1] = {
-          role: 'system',
-          content: `✓ ${file.name} uploaded successfully! (${data.chunks_processed} chunks processed)`
-        };
-        return newMessages;
-      });
+      setStatus(`✓ ${file.name} uploaded successfully! (${job.result.chunks_processed} chunks processed)`);
     } catch (error) {
       console.error('Upload error:', error);
       setMessages(prev => {